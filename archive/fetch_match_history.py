@@ -6,10 +6,17 @@ Retrieves detailed game data for the last 20 matches of a summoner.
 
 import requests
 import json
-import time
 import os
+import sys
+from pathlib import Path
 from typing import List, Dict, Optional
 from datetime import datetime
+from urllib.parse import urlparse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from rate_limiter import SharedRateLimiter, method_for_url, shared_limiter
+from response_cache import ResponseCache
 
 
 class RiotAPIClient:
@@ -53,13 +60,15 @@ class RiotAPIClient:
         'oc1': 'sea',
     }
     
-    def __init__(self, api_key: str, platform: str = 'na1'):
+    def __init__(self, api_key: str, platform: str = 'na1',
+                 cache: Optional[ResponseCache] = None):
         """
         Initialize the Riot API client.
         
         Args:
             api_key: Your Riot Games API key
             platform: Platform/region code (e.g., 'na1', 'euw1', 'kr')
+            cache: Match detail cache (defaults to the shared one in data/cache/matches)
         """
         self.api_key = api_key
         self.platform = platform.lower()
@@ -75,33 +84,21 @@ class RiotAPIClient:
             'X-Riot-Token': self.api_key
         }
         
-        # Rate limiting tracking
-        self.request_times = []
+        # Rate limiters per routing host, shared with every other process using this key
+        self.limiters: Dict[str, SharedRateLimiter] = {}
+        
+        # Finished matches never change, so details are only ever fetched once
+        self.cache = cache if cache is not None else ResponseCache()
     
-    def _rate_limit_check(self):
+    def _limiter_for(self, url: str) -> SharedRateLimiter:
         """
-        Check and enforce rate limits.
-        Personal key limits: 20 requests/second, 100 requests/2 minutes
+        Get the shared rate limiter for a URL's routing host (e.g. na1, americas).
+        Limits come from the X-App/Method-Rate-Limit headers Riot returns.
         """
-        current_time = time.time()
-        
-        # Remove requests older than 2 minutes
-        self.request_times = [t for t in self.request_times if current_time - t < 120]
-        
-        # Check 2-minute limit (100 requests)
-        if len(self.request_times) >= 100:
-            sleep_time = 120 - (current_time - self.request_times[0])
-            if sleep_time > 0:
-                print(f"Rate limit: Sleeping for {sleep_time:.2f} seconds...")
-                time.sleep(sleep_time)
-                self.request_times = []
-        
-        # Check 1-second limit (20 requests)
-        recent_requests = [t for t in self.request_times if current_time - t < 1]
-        if len(recent_requests) >= 20:
-            time.sleep(1.1)
-        
-        self.request_times.append(current_time)
+        routing = urlparse(url).hostname.split('.')[0]
+        if routing not in self.limiters:
+            self.limiters[routing] = shared_limiter(self.api_key, routing)
+        return self.limiters[routing]
     
     def _make_request(self, url: str) -> Optional[Dict]:
         """
@@ -113,10 +110,13 @@ class RiotAPIClient:
         Returns:
             JSON response as dict, or None if error
         """
-        self._rate_limit_check()
+        limiter = self._limiter_for(url)
+        method = method_for_url(url)
+        limiter.acquire(method)
         
         try:
             response = requests.get(url, headers=self.headers)
+            limiter.update_from_headers(method, response.headers)
             
             if response.status_code == 200:
                 return response.json()
@@ -124,7 +124,7 @@ class RiotAPIClient:
                 # Rate limited
                 retry_after = int(response.headers.get('Retry-After', 10))
                 print(f"Rate limited. Retrying after {retry_after} seconds...")
-                time.sleep(retry_after)
+                limiter.block_for(retry_after)
                 return self._make_request(url)
             elif response.status_code == 404:
                 print(f"Resource not found: {url}")
@@ -188,8 +188,15 @@ class RiotAPIClient:
         Returns:
             Match data dict or None
         """
+        cached = self.cache.get(match_id)
+        if cached is not None:
+            return cached
+        
         url = f"{self.regional_url}/lol/match/v5/matches/{match_id}"
-        return self._make_request(url)
+        match_data = self._make_request(url)
+        if match_data is not None:
+            self.cache.put(match_id, match_data)
+        return match_data
 
 
 def fetch_match_history(api_key: str, game_name: str, tag_line: str, 
@@ -322,10 +322,14 @@ async function loadAllData(playerIds) {
             
             updateLoadingStatus(`Loading data for ${playerId}...`);
             
-            // Load fact matches
+            // Load fact matches (a match two selected players played in has a fact row for each)
             const factMatches = await loadCSV(`${dataPath}/fact_matches.csv`);
+            factMatches.forEach(f => { f.player_id = playerId; });
             AppData.factMatches = AppData.factMatches.concat(factMatches);
             
+            // Surrogate keys are global (see src/surrogate_keys.py): a key means the same
+            // champion, date, queue, rune setup or match in every player's CSVs
+            
             // Load and merge champions (avoid duplicates)
             const champions = await loadCSV(`${dataPath}/dim_champion.csv`);
             champions.forEach(c => {
@@ -368,6 +372,7 @@ async function loadAllData(playerIds) {
             
             // Load and concat bridge match items
             const bridgeItems = await loadCSV(`${dataPath}/bridge_match_items.csv`);
+            bridgeItems.forEach(b => { b.player_id = playerId; });
             AppData.bridgeMatchItems = AppData.bridgeMatchItems.concat(bridgeItems);
             
             // Load and merge match metadata
@@ -378,9 +383,13 @@ async function loadAllData(playerIds) {
                 }
             });
             
-            // Load and process participants
+            // Load and process participants (once per match, however many players it was loaded for)
             const participants = await loadCSV(`${dataPath}/bridge_match_participants.csv`);
+            const loadedMatches = new Set(Object.keys(AppData.matchParticipants).map(Number));
             participants.forEach(p => {
+                if (loadedMatches.has(p.match_key)) {
+                    return;
+                }
                 if (!AppData.matchParticipants[p.match_key]) {
                     AppData.matchParticipants[p.match_key] = [];
                 }
@@ -428,7 +437,7 @@ function enrichMatchData() {
         
         // Get items for this match
         const matchItems = AppData.bridgeMatchItems
-            .filter(b => b.match_key === fact.match_key)
+            .filter(b => b.match_key === fact.match_key && b.player_id === fact.player_id)
             .sort((a, b) => a.item_position - b.item_position)
             .map(b => b.item_key);
         
@@ -438,6 +447,7 @@ function enrichMatchData() {
         
         return {
             ...fact,
+            row_id: `${fact.match_key}-${fact.player_id}`, // Unique per row, unlike match_key
             kda: parseFloat(kda), // Override KDA with correct calculation
             champion_name: champion.champion_name,
             champion_id: champion.champion_id,
@@ -939,9 +949,9 @@ function updateMatchHistoryTable() {
         const detailsRow = createMatchDetailsRow(m);
         
         return `
-            <tr class="match-row ${resultClass} border-b border-gray-700" data-match-key="${m.match_key}" onclick="toggleMatchDetails(${m.match_key})">
+            <tr class="match-row ${resultClass} border-b border-gray-700" data-match-key="${m.match_key}" onclick="toggleMatchDetails('${m.row_id}')">
                 <td class="px-4 py-3">
-                    <span class="expand-arrow" id="arrow-${m.match_key}">▶</span>
+                    <span class="expand-arrow" id="arrow-${m.row_id}">▶</span>
                     <span class="font-bold ${resultColor}">${resultText}</span>
                 </td>
                 <td class="px-4 py-3">
@@ -969,9 +979,9 @@ function updateMatchHistoryTable() {
     }).join('');
 }
 
-function toggleMatchDetails(matchKey) {
-    const detailsRow = document.getElementById(`details-${matchKey}`);
-    const arrow = document.getElementById(`arrow-${matchKey}`);
+function toggleMatchDetails(rowId) {
+    const detailsRow = document.getElementById(`details-${rowId}`);
+    const arrow = document.getElementById(`arrow-${rowId}`);
     
     if (detailsRow.classList.contains('hidden')) {
         detailsRow.classList.remove('hidden');
@@ -987,7 +997,7 @@ function createMatchDetailsRow(match) {
     
     if (!participants || participants.length === 0) {
         return `
-            <tr class="match-details hidden" id="details-${match.match_key}">
+            <tr class="match-details hidden" id="details-${match.row_id}">
                 <td colspan="11" class="px-4 py-4 text-center text-gray-500">
                     No detailed participant data available
                 </td>
@@ -1007,7 +1017,7 @@ function createMatchDetailsRow(match) {
     const redTeam = sortedParticipants.filter(p => p.team_id === 200);
     
     return `
-        <tr class="match-details hidden" id="details-${match.match_key}">
+        <tr class="match-details hidden" id="details-${match.row_id}">
             <td colspan="11" class="px-0 py-0">
                 <div class="p-4 bg-gray-800">
                     ${renderTeamScoreboard(blueTeam, 'BLUE TEAM', match, participants)}
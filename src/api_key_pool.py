@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+API Key Pool
+Spreads Riot API calls over several keys, each drawing on its own rate limits.
+"""
+
+import threading
+import time
+from pathlib import Path
+from typing import Callable, List, Mapping, Optional
+
+from rate_limiter import RateLimiter, shared_limiter
+from retry_policy import RiotAPIError
+
+
+def read_api_keys(env_file: Path) -> List[str]:
+    """
+    API keys configured in a .env file.
+
+    RIOT_API_KEY holds one key (the original setup); RIOT_API_KEYS optionally
+    adds more, comma-separated. Duplicates are dropped, order is kept.
+    """
+    keys = []
+    with open(env_file) as f:
+        for line in f:
+            name, _, value = line.strip().partition('=')
+            if name in ('RIOT_API_KEY', 'RIOT_API_KEYS'):
+                keys.extend(key.strip() for key in value.split(',') if key.strip())
+    return list(dict.fromkeys(keys))
+
+
+def mask_key(api_key: str) -> str:
+    """Enough of a key to tell keys apart in output"""
+    return f"…{api_key[-4:]}"
+
+
+class PooledKey:
+    """One key of a pool and its rate limiter"""
+
+    def __init__(self, api_key: str, limiter: RateLimiter):
+        self.api_key = api_key
+        self.limiter = limiter
+        self.calls = 0
+        self.disabled: Optional[str] = None
+
+
+class ApiKeyPool:
+    """
+    Several API keys for one routing value, each with its own rate limiter.
+
+    Has the limiter interface RiotAPIClient and FairShareScheduler use, so
+    it can stand in for a single key's limiter. acquire() takes a token from
+    the next key in rotation that has one free, so calls spread over every
+    key and the pool runs at the keys' combined limits. The key a thread
+    acquired is the one current_key() returns and its next
+    update_from_headers() and block_for() apply to.
+
+    A key the API rejects (401/403) is taken out of rotation with disable().
+
+    All keys must belong to the same Riot application: PUUIDs are encrypted
+    per application, so one stored under a key from another application is
+    not valid with these.
+    """
+
+    def __init__(self, api_keys: List[str], routing: str,
+                 limiter_factory: Callable[[str, str], RateLimiter] = shared_limiter):
+        if not api_keys:
+            raise ValueError("An API key pool needs at least one key")
+        self.routing = routing
+        self.keys = [PooledKey(api_key, limiter_factory(api_key, routing))
+                     for api_key in dict.fromkeys(api_keys)]
+        self._next = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def __len__(self) -> int:
+        return len(self.active())
+
+    def active(self) -> List[PooledKey]:
+        return [key for key in self.keys if key.disabled is None]
+
+    def usable(self) -> List[PooledKey]:
+        """Keys in rotation; raises RiotAPIError once every key has been rejected"""
+        keys = self.active()
+        if not keys:
+            raise RiotAPIError(f"Every API key for {self.routing} has been rejected")
+        return keys
+
+    def _current(self) -> PooledKey:
+        return getattr(self._local, 'key', None) or self.keys[0]
+
+    def current_key(self) -> str:
+        """The key the calling thread last acquired a token on"""
+        return self._current().api_key
+
+    def acquire(self, method: str) -> float:
+        """
+        Block until some key allows a call to `method` and take its token.
+
+        Returns:
+            Seconds spent sleeping
+        """
+        slept = 0.0
+        announced = False
+        while True:
+            with self._lock:
+                keys = self.usable()
+                waits = []
+                for i in range(len(keys)):
+                    key = keys[(self._next + i) % len(keys)]
+                    wait_time = key.limiter.try_acquire(method)
+                    if wait_time <= 0:
+                        self._next = (self._next + i + 1) % len(keys)
+                        key.calls += 1
+                        self._local.key = key
+                        return slept
+                    waits.append(wait_time)
+
+            wait_time = min(waits)
+            if wait_time > 5 and not announced:
+                print(f"  ⏳ Rate limit reached on every key. Waiting {wait_time:.0f}s...")
+                announced = True
+            time.sleep(wait_time)
+            slept += wait_time
+
+    def update_from_headers(self, method: str, headers: Mapping[str, str]):
+        self._current().limiter.update_from_headers(method, headers)
+
+    def block_for(self, seconds: float):
+        """Pause the calling thread's current key (a 429 is counted per key)"""
+        self._current().limiter.block_for(seconds)
+
+    def disable(self, reason: str) -> int:
+        """
+        Take the calling thread's current key out of rotation.
+
+        Returns:
+            Number of keys still in rotation
+        """
+        key = self._current()
+        with self._lock:
+            if key.disabled is None:
+                key.disabled = reason
+                print(f"  🔑 API key {mask_key(key.api_key)} taken out of rotation ({reason}); "
+                      f"{len(self.active())} left")
+            return len(self.active())
+
+    def report(self) -> List[str]:
+        """Lines describing how calls were spread over the keys"""
+        lines = [f"🔑 API keys ({self.routing}):"]
+        for key in self.keys:
+            state = f"  disabled: {key.disabled}" if key.disabled else ""
+            lines.append(f"   {mask_key(key.api_key)}  calls {key.calls:>6}{state}")
+        return lines
+
+    def close(self):
+        for key in self.keys:
+            close = getattr(key.limiter, 'close', None)
+            if close is not None:
+                close()
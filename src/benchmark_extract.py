@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Extraction Benchmark
+Measures end-to-end PlayerExtraction throughput, and the time spent sleeping
+on rate limits and retries, against the local Riot API stand-in server at
+several concurrency levels.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from extract_2024_2025 import PlayerExtraction, RiotAPIClient
+from rate_limiter import parse_rate_header, RateLimiter
+from retry_policy import CircuitBreaker
+from riot_stub_server import (RecordedMatchHistory, RiotStubServer, StubMatchHistory, StubRateLimits,
+                              parse_method_limits)
+from window_planner import parse_date
+
+BENCH_PUUID = "bench-player"
+
+
+def run_once(server: RiotStubServer, concurrency: int, since: str, until: str,
+             app_limits: list, single_pass: bool = False, puuid: str = BENCH_PUUID) -> dict:
+    """Extract a date range from the stand-in server into a scratch directory and time it"""
+    start_time = parse_date(since)
+    end_time = parse_date(until) - 1
+    limiter = RateLimiter(app_limits)
+    client = RiotAPIClient("stub-key", base_url=server.url, limiter=limiter, breaker=CircuitBreaker())
+    requests_before = server.request_count
+    statuses_before = server.status_counts.copy()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                extraction = PlayerExtraction(client, "bench", puuid, concurrency=concurrency,
+                                              single_pass=single_pass)
+                matches = extraction.extract_range(start_time, end_time)
+                extraction.finish()
+                extraction.store.close()
+            elapsed = time.perf_counter() - started
+        finally:
+            os.chdir(cwd)
+
+    statuses = server.status_counts - statuses_before
+    return {
+        'concurrency': concurrency,
+        'matches': matches,
+        'requests': server.request_count - requests_before,
+        'rate_limited': statuses[429],
+        'server_errors': sum(count for status, count in statuses.items() if status >= 500),
+        'failed': extraction.failed,
+        'seconds': elapsed,
+        'sleep_seconds': client.telemetry.total_sleep(),
+        'matches_per_sec': matches / elapsed if elapsed else 0.0,
+    }
+
+
+def main():
+    """Run the benchmark and print a results table"""
+    parser = argparse.ArgumentParser(description="Benchmark end-to-end extraction against the local stand-in")
+    parser.add_argument('--levels', default="1,2,4,8,16", help="Comma-separated concurrency levels")
+    parser.add_argument('--latency', type=float, default=0.1, help="Simulated server latency (s)")
+    parser.add_argument('--since', default="2024-01-01", help="First day extracted (default: %(default)s)")
+    parser.add_argument('--until', default="2024-02-01", help="Day after the last one extracted")
+    parser.add_argument('--limits', default="20:1",
+                        help="Client-side app limits in X-App-Rate-Limit format (default: %(default)s)")
+    parser.add_argument('--server-limits', default="20:1",
+                        help="App limits the stand-in enforces and reports in its headers, "
+                             "or 'none' (default: %(default)s)")
+    parser.add_argument('--method-limit', action='append', default=[], metavar="METHOD=LIMITS",
+                        help="Method limit the stand-in enforces, e.g. match-details=2000:10 (repeatable)")
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help="Share of calls the stand-in fails with a 503 (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for injected faults")
+    parser.add_argument('--replay', type=Path, default=None,
+                        help="Serve recorded matches from a match store root (e.g. data/raw) or a "
+                             "directory of match JSON files; use with --puuid")
+    parser.add_argument('--puuid', default=BENCH_PUUID, help="PUUID to extract (for --replay)")
+    parser.add_argument('--history-queues', default="400,420",
+                        help="Queues the stand-in history rotates through (default: %(default)s)")
+    parser.add_argument('--single-pass', action='store_true',
+                        help="List without a queue filter and route matches after fetching")
+    args = parser.parse_args()
+    app_limits = parse_rate_header(args.limits)
+
+    if args.replay:
+        history = RecordedMatchHistory.load(args.replay)
+    else:
+        # One game every six hours from 2024-01-01 through the end of the year
+        history = StubMatchHistory(match_count=366 * 4,
+                                   queues=[int(q) for q in args.history_queues.split(',')])
+
+    rate_limits = None
+    if args.server_limits.lower() != "none" or args.method_limit:
+        server_limits = [] if args.server_limits.lower() == "none" else parse_rate_header(args.server_limits)
+        rate_limits = StubRateLimits(server_limits, parse_method_limits(args.method_limit))
+
+    print("=" * 70)
+    print(" Extraction benchmark (local stand-in API)")
+    print("=" * 70)
+    print(f"  Latency: {args.latency * 1000:.0f} ms   Limiter: {args.limits}   "
+          f"Server limits: {args.server_limits}   Errors: {args.error_rate:.0%}")
+    print(f"  History: {len(history.games)} {'recorded' if args.replay else 'synthetic'} matches   "
+          f"Listing: {'single pass' if args.single_pass else 'per queue'}")
+    print()
+    print(f"  {'concurrency':>11}  {'matches':>7}  {'requests':>8}  {'429s':>5}  {'5xx':>5}  "
+          f"{'failed':>6}  {'seconds':>8}  {'asleep':>7}  {'matches/s':>9}")
+
+    rate_limited = 0
+    with RiotStubServer(args.puuid, history, latency=args.latency, rate_limits=rate_limits,
+                        error_rate=args.error_rate, seed=args.seed) as server:
+        for level in (int(x) for x in args.levels.split(',')):
+            result = run_once(server, level, args.since, args.until, app_limits, args.single_pass,
+                              args.puuid)
+            rate_limited += result['rate_limited']
+            print(f"  {result['concurrency']:>11}  {result['matches']:>7}  {result['requests']:>8}  "
+                  f"{result['rate_limited']:>5}  {result['server_errors']:>5}  {result['failed']:>6}  "
+                  f"{result['seconds']:>8.2f}  {result['sleep_seconds']:>7.2f}  "
+                  f"{result['matches_per_sec']:>9.2f}")
+
+    budget = min(count / window for count, window in app_limits)
+    print(f"\n  Rate budget ceiling: {budget:.2f} requests/s")
+    print("  asleep: seconds spent waiting on the rate limiter, Retry-After blocks, retry backoff "
+          "and the circuit breaker")
+    if rate_limited:
+        print(f"\n  ❌ The limiter let {rate_limited} calls over the server's limits (429s)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
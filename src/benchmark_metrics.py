@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Derived Metrics Benchmark
+Times the derived-metric stage of the star schema transform (KDA, CS/min,
+gold/min, damage/min, kill participation) computed row by row and with
+NumPy, over the participant rows of synthetic matches.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from derived_metrics import DerivedMetricsBatch, np
+from riot_stub_server import synthetic_match
+
+BENCH_PUUID = "bench-player"
+
+
+def build_batch(matches: list, team_kill_participation: bool) -> DerivedMetricsBatch:
+    """A batch holding the fact row and the ten participant rows of every match"""
+    batch = DerivedMetricsBatch(team_kill_participation=team_kill_participation,
+                                int_kda_without_deaths=team_kill_participation)
+    for match in matches:
+        info = match['info']
+        minutes = info['gameDuration'] / 60
+        team_kills = {}
+        for participant in info['participants']:
+            team_kills[participant['teamId']] = team_kills.get(participant['teamId'], 0) + participant['kills']
+        player = info['participants'][0]
+        batch.add({}, player, minutes, team_kills[player['teamId']])
+        for participant in info['participants']:
+            batch.add({}, participant, minutes, team_kills[participant['teamId']])
+    return batch
+
+
+def best_of(repeat: int, func) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def main():
+    """Run the benchmark and print a results table"""
+    parser = argparse.ArgumentParser(description="Benchmark the derived-metric stage, row by row vs NumPy")
+    parser.add_argument('--sizes', default="10000,100000", help="Comma-separated match counts")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per measurement, best kept")
+    args = parser.parse_args()
+    if np is None:
+        print("NumPy is not installed (pip install -r requirements.txt)")
+        sys.exit(1)
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    print("=" * 70)
+    print(" Derived metrics benchmark")
+    print("=" * 70)
+    print(f"  Generating {max(sizes)} synthetic matches...")
+    matches = [synthetic_match(f"BENCH_{i}", BENCH_PUUID, 1704067200000 + i * 3_600_000, 420)
+               for i in range(max(sizes))]
+    print()
+    print(f"  {'matches':>8}  {'rows':>9}  {'participation':<13}  {'row by row':>10}  {'numpy':>8}  "
+          f"{'speedup':>7}  {'same':>4}")
+
+    for size in sizes:
+        for team_kill_participation in (False, True):
+            batch = build_batch(matches[:size], team_kill_participation)
+            python_seconds = best_of(args.repeat, lambda: batch.compute(vectorized=False))
+            numpy_seconds = best_of(args.repeat, lambda: batch.compute(vectorized=True))
+            same = batch.compute(vectorized=False) == batch.compute(vectorized=True)
+            print(f"  {size:>8}  {len(batch):>9}  {'team kills' if team_kill_participation else 'challenges':<13}  "
+                  f"{python_seconds:>9.3f}s  {numpy_seconds:>7.3f}s  {python_seconds / numpy_seconds:>6.1f}x  "
+                  f"{'yes' if same else 'NO':>4}")
+
+    print("\n  rows: the fact row and ten participant rows of each match")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Derived Match Metrics
+KDA, CS/min, gold/min, damage/min and kill participation for a batch of
+participant rows, computed column-wise with NumPy when it is installed and
+row by row otherwise, with the same values either way.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Columns a batch fills in on every row it was given, with their decimal places
+METRIC_DIGITS = {
+    'kda': 2,
+    'cs_per_minute': 2,
+    'gold_per_minute': 2,
+    'damage_per_minute': 2,
+    'kill_participation': 3,
+}
+
+# Raw participant stats a batch collects per row (kill_participation holds
+# team kills for a batch computing it from them)
+STAT_COLUMNS = ('kills', 'deaths', 'assists', 'cs_total', 'gold_earned', 'damage_dealt', 'minutes',
+                'kill_participation')
+
+# Distance from a .5 tie below which a NumPy rounding is redone with round()
+TIE_TOLERANCE = 1e-6
+
+
+def round_like_python(values, digits: int):
+    """
+    np.round(values, digits) corrected to match Python's round() element for element.
+
+    np.round scales by 10**digits, rounds half to even and scales back, so
+    it can land on the other side of a value that sits (in binary) just off
+    a decimal tie, where round() looks at the exact value. Away from ties
+    the two agree, so only elements near one are redone with round().
+    """
+    rounded = np.round(values, digits)
+    scaled = values * 10.0 ** digits
+    for i in np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < TIE_TOLERANCE):
+        rounded[i] = round(float(values[i]), digits)
+    return rounded
+
+
+class DerivedMetricsBatch:
+    """
+    Participant rows waiting for their derived metrics.
+
+    add() records a row (with placeholders for the METRIC_DIGITS columns)
+    and the raw stats its metrics come from; apply() computes the metrics
+    of every recorded row in one pass and writes them into the rows.
+    Kill participation is either Riot's challenges.killParticipation,
+    rounded, or takedowns over team kills (team_kill_participation).
+    Values are the ones the per-row code computed, type included: with
+    int_kda_without_deaths a deathless KDA stays the integer takedown
+    count, and a kill participation of integer 0 stays 0. Per-minute
+    metrics of a game recorded with no duration are 0.0.
+    """
+
+    def __init__(self, team_kill_participation: bool = False, int_kda_without_deaths: bool = False):
+        self.team_kill_participation = team_kill_participation
+        self.int_kda_without_deaths = int_kda_without_deaths
+        self._clear()
+
+    def _clear(self):
+        self.rows: List[Dict] = []
+        self.stats: Dict[str, List] = {column: [] for column in STAT_COLUMNS}
+        # (row position, value) per metric, for values that are ints rather than rounded floats
+        self.whole: Dict[str, List[Tuple[int, int]]] = {metric: [] for metric in METRIC_DIGITS}
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def add(self, row: Dict, participant: Dict, game_duration_minutes: float, team_kills: int = 0):
+        """Record a row whose metrics come from `participant` (team_kills: kills of its team)"""
+        position = len(self.rows)
+        self.rows.append(row)
+        kills, deaths, assists = participant['kills'], participant['deaths'], participant['assists']
+        stats = self.stats
+        stats['kills'].append(kills)
+        stats['deaths'].append(deaths)
+        stats['assists'].append(assists)
+        stats['cs_total'].append(participant['totalMinionsKilled'] + participant.get('neutralMinionsKilled', 0))
+        stats['gold_earned'].append(participant['goldEarned'])
+        stats['damage_dealt'].append(participant['totalDamageDealtToChampions'])
+        stats['minutes'].append(game_duration_minutes)
+
+        if self.int_kda_without_deaths and deaths == 0:
+            self.whole['kda'].append((position, kills + assists))
+        if self.team_kill_participation:
+            stats['kill_participation'].append(team_kills)
+            if team_kills == 0:
+                self.whole['kill_participation'].append((position, 0))
+        else:
+            kill_participation = participant.get('challenges', {}).get('killParticipation', 0)
+            stats['kill_participation'].append(kill_participation)
+            if isinstance(kill_participation, int):
+                self.whole['kill_participation'].append((position, kill_participation))
+
+    def compute(self, vectorized: Optional[bool] = None) -> Dict[str, List]:
+        """
+        Every metric of every recorded row, as lists in row order.
+
+        Args:
+            vectorized: Compute with NumPy (default: whenever it is installed)
+        """
+        if vectorized is None:
+            vectorized = np is not None
+        metrics = self._compute_numpy() if vectorized else self._compute_python()
+        for metric, values in self.whole.items():
+            for position, value in values:
+                metrics[metric][position] = value
+        return metrics
+
+    def _compute_numpy(self) -> Dict[str, List]:
+        stats = {column: np.array(values, dtype=np.int64) for column, values in self.stats.items()
+                 if column not in ('minutes', 'kill_participation')}
+        minutes = np.array(self.stats['minutes'], dtype=np.float64)
+        played = minutes > 0
+        takedowns = stats['kills'] + stats['assists']
+        if self.team_kill_participation:
+            team_kills = np.array(self.stats['kill_participation'], dtype=np.int64)
+            kill_participation = np.divide(takedowns, team_kills, out=np.zeros(len(self.rows)),
+                                           where=team_kills > 0)
+        else:
+            kill_participation = np.array(self.stats['kill_participation'], dtype=np.float64)
+
+        def per_minute(values):
+            return np.divide(values, minutes, out=np.zeros(len(self.rows)), where=played)
+
+        metrics = {
+            'kda': takedowns / np.maximum(stats['deaths'], 1),
+            'cs_per_minute': per_minute(stats['cs_total']),
+            'gold_per_minute': per_minute(stats['gold_earned']),
+            'damage_per_minute': per_minute(stats['damage_dealt']),
+            'kill_participation': kill_participation,
+        }
+        return {metric: round_like_python(values, METRIC_DIGITS[metric]).tolist()
+                for metric, values in metrics.items()}
+
+    def _compute_python(self) -> Dict[str, List]:
+        stats = self.stats
+        metrics: Dict[str, List] = {metric: [] for metric in METRIC_DIGITS}
+        def per_minute(value, minutes: float) -> float:
+            return round(value / minutes, 2) if minutes > 0 else 0.0
+
+        for i in range(len(self.rows)):
+            minutes = stats['minutes'][i]
+            takedowns = stats['kills'][i] + stats['assists'][i]
+            if self.team_kill_participation:
+                team_kills = stats['kill_participation'][i]
+                kill_participation = takedowns / team_kills if team_kills > 0 else 0
+            else:
+                kill_participation = stats['kill_participation'][i]
+            metrics['kda'].append(round(takedowns / max(stats['deaths'][i], 1), 2))
+            metrics['cs_per_minute'].append(per_minute(stats['cs_total'][i], minutes))
+            metrics['gold_per_minute'].append(per_minute(stats['gold_earned'][i], minutes))
+            metrics['damage_per_minute'].append(per_minute(stats['damage_dealt'][i], minutes))
+            metrics['kill_participation'].append(round(kill_participation, 3))
+        return metrics
+
+    def apply(self):
+        """Write the metrics into the recorded rows and empty the batch"""
+        if not self.rows:
+            return
+        for metric, values in self.compute().items():
+            for row, value in zip(self.rows, values):
+                row[metric] = value
+        self._clear()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Dimension Registry
+Surrogate key assignment for star schema dimensions, with a hash index on
+each dimension's natural key so a lookup costs the same however many rows
+the dimension holds.
+"""
+
+from typing import Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+from surrogate_keys import SurrogateKeyRegistry
+
+
+class DimensionRegistry:
+    """
+    Rows of one dimension table, keyed by surrogate key and indexed by natural key.
+
+    get_or_create() returns the key already assigned to a natural key, or
+    builds the row with a new surrogate key: an explicit one for dimensions
+    keyed by a natural ID such as items, else the one `keys` (a
+    SurrogateKeyRegistry) holds for the natural key under this dimension's
+    name, else the next one in sequence. Every row must have
+    exactly `columns`, in order, so the table exports with one header.
+    Reads like the dict of rows the builders used to keep (len(), iteration
+    over surrogate keys, [key] and values()), except that `in` tests
+    natural keys.
+    """
+
+    def __init__(self, name: str, columns: Tuple[str, ...], keys: Optional[SurrogateKeyRegistry] = None):
+        self.name = name
+        self.columns = columns
+        self.keys = keys
+        self.rows: Dict[int, Dict] = {}
+        self._index: Dict[Hashable, int] = {}
+        self._next_key = 1
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.rows)
+
+    def __getitem__(self, key: int) -> Dict:
+        return self.rows[key]
+
+    def __contains__(self, natural_key: Hashable) -> bool:
+        return natural_key in self._index
+
+    def values(self):
+        return self.rows.values()
+
+    def natural_keys(self) -> List[Hashable]:
+        """Natural keys of the rows, in the order of values()"""
+        return list(self._index)
+
+    def lookup(self, natural_key: Hashable) -> Optional[int]:
+        """Surrogate key of a natural key, None if it has no row yet"""
+        return self._index.get(natural_key)
+
+    def get_or_create(self, natural_key: Hashable, build_row: Callable[[int], Dict],
+                      key: Optional[int] = None) -> int:
+        """
+        Surrogate key for a natural key, adding build_row(key) as its row on first sight.
+
+        Args:
+            natural_key: Hashable identity of the row (e.g. a champion ID or a rune setup tuple)
+            build_row: Called once with the new surrogate key to build the row
+            key: Surrogate key to use instead of an assigned one
+        """
+        existing = self._index.get(natural_key)
+        if existing is not None:
+            return existing
+
+        if key is None and self.keys is not None:
+            key = self.keys.key_for(self.name, natural_key)
+        if key is None:
+            key = self._next_key
+        elif key in self.rows:
+            raise ValueError(f"{self.name}: surrogate key {key} already belongs to another row")
+        row = build_row(key)
+        if tuple(row) != self.columns:
+            raise ValueError(f"{self.name}: row columns {list(row)} do not match {list(self.columns)}")
+
+        self.rows[key] = row
+        self._index[natural_key] = key
+        self._next_key = max(self._next_key, key + 1)
+        return key
+
+    def restore(self, key: int, natural_key: Hashable, row: Dict):
+        """Put back a row exported earlier (e.g. read from its CSV) under its key"""
+        if tuple(row) != self.columns:
+            raise ValueError(f"{self.name}: row columns {list(row)} do not match {list(self.columns)}")
+        self.rows[key] = row
+        self._index[natural_key] = key
+        self._next_key = max(self._next_key, key + 1)
+
+    def to_list(self) -> List[Dict]:
+        """Rows in key assignment order"""
+        return list(self.rows.values())
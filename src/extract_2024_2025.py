@@ -1,17 +1,41 @@
 #!/usr/bin/env python3
 """
-League of Legends Match Data Extractor (2024-2025)
-Extracts all matches from 2024 and 2025, organized by month
+League of Legends Match Data Extractor
+Extracts all matches in a date range (2024 onwards by default), listing match
+IDs over adaptively split time windows
 """
 
+import argparse
+import contextlib
 import json
 import os
 import sys
 import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Collection, Dict, List, Optional, Union
+
+from api_key_pool import ApiKeyPool, read_api_keys
+from extraction_planner import (PLAN_FILE, ExtractionPlanner, estimate_seconds, format_duration,
+                                plan_lines, pool_size_hint, region_totals)
+from extraction_state import DeadLetterQueue, ExtractionCheckpoint, WatermarkStore, atomic_write_json
+from match_store import DEFAULT_SEGMENT_CODEC, MatchStore, PlayerMatchIndex, import_raw_files
+from rate_limiter import (METHOD_MATCH_DETAILS, METHOD_MATCH_IDS, RateLimiter, api_base_url,
+                          shared_limiter)
+from response_cache import ResponseCache
+from retry_policy import (DEFAULT_RETRY_POLICY, OUTCOME_CLIENT_ERROR, OUTCOME_NOT_FOUND,
+                          OUTCOME_RATE_LIMITED, OUTCOME_SERVER_ERROR, OUTCOME_UNAUTHORIZED,
+                          REQUEST_TIMEOUT, CircuitBreaker, RequestFailed, RetryPolicy, RiotAPIError,
+                          breaker_for, classify)
+from scheduler import LANE_BACKFILL, LANE_LIVE, FairShareScheduler, PrefixedOutput
+from telemetry import (SLEEP_BACKOFF, SLEEP_CIRCUIT_BREAKER, SLEEP_RATE_LIMIT, STAGE_CACHE_WRITE,
+                       STAGE_JSON_DECODE, STAGE_STORE_WRITE, STAGE_YEAR_WINDOW, TELEMETRY_DIR,
+                       Telemetry, TelemetryWriter)
+from transform_player_data import transform_player
+from window_planner import (DAY_MS, DEFAULT_START_DATE, PAGE_SIZE, can_split, describe_window,
+                            now_ms, parse_date, split_window, window_key, year_end, year_windows)
 
 # Add parent directory to path
 sys.path.append(str(Path(__file__).parent.parent))
@@ -22,161 +46,206 @@ PLAYERS_FILE = Path(__file__).parent.parent / "players.json"
 # Target queues
 TARGET_QUEUES = [400, 420]  # Draft Normal, Ranked Solo/Duo
 
-# Months to extract (Jan 2024 - Nov 2025)
-MONTHS = {
-    "2024-01": (1704067200000, 1706745599999),  # Jan 1-31, 2024
-    "2024-02": (1706745600000, 1709251199999),  # Feb 1-29, 2024 (leap year)
-    "2024-03": (1709251200000, 1711929599999),  # Mar 1-31, 2024
-    "2024-04": (1711929600000, 1714521599999),  # Apr 1-30, 2024
-    "2024-05": (1714521600000, 1717199999999),  # May 1-31, 2024
-    "2024-06": (1717200000000, 1719791999999),  # Jun 1-30, 2024
-    "2024-07": (1719792000000, 1722470399999),  # Jul 1-31, 2024
-    "2024-08": (1722470400000, 1725148799999),  # Aug 1-31, 2024
-    "2024-09": (1725148800000, 1727740799999),  # Sep 1-30, 2024
-    "2024-10": (1727740800000, 1730419199999),  # Oct 1-31, 2024
-    "2024-11": (1730419200000, 1733011199999),  # Nov 1-30, 2024
-    "2024-12": (1733011200000, 1735689599999),  # Dec 1-31, 2024
-    "2025-01": (1735689600000, 1738367999999),  # Jan 1-31, 2025
-    "2025-02": (1738368000000, 1740787199999),  # Feb 1-28, 2025
-    "2025-03": (1740787200000, 1743465599999),  # Mar 1-31, 2025
-    "2025-04": (1743465600000, 1746057599999),  # Apr 1-30, 2025
-    "2025-05": (1746057600000, 1748735999999),  # May 1-31, 2025
-    "2025-06": (1748736000000, 1751327999999),  # Jun 1-30, 2025
-    "2025-07": (1751328000000, 1754006399999),  # Jul 1-31, 2025
-    "2025-08": (1754006400000, 1756684799999),  # Aug 1-31, 2025
-    "2025-09": (1756684800000, 1759276799999),  # Sep 1-30, 2025
-    "2025-10": (1759276800000, 1761955199999),  # Oct 1-31, 2025
-    "2025-11": (1761955200000, 1764547199999),  # Nov 1-30, 2025
+QUEUE_NAMES = {
+    400: "Draft Normal",
+    420: "Ranked Solo/Duo",
+    430: "Blind Pick",
+    440: "Ranked Flex",
+    450: "ARAM",
+    700: "Clash",
+}
+
+# Regional route MATCH-V5 serves each platform from; Riot enforces rate limits per route
+PLATFORM_ROUTING = {
+    'na1': "americas", 'br1': "americas", 'la1': "americas", 'la2': "americas",
+    'euw1': "europe", 'eun1': "europe", 'tr1': "europe", 'ru': "europe", 'me1': "europe",
+    'kr': "asia", 'jp1': "asia",
+    'oc1': "sea", 'ph2': "sea", 'sg2': "sea", 'th2': "sea", 'tw2': "sea", 'vn2': "sea",
 }
+ROUTING_REGIONS = ("americas", "europe", "asia", "sea")
 
+# Number of match detail requests kept in flight per player
+DEFAULT_CONCURRENCY = 1
+
+# How far back the live lane reaches for a player with no watermarks yet
+LIVE_LANE_DAYS = 14
 
 class RiotAPIClient:
-    """Riot API client with con§ative rate limiting"""
+    """
+    Riot API client driven by the rate limit headers Riot returns.
+    
+    api_key is either one key or an ApiKeyPool, which then also serves as
+    the limiter unless another one is given.
+    """
     
-    def __init__(self, api_key: str, region: str = "americas"):
-        self.api_key = api_key
+    def __init__(self, api_key: Union[str, ApiKeyPool], region: str = "americas",
+                 base_url: Optional[str] = None, limiter: Optional[RateLimiter] = None,
+                 cache: Optional[ResponseCache] = None,
+                 retry: RetryPolicy = DEFAULT_RETRY_POLICY, breaker: Optional[CircuitBreaker] = None,
+                 telemetry: Optional[Telemetry] = None):
+        self.key_pool = api_key if isinstance(api_key, ApiKeyPool) else None
+        self.api_key = api_key if self.key_pool is None else None
         self.region = region
-        self.headers = {"X-Riot-Token": api_key}
-        
-        # Very conservative rate limiting
-        self.calls = []
-        self.max_calls = 80  # Conservative buffer
-        self.window = 120  # seconds
-        self.min_delay = 0.5  # Minimum 500ms between calls
-        self.last_call = 0
-        
-    def _wait_if_needed(self):
-        """Enforce rate limiting"""
-        now = time.time()
-        
-        # Minimum delay between calls
-        time_since_last = now - self.last_call
-        if time_since_last < self.min_delay:
-            time.sleep(self.min_delay - time_since_last)
-            now = time.time()
-        
-        # Remove old calls
-        self.calls = [t for t in self.calls if now - t < self.window]
-        
-        # Wait if at limit
-        if len(self.calls) >= self.max_calls:
-            oldest = self.calls[0]
-            wait_time = self.window - (now - oldest) + 5
-            if wait_time > 0:
-                print(f"  ⏳ Rate limit reached. Waiting {wait_time:.0f}s...")
-                time.sleep(wait_time)
-                self.calls = []
-                now = time.time()
-        
-        self.calls.append(now)
-        self.last_call = now
+        self.base_url = api_base_url(region, base_url)
+        
+        # Shared by all worker threads fetching for this client, and by default with
+        # every other process using the same key on this region
+        if limiter is None:
+            limiter = self.key_pool if self.key_pool is not None else shared_limiter(api_key, region)
+        self.limiter = limiter
+        
+        # Match details are immutable, so a cached response is always current
+        self.cache = cache
+        
+        # One breaker per host, so every worker in this process pauses together when it is down
+        self.retry = retry
+        self.breaker = breaker if breaker is not None else breaker_for(self.base_url)
+        
+        # Pass one Telemetry to every client of a run to get run-wide numbers
+        self.telemetry = telemetry if telemetry is not None else Telemetry()
     
-    def get_match_ids(self, puuid: str, start_time: int, end_time: int,
-                      start: int = 0, count: int = 100, queue: Optional[int] = None) -> List[str]:
-        """Fetch match IDs with retry logic"""
-        max_retries = 5
-        base_delay = 60
+    def _get(self, method: str, url: str, params: Optional[Dict] = None) -> requests.Response:
+        """Issue one GET once the limiter allows it, then learn from its headers"""
+        self.telemetry.add_sleep(SLEEP_RATE_LIMIT, self.limiter.acquire(method))
+        # With a pool, acquire() picked the key this thread must send
+        api_key = self.key_pool.current_key() if self.key_pool is not None else self.api_key
+        started = time.perf_counter()
+        try:
+            response = requests.get(url, headers={"X-Riot-Token": api_key}, params=params,
+                                    timeout=REQUEST_TIMEOUT)
+        except requests.exceptions.RequestException as e:
+            self.telemetry.observe_request(method, type(e).__name__, time.perf_counter() - started)
+            # The server may still have counted it, so it keeps its token as if answered now
+            self.limiter.update_from_headers(method, {})
+            raise
+        self.telemetry.observe_request(method, response.status_code, time.perf_counter() - started)
+        self.limiter.update_from_headers(method, response.headers)
+        return response
+    
+    def _request_json(self, method: str, url: str, params: Optional[Dict] = None):
+        """
+        GET an endpoint under the retry policy and return the decoded JSON.
         
-        for attempt in range(max_retries):
-            self._wait_if_needed()
-            
-            url = f"https://{self.region}.api.riotgames.com/lol/match/v5/matches/by-puuid/{puuid}/ids"
-            params = {
-                "startTime": start_time // 1000,
-                "endTime": end_time // 1000,
-                "start": start,
-                "count": count
-            }
-            if queue:
-                params["queue"] = queue
-            
-            try:
-                response = requests.get(url, headers=self.headers, params=params)
+        Raises RequestFailed when the resource does not exist (404), the
+        request is rejected (other 4xx), or every retry failed, and
+        RiotAPIError on 401/403, since no retry helps a rejected or expired key.
+        """
+        attempt = 0
+        rate_limited = 0
+        calls = 0
+        reason, status = "no attempt made", None
+        try:
+            while attempt < self.retry.max_attempts:
+                self.telemetry.add_sleep(SLEEP_CIRCUIT_BREAKER, self.breaker.before_call())
+                calls += 1
+                try:
+                    response = self._get(method, url, params)
+                except requests.exceptions.RequestException as e:
+                    # Timeouts and connection errors
+                    reason, status = f"{type(e).__name__}: {e}", None
+                    self._server_failure(reason, attempt)
+                    attempt += 1
+                    continue
                 
-                if response.status_code == 429:
-                    retry_after = int(response.headers.get('Retry-After', base_delay * (attempt + 1)))
-                    print(f"  ⚠️  Rate limited! Waiting {retry_after}s...")
-                    time.sleep(retry_after)
+                status = response.status_code
+                outcome = classify(status)
+                if outcome == OUTCOME_SERVER_ERROR:
+                    reason = f"HTTP {status}"
+                    self._server_failure(reason, attempt)
+                    attempt += 1
                     continue
                 
-                response.raise_for_status()
-                return response.json()
+                # Anything but a server error means the upstream is answering
+                self.breaker.record_success()
                 
-            except requests.exceptions.RequestException as e:
-                if attempt < max_retries - 1:
-                    delay = base_delay * (attempt + 1)
-                    print(f"  ⚠️  Error: {e}. Retrying in {delay}s...")
-                    time.sleep(delay)
-                else:
-                    print(f"  ❌ Failed after {max_retries} attempts")
-                    return []
+                if outcome == OUTCOME_RATE_LIMITED:
+                    rate_limited += 1
+                    reason = "HTTP 429"
+                    if rate_limited > self.retry.max_rate_limited:
+                        break
+                    retry_after = self.retry.retry_after(response)
+                    if retry_after is None:
+                        retry_after = self.retry.backoff(attempt)
+                        attempt += 1
+                    print(f"  ⚠️  Rate limited! Waiting {retry_after:.1f}s...")
+                    self.limiter.block_for(retry_after)
+                    continue
+                if outcome == OUTCOME_UNAUTHORIZED:
+                    if self.key_pool is not None and self.key_pool.disable(f"HTTP {status}"):
+                        continue
+                    raise RiotAPIError(f"HTTP {status} from {url}: check the API key in .env")
+                if outcome in (OUTCOME_NOT_FOUND, OUTCOME_CLIENT_ERROR):
+                    raise RequestFailed(f"HTTP {status}: {response.text[:200]}", calls, status)
+                with self.telemetry.timed(STAGE_JSON_DECODE):
+                    return response.json()
+        except BaseException:
+            # A probe that raised must not leave the breaker half-open
+            self.breaker.abandon_probe()
+            raise
         
-        return []
+        raise RequestFailed(f"gave up after {calls} calls, last error {reason}", calls, status)
+    
+    def _server_failure(self, reason: str, attempt: int):
+        """Count a 5xx or timeout against the circuit breaker and back off before the next attempt"""
+        if self.breaker.record_failure():
+            # Pause every other process using this key on this region too
+            self.limiter.block_for(self.breaker.cooldown)
+            return
+        if attempt + 1 < self.retry.max_attempts:
+            delay = self.retry.backoff(attempt)
+            print(f"  ⚠️  {reason}. Retrying in {delay:.1f}s...")
+            time.sleep(delay)
+            self.telemetry.add_sleep(SLEEP_BACKOFF, delay)
+    
+    def get_match_ids(self, puuid: str, start_time: int, end_time: int,
+                      start: int = 0, count: int = 100,
+                      queue: Optional[int] = None) -> Optional[List[str]]:
+        """Fetch match IDs (None if the call failed for good)"""
+        url = f"{self.base_url}/lol/match/v5/matches/by-puuid/{puuid}/ids"
+        params = {
+            "startTime": start_time // 1000,
+            "endTime": end_time // 1000,
+            "start": start,
+            "count": count
+        }
+        if queue:
+            params["queue"] = queue
+        try:
+            return self._request_json(METHOD_MATCH_IDS, url, params)
+        except RequestFailed as e:
+            print(f"  ❌ Listing failed: {e}")
+            return None
     
-    def get_match_details(self, match_id: str) -> Optional[Dict]:
-        """Fetch match details with retry logic"""
-        max_retries = 5
-        base_delay = 60
+    def get_match_details(self, match_id: str) -> Dict:
+        """
+        Fetch match details, answering from the response cache when possible.
         
-        for attempt in range(max_retries):
-            self._wait_if_needed()
-            
-            url = f"https://{self.region}.api.riotgames.com/lol/match/v5/matches/{match_id}"
-            
-            try:
-                response = requests.get(url, headers=self.headers)
-                
-                if response.status_code == 429:
-                    retry_after = int(response.headers.get('Retry-After', base_delay * (attempt + 1)))
-                    print(f"\n  ⚠️  Rate limited! Pausing for {retry_after}s...")
-                    time.sleep(retry_after)
-                    continue
-                
-                response.raise_for_status()
-                return response.json()
-                
-            except requests.exceptions.RequestException as e:
-                if attempt < max_retries - 1:
-                    delay = base_delay * (attempt + 1)
-                    print(f"\n  ⚠️  Error: {e}. Retrying in {delay}s...")
-                    time.sleep(delay)
-                else:
-                    print(f"\n  ❌ Failed after {max_retries} attempts")
-                    return None
+        Raises RequestFailed if they cannot be fetched.
+        """
+        if self.cache is not None:
+            cached = self.cache.get(match_id)
+            if cached is not None:
+                self.telemetry.count('matches_from_cache')
+                return cached
         
-        return None
+        url = f"{self.base_url}/lol/match/v5/matches/{match_id}"
+        match_data = self._request_json(METHOD_MATCH_DETAILS, url)
+        self.telemetry.count('matches_fetched')
+        if self.cache is not None:
+            with self.telemetry.timed(STAGE_CACHE_WRITE):
+                self.cache.put(match_id, match_data)
+        return match_data
 
 
-def load_api_key() -> str:
-    """Load Riot API key"""
+def load_api_keys() -> List[str]:
+    """Load Riot API keys (RIOT_API_KEY, plus any comma-separated RIOT_API_KEYS)"""
     if not API_KEY_FILE.exists():
         print("Error: .env file not found")
         sys.exit(1)
     
-    with open(API_KEY_FILE) as f:
-        for line in f:
-            if line.startswith('RIOT_API_KEY='):
-                return line.strip().split('=', 1)[1]
+    api_keys = read_api_keys(API_KEY_FILE)
+    if api_keys:
+        return api_keys
     
     print("Error: RIOT_API_KEY not found in .env")
     sys.exit(1)
@@ -192,70 +261,552 @@ def load_players() -> Dict:
         return json.load(f)
 
 
-def extract_month(client: RiotAPIClient, puuid: str, player_id: str,
-                  month_key: str, start_time: int, end_time: int) -> int:
-    """Extract matches for a specific month"""
-    data_dir = Path(f"data/{player_id}")
-    data_dir.mkdir(parents=True, exist_ok=True)
+def routing_region(region: str) -> str:
+    """Regional route for a player's region, given either as a route or as a platform ID"""
+    value = region.strip().lower()
+    if value in ROUTING_REGIONS:
+        return value
+    if value in PLATFORM_ROUTING:
+        return PLATFORM_ROUTING[value]
+    raise ValueError(f"Unknown region {region!r} (expected one of {', '.join(ROUTING_REGIONS)} "
+                     f"or a platform ID such as na1)")
+
+
+def players_by_region(players: List[Dict]) -> Dict[str, List[Dict]]:
+    """Group players by regional route, keeping their order within each route"""
+    regions: Dict[str, List[Dict]] = {}
+    for player in players:
+        regions.setdefault(routing_region(player['region']), []).append(player)
+    return regions
+
+
+def queue_name(queue: Optional[int]) -> str:
+    if queue is None:
+        return "All queues"
+    return QUEUE_NAMES.get(queue, f"Queue {queue}")
+
+
+def parse_queues(value: str) -> Optional[List[int]]:
+    """Parse a --queues value: comma-separated queue IDs, or "all" (returned as None)"""
+    if value.strip().lower() == "all":
+        return None
+    return [int(part) for part in value.split(',') if part.strip()]
+
+
+def is_target_match(match_data: Dict, queues: Optional[Collection[int]],
+                    start_time: int, end_time: int) -> bool:
+    """Verify a fetched match is in one of the requested queues (None means any) and the timeframe"""
+    info = match_data.get('info', {})
+    if queues is not None and info.get('queueId') not in queues:
+        return False
+    return start_time <= info.get('gameCreation', 0) <= end_time
+
+
+def fetch_match_details(client: RiotAPIClient, match_ids: List[str], concurrency: int = 1,
+                        store: Optional[MatchStore] = None):
+    """
+    Yield (match_id, match_data, from_store, error) for each ID, in listing order.
     
-    output_file = data_dir / f"raw_matches_{month_key}.json"
+    A match that could not be fetched comes back with match_data None and the
+    RequestFailed that explains why as error.
     
-    print(f"\n📅 Extracting {month_key}...")
+    Matches already in the store are answered from its catalog instead of the
+    API (as a summary with just the ID, queue and gameCreation), and newly
+    fetched ones are appended to it. With concurrency > 1 up to that many
+    detail requests are kept in flight; the client's rate limiter decides
+    when each one may actually start.
+    """
+    def load_or_fetch(match_id: str):
+        if store is not None:
+            match_data = store.summary(match_id)
+            if match_data is not None:
+                client.telemetry.count('matches_from_store')
+                return match_data, True, None
+        
+        try:
+            match_data = client.get_match_details(match_id)
+        except RequestFailed as e:
+            return None, False, e
+        if store is not None:
+            with client.telemetry.timed(STAGE_STORE_WRITE):
+                store.put(match_data)
+        return match_data, False, None
     
-    all_matches = []
+    if concurrency <= 1:
+        for match_id in match_ids:
+            yield (match_id,) + load_or_fetch(match_id)
+        return
     
-    # Extract for each queue
-    for queue in TARGET_QUEUES:
-        queue_name = "Draft Normal" if queue == 400 else "Ranked Solo/Duo"
-        print(f"  🎮 Queue: {queue_name} ({queue})")
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for match_id, result in zip(match_ids, executor.map(load_or_fetch, match_ids)):
+            yield (match_id,) + result
+
+
+def seed_watermarks(index: PlayerMatchIndex, watermarks: WatermarkStore):
+    """Derive watermarks from a player's indexed matches"""
+    for match_id, entry in index.entries.items():
+        watermarks.advance(entry['queue'], entry['game_creation'], match_id)
+
+
+def list_new_match_ids(client: RiotAPIClient, puuid: str, queue: Optional[int],
+                       watermark: Dict, end_time: int) -> Optional[List[str]]:
+    """
+    List match IDs newer than a watermark, newest first, stopping at the first known ID.
+    
+    Returns None if a listing call fails, since a partial newest-first list
+    would let the watermark skip the matches that were never listed.
+    """
+    new_ids = []
+    start_index = 0
+    while True:
+        match_ids = client.get_match_ids(puuid, watermark['game_creation'], end_time,
+                                         start_index, 100, queue)
+        if match_ids is None:
+            return None
+        for match_id in match_ids:
+            if match_id == watermark['match_id']:
+                return new_ids
+            new_ids.append(match_id)
         
-        start_index = 0
-        while True:
-            match_ids = client.get_match_ids(puuid, start_time, end_time, start_index, 100, queue)
+        if len(match_ids) < 100:
+            return new_ids
+        start_index += 100
+
+
+def seal_finished_months(store: MatchStore):
+    """Compact journals of months that are over into sealed segments"""
+    for month_key, count in store.compact_finished_months().items():
+        print(f"  🗜️  Sealed {month_key}: {count} matches")
+
+
+class PlayerExtraction:
+    """
+    Extraction of one player's matches into the shared store.
+    
+    Holds everything the listing and detail steps share: the API client, the
+    shared match store, and the player's index, watermarks and checkpoint.
+    
+    By default match IDs are listed once per target queue. In single-pass mode
+    each window is listed once with no queue filter and every listed match is
+    routed by its info.queueId after the detail fetch, so listing calls do not
+    grow with the number of queues tracked. queues=None tracks every queue and
+    implies single-pass.
+    """
+    
+    def __init__(self, client: RiotAPIClient, player_id: str, puuid: str,
+                 store: Optional[MatchStore] = None, concurrency: int = DEFAULT_CONCURRENCY,
+                 restart: bool = False, queues: Optional[List[int]] = TARGET_QUEUES,
+                 single_pass: bool = False):
+        self.client = client
+        self.player_id = player_id
+        self.puuid = puuid
+        self.concurrency = concurrency
+        self.queues = queues
+        self.single_pass = single_pass or queues is None
+        # Queue filter of each listing pass (None lists every queue at once)
+        self.listing_queues: List[Optional[int]] = [None] if self.single_pass else list(queues)
+        self.data_dir = Path(f"data/{player_id}")
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        
+        self.store = store if store is not None else MatchStore()
+        self.index = PlayerMatchIndex(self.data_dir)
+        if not self.index.exists():
+            imported = import_raw_files(self.data_dir, self.store, self.index)
+            if imported:
+                print(f"\n📦 Imported {imported} matches from raw_matches_*.json into the shared store")
+        
+        self.watermarks = WatermarkStore(self.data_dir)
+        if not self.watermarks.marks:
+            seed_watermarks(self.index, self.watermarks)
+        if self.single_pass and not self.watermarks.get(None) and self.queues:
+            # Switching from per-queue listing: the oldest queue watermark is safe for all of them
+            marks = [self.watermarks.get(queue) for queue in self.queues]
+            if all(marks):
+                self.watermarks.ensure(None, min(mark['game_creation'] for mark in marks))
+        
+        checkpoint_file = self.data_dir / ExtractionCheckpoint.FILENAME
+        if restart and checkpoint_file.exists():
+            checkpoint_file.unlink()
+        self.checkpoint = ExtractionCheckpoint(self.data_dir)
+        self.dead_letters = DeadLetterQueue(self.data_dir)
+        
+        self.reused = 0
+        self.skipped = 0
+        # Detail fetches that failed for good this run (kept in the dead-letter queue)
+        self.failed = 0
+    
+    def _targets(self, listing_queue: Optional[int]) -> Optional[List[int]]:
+        """Queues a listing pass files matches for (None means any queue)"""
+        return self.queues if listing_queue is None else [listing_queue]
+    
+    def has_watermarks(self) -> bool:
+        return all(self.watermarks.get(queue) for queue in self.listing_queues)
+    
+    def _file_match(self, match_data: Dict, listing_queue: Optional[int],
+                    start_time: int, end_time: int, advance_watermarks: bool = True) -> int:
+        """Index a fetched match if it is wanted (moving the watermarks). Returns 1 if it was added."""
+        if (advance_watermarks and listing_queue is None
+                and start_time <= match_data['info']['gameCreation'] <= end_time):
+            self.watermarks.advance(None, match_data['info']['gameCreation'],
+                                    match_data['metadata']['matchId'])
+        
+        if not is_target_match(match_data, self._targets(listing_queue), start_time, end_time):
+            # Still stored, so a later run tracking this queue can reuse it without a fetch
+            self.skipped += 1
+            return 0
+        
+        if advance_watermarks:
+            self.watermarks.advance_from_match(match_data)
+        return int(self.index.add(match_data))
+    
+    def _dead_letter(self, match_id: str, error: RequestFailed, window: Optional[str],
+                     queue: Optional[int], start_time: int, end_time: int):
+        self.failed += 1
+        self.dead_letters.record(match_id, error.reason, error.attempts, error.status, {
+            'window': window, 'queue': queue, 'targets': self._targets(queue),
+            'start_time': start_time, 'end_time': end_time,
+        })
+    
+    def _store_details(self, key: str, queue: Optional[int], match_ids: List[str],
+                       start_time: int, end_time: int) -> int:
+        """Fetch (or reuse) details for listed IDs and file target matches under this player"""
+        progress = self.checkpoint.get(key, queue)
+        pending = [match_id for match_id in match_ids if match_id not in progress.stored]
+        added = 0
+        
+        details = fetch_match_details(self.client, pending, self.concurrency, self.store)
+        for i, (match_id, match_data, from_store, error) in enumerate(details, 1):
+            print(f"      Fetched match {i}/{len(pending)}: {match_id}                    ", end='\r')
             
-            if not match_ids:
-                break
+            if error is not None:
+                self._dead_letter(match_id, error, key, queue, start_time, end_time)
+                if error.permanent:
+                    # Nothing to fetch, so it must not keep the window open
+                    self.checkpoint.record_stored(key, queue, match_id)
+                continue
+            
+            self.dead_letters.resolve(match_id)
+            # Watermarks wait until the whole range is stored (see _settle_watermarks)
+            filed = self._file_match(match_data, queue, start_time, end_time, advance_watermarks=False)
+            added += filed
+            if filed and from_store:
+                self.reused += 1
+            self.checkpoint.record_stored(key, queue, match_id)
+        
+        if pending:
+            print()  # New line
+        return added
+    
+    def extract_window(self, queue: Optional[int], start_time: int, end_time: int, depth: int = 0):
+        """
+        List and fetch one window, halving it whenever a listing fills a whole page.
+        
+        Windows are keyed and halved by their nominal bounds, so the current
+        year's windows keep their keys from run to run. A listing is pinned
+        to now at most; once such a window is done, the next run lists again
+        only what may have changed: a split window keeps its finished halves
+        and a leaf is listed anew. A window starting after now is left for
+        later runs (counted as complete, never marked done).
+        
+        Returns:
+            (matches added, whether the window is now complete)
+        """
+        key = window_key(start_time, end_time)
+        indent = "  " * depth
+        progress = self.checkpoint.get(key, queue)
+        
+        if progress.done and progress.end_time >= end_time:
+            return 0, True
+        now = now_ms()
+        if start_time > now:
+            return 0, True
+        
+        if progress.end_time is None or (progress.done and not progress.split):
+            # Pin the listing end so pagination offsets stay stable across restarts
+            progress = self.checkpoint.start(key, queue, min(end_time, now))
+        listing_end = progress.end_time
+        
+        if not progress.split and 0 not in progress.pages:
+            match_ids = self.client.get_match_ids(self.puuid, start_time, listing_end, 0, PAGE_SIZE, queue)
+            if match_ids is None:
+                print(f"    {indent}⚠️  Listing failed for {describe_window(start_time, listing_end)}; "
+                      f"will resume here next run")
+                return 0, False
             
-            print(f"    Found {len(match_ids)} match IDs (offset {start_index})")
+            if len(match_ids) == PAGE_SIZE and can_split(start_time, end_time):
+                self.checkpoint.mark_split(key, queue)
+                self.client.telemetry.count('windows_split')
+            else:
+                self.checkpoint.record_page(key, queue, 0, match_ids)
+        
+        if progress.split:
+            added = 0
+            complete = True
+            for child_start, child_end in split_window(start_time, end_time):
+                child_added, child_complete = self.extract_window(queue, child_start, child_end, depth + 1)
+                added += child_added
+                complete = complete and child_complete
+            if complete:
+                self.checkpoint.mark_done(key, queue, min(end_time, now))
+            return added, complete
+        
+        # Leaf window: everything fits in one page, or the window is too short to split
+        offset = 0
+        match_ids = progress.pages[0]
+        if match_ids:
+            print(f"    {indent}📅 {describe_window(start_time, listing_end)}: {len(match_ids)} match IDs")
+        added = 0
+        while True:
+            added += self._store_details(key, queue, match_ids, start_time, end_time)
+            if len(match_ids) < PAGE_SIZE:
+                break
             
-            # Fetch details for each match
-            for i, match_id in enumerate(match_ids, 1):
-                print(f"    Fetching match {i}/{len(match_ids)}: {match_id}                    ", end='\r')
+            offset += PAGE_SIZE
+            match_ids = progress.pages.get(offset)
+            if match_ids is None:
+                match_ids = self.client.get_match_ids(self.puuid, start_time, listing_end,
+                                                      offset, PAGE_SIZE, queue)
+                if match_ids is None:
+                    print(f"    {indent}⚠️  Listing failed at offset {offset}; will resume here next run")
+                    return added, False
+                self.checkpoint.record_page(key, queue, offset, match_ids)
+            print(f"    {indent}   +{len(match_ids)} match IDs (offset {offset})")
+        
+        complete = len(progress.stored) >= len(set(progress.listed))
+        if complete:
+            self.checkpoint.mark_done(key, queue)
+        return added, complete
+    
+    def extract_range(self, start_time: int, end_time: Optional[int] = None) -> int:
+        """
+        Extract every listing pass over [start_time, end_time], one calendar
+        year at a time, newest year first.
+        
+        With no end_time the range is open-ended: the current year keeps its
+        calendar bounds (so its checkpoint keys, halves included, are stable)
+        and is listed up to now, and once every window is complete the watermarks are set so later
+        runs can go incremental.
+        """
+        total_matches = 0
+        open_ended = end_time is None
+        searched_until = now_ms() if open_ended else min(end_time, now_ms())
+        if open_ended:
+            end_time = year_end(searched_until)
+        
+        complete = True
+        for window_start, window_end in reversed(year_windows(start_time, end_time)):
+            print(f"\n  📆 {describe_window(window_start, min(window_end, searched_until))}")
+            for queue in self.listing_queues:
+                if queue is None:
+                    print(f"  🎮 Single pass over {self._describe_targets()}")
+                else:
+                    print(f"  🎮 Queue: {queue_name(queue)} ({queue})")
                 
-                match_data = client.get_match_details(match_id)
-                if match_data:
-                    # Verify correct queue and timeframe
-                    info = match_data.get('info', {})
-                    if info.get('queueId') == queue and start_time <= info.get('gameCreation', 0) <= end_time:
-                        all_matches.append(match_data)
-                        
-                        # Save progress every 20 matches
-                        if len(all_matches) % 20 == 0:
-                            with open(output_file, 'w') as f:
-                                json.dump(all_matches, f, indent=2)
-                            print(f"    💾 Progress saved: {len(all_matches)} matches                    ", end='\r')
+                try:
+                    with self.client.telemetry.timed(STAGE_YEAR_WINDOW):
+                        added, window_complete = self.extract_window(queue, window_start, window_end)
+                    total_matches += added
+                    complete = complete and window_complete
+                    self.client.telemetry.count('windows_completed' if window_complete
+                                                else 'windows_incomplete')
+                except RiotAPIError:
+                    raise
+                except Exception as e:
+                    print(f"  ❌ Error extracting {describe_window(window_start, window_end)}: {e}")
+                    complete = False
+                    continue
+        
+        if complete and open_ended:
+            self._settle_watermarks(searched_until)
+        elif not complete:
+            print("\n  ⚠️  Some windows are incomplete; they resume on the next run")
+        return total_matches
+    
+    def _settle_watermarks(self, searched_until: int):
+        """
+        Set watermarks from the newest indexed match of each queue.
+        
+        Only called once the whole history up to now is stored. Range
+        extraction runs newest first, so a watermark set part way through
+        would let an incremental run skip the older windows still missing.
+        """
+        for match_id, entry in self.index.entries.items():
+            self.watermarks.advance(entry['queue'], entry['game_creation'], match_id)
+            if self.single_pass:
+                self.watermarks.advance(None, entry['game_creation'], match_id)
+        for queue in self.listing_queues + (self.queues or []):
+            self.watermarks.ensure(queue, searched_until)
+    
+    def _describe_targets(self) -> str:
+        if self.queues is None:
+            return "all queues"
+        return ", ".join(f"{queue_name(queue)} ({queue})" for queue in self.queues)
+    
+    def extract_incremental(self) -> int:
+        """Fetch only matches newer than each listing pass's watermark"""
+        marks = {queue: self.watermarks.get(queue) for queue in self.listing_queues}
+        return self._extract_since(marks, now_ms(), advance_watermarks=True)
+    
+    def extract_recent(self, since: int, end_time: Optional[int] = None) -> int:
+        """
+        Fetch the newest matches back to `since`, newest first.
+        
+        Used for a player with no watermarks yet. Nothing is checkpointed and
+        the watermarks are left alone; the range extraction that follows
+        reuses these matches from the store.
+        """
+        floor = {'game_creation': since, 'match_id': None}
+        marks = {queue: floor for queue in self.listing_queues}
+        return self._extract_since(marks, end_time if end_time is not None else now_ms(),
+                                   advance_watermarks=False)
+    
+    def _extract_since(self, marks: Dict[Optional[int], Dict], end_time: int,
+                       advance_watermarks: bool) -> int:
+        """List and fetch every listing pass's matches newer than its mark"""
+        added = 0
+        
+        for queue, watermark in marks.items():
+            since = datetime.fromtimestamp(watermark['game_creation'] / 1000).strftime('%Y-%m-%d %H:%M')
+            if queue is None:
+                print(f"  🎮 Single pass over {self._describe_targets()} since {since}")
+            else:
+                print(f"  🎮 Queue: {queue_name(queue)} ({queue}) since {since}")
             
-            print()  # New line
+            match_ids = list_new_match_ids(self.client, self.puuid, queue, watermark, end_time)
+            if match_ids is None:
+                print("    ⚠️  Listing failed; queue left at its current watermark")
+                continue
+            print(f"    Found {len(match_ids)} new match IDs")
             
-            # Check if more matches exist
-            if len(match_ids) < 100:
-                break
+            held = dict(self.watermarks.marks)
+            failed = 0
+            details = fetch_match_details(self.client, match_ids, self.concurrency, self.store)
+            for match_id, match_data, _, error in details:
+                if error is not None:
+                    self._dead_letter(match_id, error, None, queue, watermark['game_creation'], end_time)
+                    failed += not error.permanent
+                    continue
+                self.dead_letters.resolve(match_id)
+                added += self._file_match(match_data, queue, watermark['game_creation'], end_time,
+                                          advance_watermarks)
             
-            start_index += 100
+            if failed:
+                if advance_watermarks:
+                    # Moving past a match that never arrived would skip it forever
+                    self.watermarks.marks = held
+                    print(f"    ⚠️  {failed} matches could not be fetched; watermark held back "
+                          f"so the next run lists them again")
+        
+        return added
+    
+    def check_consistency(self) -> Dict[str, int]:
+        """
+        Compare the IDs this player has listed or indexed with what the shared store holds.
+        
+        Every listed or indexed match missing from the store that is not
+        already dead-lettered is added to the dead-letter queue, so a repair
+        fetches it.
+        
+        Returns:
+            Counts of listed, indexed, missing and newly dead-lettered matches
+        """
+        counts = {'listed': 0, 'indexed': len(self.index), 'missing': 0, 'dead_lettered': 0}
+        holes: Dict[str, Dict] = {}
+        
+        for (window, queue), progress in self.checkpoint.progress.items():
+            start_time, end_time = (int(part) for part in window.split('-'))
+            for match_id in set(progress.listed):
+                counts['listed'] += 1
+                if not self.store.contains(match_id):
+                    holes.setdefault(match_id, {
+                        'window': window, 'queue': queue, 'targets': self._targets(queue),
+                        'start_time': start_time, 'end_time': end_time,
+                    })
+        
+        for match_id, entry in self.index.entries.items():
+            if not self.store.contains(match_id):
+                holes.setdefault(match_id, {
+                    'window': None, 'queue': entry['queue'], 'targets': [entry['queue']],
+                    'start_time': entry['game_creation'], 'end_time': entry['game_creation'],
+                })
+        
+        counts['missing'] = len(holes)
+        for match_id, listing in holes.items():
+            if match_id not in self.dead_letters:
+                self.dead_letters.record(match_id, "missing from the store", 0, None, listing)
+                counts['dead_lettered'] += 1
+        return counts
     
-    # Save final results
-    with open(output_file, 'w') as f:
-        json.dump(all_matches, f, indent=2)
+    def repair(self, include_permanent: bool = False) -> int:
+        """
+        Fetch every dead-lettered match again and file the ones that arrive.
+        
+        Costs one detail call per dead letter (none for matches another
+        player has stored since), instead of listing their windows again.
+        
+        Returns:
+            Number of matches repaired
+        """
+        pending = self.dead_letters.pending(include_permanent)
+        repaired = 0
+        details = fetch_match_details(self.client, [match_id for match_id, _ in pending],
+                                      self.concurrency, self.store)
+        for (match_id, match_data, _, error), (_, letter) in zip(details, pending):
+            if error is not None:
+                self.failed += 1
+                self.dead_letters.record(match_id, error.reason, error.attempts, error.status,
+                                         {key: letter[key] for key in
+                                          ('window', 'queue', 'targets', 'start_time', 'end_time')})
+                continue
+            
+            if is_target_match(match_data, letter['targets'], letter['start_time'], letter['end_time']):
+                self.index.add(match_data)
+            if letter['window'] is not None:
+                self.checkpoint.record_stored(letter['window'], letter['queue'], match_id)
+            self.dead_letters.resolve(match_id)
+            repaired += 1
+        return repaired
     
-    print(f"  ✅ Extracted {len(all_matches)} matches")
-    return len(all_matches)
+    def finish(self):
+        """Make the player's index, watermarks, checkpoint and dead letters durable"""
+        self.index.sync()
+        self.watermarks.save()
+        self.checkpoint.rewrite()
+        self.dead_letters.rewrite()
+
 
+def publish_player(player_id: str, puuid: str, store: MatchStore):
+    """Rebuild a player's dashboard CSVs from whatever is stored so far"""
+    try:
+        transform_player(player_id, puuid, store)
+    except Exception as e:
+        print(f"  ⚠️  Could not publish {player_id}: {e}")
 
-def extract_player(player: Dict, api_key: str) -> int:
-    """Extract all data for a player"""
+
+def extract_player(player: Dict, key_pool: ApiKeyPool, concurrency: int = DEFAULT_CONCURRENCY,
+                   incremental: bool = False, store: Optional[MatchStore] = None,
+                   restart: bool = False, start_time: Optional[int] = None,
+                   end_time: Optional[int] = None, queues: Optional[List[int]] = TARGET_QUEUES,
+                   single_pass: bool = False, cache: Optional[ResponseCache] = None,
+                   scheduler: Optional[FairShareScheduler] = None, publish: bool = True,
+                   base_url: Optional[str] = None, telemetry: Optional[Telemetry] = None) -> int:
+    """
+    Extract all data for a player in two lanes, resuming from its checkpoint unless restart is set.
+    
+    The live lane fetches the newest matches first (everything since the
+    watermarks, or the last LIVE_LANE_DAYS for a new player) and publishes
+    them to the dashboard straight away. The backfill lane then walks the
+    rest of the range, newest year first. Under a scheduler, live calls from
+    any player go before backfill calls, so backfill runs on leftover budget.
+    With incremental set, a player whose watermarks exist stops after the
+    live lane.
+    """
     player_id = player['id']
     puuid = player['puuid']
-    region = player['region']
+    region = routing_region(player['region'])
+    start_time = start_time if start_time is not None else parse_date(DEFAULT_START_DATE)
+    if store is None:
+        store = MatchStore()
     
     print(f"\n{'='*70}")
     print(f"👤 Player: {player['display_name']} ({player['riot_id']})")
@@ -263,30 +814,300 @@ def extract_player(player: Dict, api_key: str) -> int:
     print(f"   Region: {region}")
     print(f"{'='*70}")
     
-    client = RiotAPIClient(api_key, region)
+    if scheduler is not None:
+        weight = player.get('weight', 1)
+        live_limiter = scheduler.budget(player_id, weight, LANE_LIVE)
+        backfill_limiter = scheduler.budget(player_id, weight, LANE_BACKFILL)
+    else:
+        live_limiter = backfill_limiter = key_pool
+    live_client = RiotAPIClient(key_pool, region, base_url, limiter=live_limiter, cache=cache,
+                                telemetry=telemetry)
+    backfill_client = RiotAPIClient(key_pool, region, base_url, limiter=backfill_limiter, cache=cache,
+                                    telemetry=telemetry)
+    extraction = PlayerExtraction(live_client, player_id, puuid, store, concurrency, restart,
+                                  queues, single_pass)
     
-    total_matches = 0
+    has_watermarks = extraction.has_watermarks()
+    if has_watermarks and end_time is None:
+        print("\n⚡ Live lane: matches since the last run")
+        live_matches = extraction.extract_incremental()
+    else:
+        live_end = end_time if end_time is not None else now_ms()
+        live_start = max(start_time, live_end - LIVE_LANE_DAYS * DAY_MS)
+        print(f"\n⚡ Live lane: {describe_window(live_start, live_end)}")
+        live_matches = extraction.extract_recent(live_start, live_end)
+    extraction.finish()
+    print(f"   {live_matches} new matches")
+    if publish and live_matches:
+        publish_player(player_id, puuid, store)
     
-    # Extract each month
-    for month_key, (start_time, end_time) in MONTHS.items():
-        try:
-            match_count = extract_month(client, puuid, player_id, month_key, start_time, end_time)
-            total_matches += match_count
-        except Exception as e:
-            print(f"  ❌ Error extracting {month_key}: {e}")
-            continue
+    if incremental and has_watermarks:
+        print(f"\n✅ Added {live_matches} new matches for {player['display_name']}")
+        if extraction.failed:
+            print(f"   Failed to fetch: {extraction.failed} (dead-lettered; fix with --repair)")
+        return live_matches
+    
+    if incremental:
+        print("\n⚠️  No watermark for every queue yet, running a full extraction first")
+    
+    print(f"\n🕰️  Backfill lane: {describe_window(start_time, end_time or now_ms())}")
+    extraction.client = backfill_client
+    backfill_matches = extraction.extract_range(start_time, end_time)
+    extraction.finish()
+    if publish and backfill_matches:
+        publish_player(player_id, puuid, store)
+    total_matches = live_matches + backfill_matches
     
     print(f"\n{'='*70}")
     print(f"✅ Extraction complete for {player['display_name']}")
-    print(f"   Total matches: {total_matches}")
+    print(f"   New matches: {total_matches} ({extraction.reused} already in the shared store)")
+    if extraction.skipped:
+        print(f"   Skipped (other queues): {extraction.skipped}")
+    if extraction.failed:
+        print(f"   Failed to fetch: {extraction.failed} (dead-lettered; fix with --repair)")
+    print(f"   Total indexed: {len(extraction.index)}")
     print(f"{'='*70}")
     
     return total_matches
 
 
+def repair_player(player: Dict, key_pool: ApiKeyPool, store: MatchStore, check: bool = True,
+                  repair: bool = True, include_permanent: bool = False,
+                  concurrency: int = DEFAULT_CONCURRENCY, cache: Optional[ResponseCache] = None,
+                  queues: Optional[List[int]] = TARGET_QUEUES, single_pass: bool = False,
+                  base_url: Optional[str] = None, telemetry: Optional[Telemetry] = None) -> int:
+    """
+    Check a player's listed and indexed matches against the store and/or
+    re-fetch its dead-lettered matches.
+    
+    Returns:
+        Number of matches repaired
+    """
+    client = RiotAPIClient(key_pool, routing_region(player['region']), base_url, cache=cache,
+                           telemetry=telemetry)
+    extraction = PlayerExtraction(client, player['id'], player['puuid'], store, concurrency,
+                                  queues=queues, single_pass=single_pass)
+    print(f"\n👤 {player['display_name']} ({player['id']})")
+    
+    if check:
+        counts = extraction.check_consistency()
+        print(f"   Listed: {counts['listed']}  Indexed: {counts['indexed']}  "
+              f"Missing from the store: {counts['missing']} ({counts['dead_lettered']} newly dead-lettered)")
+    
+    repaired = 0
+    if repair:
+        pending = len(extraction.dead_letters.pending(include_permanent))
+        if pending:
+            print(f"   🩹 Re-fetching {pending} dead-lettered matches")
+            repaired = extraction.repair(include_permanent)
+            print(f"   Repaired: {repaired}  Still failing: {extraction.failed}")
+    
+    permanent = len(extraction.dead_letters) - len(extraction.dead_letters.pending())
+    if permanent and not include_permanent:
+        print(f"   {permanent} dead letters are 404s (use --include-missing to retry them)")
+    extraction.finish()
+    return repaired
+
+
+def plan_players(players: List[Dict], key_pools: Dict[str, ApiKeyPool], store: MatchStore,
+                 start_time: int, end_time: Optional[int] = None,
+                 queues: Optional[List[int]] = TARGET_QUEUES, single_pass: bool = False,
+                 cache: Optional[ResponseCache] = None, concurrency: int = DEFAULT_CONCURRENCY,
+                 base_url: Optional[str] = None, telemetry: Optional[Telemetry] = None,
+                 budget_hours: Optional[float] = None) -> Dict:
+    """
+    Dry-run every player's extraction and print a per-player, per-month plan.
+    
+    Only listing calls are made, recorded in each player's extraction
+    checkpoint so neither a later plan nor the extraction lists them again.
+    Each region's detail fetches are estimated against its key pool, and
+    regions run in parallel, so the run takes as long as the slowest one.
+    With budget_hours, also prints how many keys each region needs to
+    finish within it. The plan is saved to data/extraction_plan.json.
+    """
+    telemetry = telemetry if telemetry is not None else Telemetry()
+    # IDs already counted for fetching, so a game shared by two players costs one call
+    seen = set()
+    plan = {'players': {}, 'regions': {}}
+    for region, region_players in players_by_region(players).items():
+        key_pool = key_pools[region]
+        client = RiotAPIClient(key_pool, region, base_url, telemetry=telemetry)
+        region_plans = []
+        for player in region_players:
+            print(f"\n👤 {player['display_name']} ({player['id']}, {region})")
+            planner = ExtractionPlanner(client, player['id'], player['puuid'], store, queues,
+                                        single_pass, cache, seen)
+            months = planner.plan(start_time, end_time)
+            for line in plan_lines(months):
+                print(line)
+            region_plans.append(months)
+            plan['players'][player['id']] = {month: month_plan.to_dict()
+                                             for month, month_plan in months.items()}
+        
+        totals = region_totals(region_plans)
+        listing = telemetry.latency.get(METHOD_MATCH_IDS)
+        latency = listing.sum / listing.count if listing is not None and listing.count else 0.0
+        per_key = key_pool.usable()[0].limiter
+        seconds = estimate_seconds(totals['listing_pages'], totals['to_fetch'], per_key, len(key_pool),
+                                   latency, concurrency)
+        totals['estimated_seconds'] = round(seconds)
+        print(f"\n🧮 {region}: {totals['to_fetch']} detail calls + {totals['listing_pages']} listing calls "
+              f"≈ {format_duration(seconds)} with {len(key_pool)} key{'s' if len(key_pool) > 1 else ''}")
+        if budget_hours:
+            hint = pool_size_hint(totals['listing_pages'], totals['to_fetch'], per_key, budget_hours,
+                                  latency, concurrency)
+            print(f"   Needs {hint}")
+        plan['regions'][region] = totals
+    
+    longest = max(totals['estimated_seconds'] for totals in plan['regions'].values())
+    print(f"\n⏱️  Estimated extraction time: {format_duration(longest)} (regions run in parallel; "
+          f"retries and 429s come on top)")
+    plan['estimated_seconds'] = longest
+    PLAN_FILE.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write_json(PLAN_FILE, plan)
+    print(f"   Plan saved to {PLAN_FILE}")
+    return plan
+
+
+def extract_players_fair_share(players: List[Dict], key_pools: Dict[str, ApiKeyPool], **options) -> int:
+    """
+    Extract several players at once, splitting each region's rate budget between them.
+    
+    Every player runs in its own thread and its API calls go through one
+    FairShareScheduler per routing region, weighted by the optional "weight"
+    field of the player in players.json (default 1), with every player's live
+    lane ahead of any backfill. Output lines are prefixed with the player ID.
+    """
+    schedulers = {region: FairShareScheduler(key_pool, region) for region, key_pool in key_pools.items()}
+    
+    output = PrefixedOutput()
+    
+    def run(player: Dict) -> int:
+        output.set_label(player['id'])
+        try:
+            region = routing_region(player['region'])
+            return extract_player(player, key_pools[region], scheduler=schedulers[region], **options)
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            return 0
+    
+    with contextlib.redirect_stdout(output):
+        with ThreadPoolExecutor(max_workers=len(players)) as executor:
+            total_matches = sum(executor.map(run, players))
+    
+    for scheduler in schedulers.values():
+        print()
+        for line in scheduler.report():
+            print(line)
+    return total_matches
+
+
+def extract_regions_in_parallel(players: List[Dict], key_pools: Dict[str, ApiKeyPool], **options) -> int:
+    """
+    Extract each routing region's players one after another, all regions at once.
+    
+    Riot enforces rate limits per regional route, so every region gets its
+    own worker thread and key pool and never waits on another: the run takes
+    as long as the slowest region, not the sum of them. Output lines are
+    prefixed with the region and player ID.
+    """
+    regions = players_by_region(players)
+    elapsed: Dict[str, float] = {}
+    output = PrefixedOutput()
+    
+    def run(region: str, region_players: List[Dict]) -> int:
+        started = time.time()
+        total = 0
+        for player in region_players:
+            output.set_label(f"{region}/{player['id']}")
+            try:
+                total += extract_player(player, key_pools[region], **options)
+            except Exception as e:
+                print(f"❌ Error: {e}")
+        elapsed[region] = time.time() - started
+        return total
+    
+    started = time.time()
+    with contextlib.redirect_stdout(output):
+        with ThreadPoolExecutor(max_workers=len(regions)) as executor:
+            total_matches = sum(executor.map(run, regions.keys(), regions.values()))
+    
+    print(f"\n⏱️  Regions ran in parallel: {time.time() - started:.0f}s in total")
+    for region, region_players in regions.items():
+        print(f"   {region:<9} {len(region_players)} players  {elapsed[region]:.0f}s")
+    return total_matches
+
+
+def finish_telemetry(telemetry: Telemetry, writer: Optional[TelemetryWriter]):
+    """Write the run's final telemetry snapshot and print its summary"""
+    if writer is not None:
+        writer.stop()
+    print()
+    for line in telemetry.summary_lines():
+        print(line)
+    if writer is not None:
+        print(f"   Written to {writer.directory}/extraction.json and extraction.prom")
+
+
 def main():
     """Main function"""
-    api_key = load_api_key()
+    parser = argparse.ArgumentParser(description="Extract matches for all configured players")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help="Match detail requests kept in flight (default: %(default)s)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Only fetch matches newer than each player's stored watermarks")
+    parser.add_argument('--restart', action='store_true',
+                        help="Ignore saved extraction checkpoints and list every window again")
+    parser.add_argument('--since', default=DEFAULT_START_DATE,
+                        help="First day to extract, YYYY-MM-DD (default: %(default)s)")
+    parser.add_argument('--until', default=None,
+                        help="Last day to extract, YYYY-MM-DD (default: now)")
+    parser.add_argument('--queues', type=parse_queues, default=TARGET_QUEUES,
+                        help="Comma-separated queue IDs to keep, or 'all' (default: 400,420)")
+    parser.add_argument('--single-pass', action='store_true',
+                        help="List each window once without a queue filter and route matches "
+                             "by queue after fetching (implied by --queues all)")
+    parser.add_argument('--codec', choices=['gz', 'xz'], default=DEFAULT_SEGMENT_CODEC,
+                        help="Compression for months sealed at the end of the run (default: %(default)s)")
+    parser.add_argument('--cache', action='store_true',
+                        help="Also keep match detail responses in the response cache (off by default: "
+                             "the match store already answers for every stored match)")
+    parser.add_argument('--cache-max-mb', type=int, default=None,
+                        help="With --cache, evict the oldest cached responses beyond this size "
+                             "(default: unbounded)")
+    parser.add_argument('--no-publish', action='store_true',
+                        help="Do not rebuild each player's CSVs as its matches arrive")
+    parser.add_argument('--sequential', action='store_true',
+                        help="Extract each region's players one after another (regions still run "
+                             "in parallel) instead of sharing each region's rate budget between them")
+    parser.add_argument('--base-url', default=None,
+                        help="Send every call to this host instead of Riot's, e.g. the local "
+                             "stand-in server (default: $RIOT_API_BASE_URL, else Riot)")
+    parser.add_argument('--check', action='store_true',
+                        help="Instead of extracting, compare listed and indexed match IDs with the "
+                             "store and dead-letter any that are missing")
+    parser.add_argument('--repair', action='store_true',
+                        help="Instead of extracting, re-fetch only the dead-lettered matches")
+    parser.add_argument('--include-missing', action='store_true',
+                        help="With --repair, also retry matches the API answered 404 for")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="Instead of extracting, list match IDs only and print how many detail "
+                             "calls and how long each player and month would take")
+    parser.add_argument('--budget-hours', type=float, default=None,
+                        help="With --dry-run, also size each region's key pool to finish within "
+                             "this many hours")
+    parser.add_argument('--telemetry-dir', type=Path, default=TELEMETRY_DIR,
+                        help="Where the run's telemetry (extraction.json, extraction.prom) is "
+                             "written (default: %(default)s)")
+    parser.add_argument('--telemetry-interval', type=float, default=30.0,
+                        help="Seconds between telemetry snapshots during the run (default: %(default)s)")
+    parser.add_argument('--no-telemetry', action='store_true',
+                        help="Do not write telemetry files")
+    args = parser.parse_args()
+    start_time = parse_date(args.since)
+    end_time = parse_date(args.until) + DAY_MS - 1 if args.until else None
+    
+    api_keys = load_api_keys()
     players_data = load_players()
     
     if not players_data['players']:
@@ -294,33 +1115,108 @@ def main():
         sys.exit(1)
     
     print("="*70)
-    print(" League of Legends - Extract 2024-2025 Matches")
+    print(" League of Legends - Extract Matches")
     print("="*70)
     print(f"\n📋 Players: {len(players_data['players'])}")
     for p in players_data['players']:
         print(f"   • {p['display_name']} ({p['riot_id']})")
+    if len(api_keys) > 1:
+        print(f"🔑 API keys: {len(api_keys)}")
     print()
     
+    # One pool per routing region, so each key's limits are tracked per region
+    key_pools = {region: ApiKeyPool(api_keys, region)
+                 for region in players_by_region(players_data['players'])}
+    
+    # One Telemetry for every client of the run, snapshotted to disk as it goes
+    telemetry = Telemetry()
+    writer = None
+    if not args.no_telemetry:
+        writer = TelemetryWriter(telemetry, args.telemetry_dir, args.telemetry_interval).start()
+    
     total_matches = 0
+    store = MatchStore(codec=args.codec)
+    # The store answers for stored matches, so caching their responses too would keep them twice
+    cache = None
+    if args.cache:
+        max_bytes = args.cache_max_mb * 1024 * 1024 if args.cache_max_mb else None
+        cache = ResponseCache(max_bytes=max_bytes)
     
-    for i, player in enumerate(players_data['players'], 1):
-        print(f"\n{'='*70}")
-        print(f" Player {i}/{len(players_data['players'])}: {player['display_name']}")
-        print(f"{'='*70}")
-        
-        try:
-            count = extract_player(player, api_key)
-            total_matches += count
-        except Exception as e:
-            print(f"❌ Error: {e}")
-            continue
+    if args.dry_run:
+        plan_players(players_data['players'], key_pools, store, start_time, end_time, args.queues,
+                     args.single_pass, cache, args.concurrency, args.base_url, telemetry,
+                     args.budget_hours)
+        store.close()
+        if cache is not None:
+            cache.close()
+        for key_pool in key_pools.values():
+            key_pool.close()
+        finish_telemetry(telemetry, writer)
+        return
+    
+    if args.check or args.repair:
+        repaired = 0
+        for player in players_data['players']:
+            repaired += repair_player(player, key_pools[routing_region(player['region'])], store,
+                                      args.check, args.repair, args.include_missing,
+                                      args.concurrency, cache, args.queues, args.single_pass,
+                                      args.base_url, telemetry)
+        print(f"\n🩹 Repaired matches: {repaired}")
+        if repaired and not args.no_publish:
+            for player in players_data['players']:
+                publish_player(player['id'], player['puuid'], store)
+        store.close()
+        if cache is not None:
+            cache.close()
+        for key_pool in key_pools.values():
+            key_pool.close()
+        finish_telemetry(telemetry, writer)
+        return
+    
+    options = dict(concurrency=args.concurrency, incremental=args.incremental, store=store,
+                   restart=args.restart, start_time=start_time, end_time=end_time,
+                   queues=args.queues, single_pass=args.single_pass, cache=cache,
+                   publish=not args.no_publish, base_url=args.base_url, telemetry=telemetry)
+    
+    regions = players_by_region(players_data['players'])
+    if args.sequential and len(regions) > 1:
+        total_matches = extract_regions_in_parallel(players_data['players'], key_pools, **options)
+    elif args.sequential or len(players_data['players']) == 1:
+        for i, player in enumerate(players_data['players'], 1):
+            print(f"\n{'='*70}")
+            print(f" Player {i}/{len(players_data['players'])}: {player['display_name']}")
+            print(f"{'='*70}")
+            
+            try:
+                count = extract_player(player, key_pools[routing_region(player['region'])], **options)
+                total_matches += count
+            except Exception as e:
+                print(f"❌ Error: {e}")
+                continue
+    else:
+        total_matches = extract_players_fair_share(players_data['players'], key_pools, **options)
+    
+    seal_finished_months(store)
+    store.close()
+    if cache is not None:
+        cache.close()
+    for key_pool in key_pools.values():
+        if len(key_pool.keys) > 1:
+            print()
+            for line in key_pool.report():
+                print(line)
+        key_pool.close()
+    finish_telemetry(telemetry, writer)
     
     print("\n" + "="*70)
     print("🎉 Extraction Complete!")
     print(f"📊 Total matches: {total_matches}")
+    if cache is not None and cache.hits:
+        print(f"💾 Match details served from the response cache: {cache.hits}")
     print("="*70)
-    print("\nNext: Transform data")
-    print("  python src/transform_player_data.py")
+    if args.no_publish:
+        print("\nNext: Transform data")
+        print("  python src/transform_player_data.py")
 
 
 if __name__ == "__main__":
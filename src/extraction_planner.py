@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Extraction Planner
+Dry-run cost estimate for an extraction: lists match IDs (the cheap calls),
+counts the detail fetches still needed once stored matches are deduplicated,
+and estimates wall-clock time from the rate limits in force.
+"""
+
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from extraction_state import ExtractionCheckpoint
+from match_store import MatchStore, month_key_for
+from rate_limiter import METHOD_MATCH_DETAILS, METHOD_MATCH_IDS
+from response_cache import ResponseCache
+from window_planner import (PAGE_SIZE, can_split, month_windows, now_ms, split_window, window_key,
+                            year_end, year_windows)
+
+PLAN_FILE = Path("data/extraction_plan.json")
+
+# Most keys considered when sizing a key pool to fit a time budget
+MAX_POOL_SIZE = 64
+
+
+class MonthPlan:
+    """What extracting one month of one player costs"""
+
+    def __init__(self, month: str):
+        self.month = month
+        self.listed = 0
+        # Already in the shared store or the response cache: no detail call
+        self.stored = 0
+        # Listed for a player planned earlier in this run, so fetched only once
+        self.shared = 0
+        self.to_fetch = 0
+        # Listing calls an extraction of this month needs, and those this plan made
+        self.listing_pages = 0
+        self.listing_calls = 0
+        self.complete = True
+
+    def to_dict(self) -> Dict:
+        return {
+            'listed': self.listed,
+            'stored': self.stored,
+            'shared': self.shared,
+            'to_fetch': self.to_fetch,
+            'listing_pages': self.listing_pages,
+            'listing_calls': self.listing_calls,
+            'complete': self.complete,
+        }
+
+
+class ExtractionPlanner:
+    """
+    Dry run of one player's extraction over a date range.
+
+    Lists the same calendar-year windows as the extractor, halved the same
+    way (on a full page, paging with offsets below MIN_SPLIT_MS), and
+    records the listings in the player's extraction checkpoint under the
+    extractor's keys, so the extraction that follows reuses them instead
+    of listing again. No details are fetched and no window is marked done.
+
+    Results are bucketed per calendar month: a stored match by its
+    gameCreation, any other ID by a time estimated from its place in its
+    leaf window's listing (see spread_over), and listing calls by the
+    month their window's listing ends in. Windows are listed newest first;
+    IDs listed under several queues count once. `seen` collects the IDs that need fetching,
+    so pass one set to the planners of every player in a run to count a
+    match two tracked players shared only once.
+    """
+
+    def __init__(self, client, player_id: str, puuid: str, store: MatchStore,
+                 queues: Optional[List[int]], single_pass: bool = False,
+                 cache: Optional[ResponseCache] = None, seen: Optional[Set[str]] = None):
+        self.client = client
+        self.player_id = player_id
+        self.puuid = puuid
+        self.store = store
+        self.cache = cache
+        self.seen = seen if seen is not None else set()
+        self.listing_queues: List[Optional[int]] = (
+            [None] if single_pass or queues is None else list(queues))
+        self.checkpoint = ExtractionCheckpoint(Path(f"data/{player_id}"))
+        self.months: Dict[str, MonthPlan] = {}
+
+    def _month(self, timestamp_ms: int) -> MonthPlan:
+        key = month_key_for(timestamp_ms)
+        if key not in self.months:
+            self.months[key] = MonthPlan(key)
+        return self.months[key]
+
+    def _list_window(self, queue: Optional[int], start_time: int,
+                     end_time: int) -> Tuple[List[Tuple[str, int]], bool]:
+        """
+        Every match ID in a window, from the checkpoint where possible.
+
+        Returns:
+            ((match ID, estimated gameCreation) pairs, whether the listing is complete)
+        """
+        key = window_key(start_time, end_time)
+        progress = self.checkpoint.get(key, queue)
+        now = now_ms()
+        if start_time > now:
+            return [], True
+        stale = progress.done and progress.end_time < end_time
+        if progress.end_time is None or (stale and not progress.split):
+            # What the extractor does next: (re)start the listing pinned to now
+            progress = self.checkpoint.start(key, queue, min(end_time, now))
+        listing_end = progress.end_time
+        month = self._month(listing_end)
+        month.listing_pages += 1
+
+        if not progress.split and 0 not in progress.pages:
+            match_ids = self.client.get_match_ids(self.puuid, start_time, listing_end, 0, PAGE_SIZE, queue)
+            month.listing_calls += 1
+            if match_ids is None:
+                return [], False
+            if len(match_ids) == PAGE_SIZE and can_split(start_time, end_time):
+                self.checkpoint.mark_split(key, queue)
+            else:
+                self.checkpoint.record_page(key, queue, 0, match_ids)
+
+        if progress.split:
+            listed, complete = [], True
+            for child_start, child_end in split_window(start_time, end_time):
+                child_ids, child_complete = self._list_window(queue, child_start, child_end)
+                listed.extend(child_ids)
+                complete = complete and child_complete
+            return listed, complete
+
+        offset = 0
+        while len(progress.pages[offset]) == PAGE_SIZE:
+            offset += PAGE_SIZE
+            month.listing_pages += 1
+            if offset not in progress.pages:
+                match_ids = self.client.get_match_ids(self.puuid, start_time, listing_end,
+                                                      offset, PAGE_SIZE, queue)
+                month.listing_calls += 1
+                if match_ids is None:
+                    return spread_over(progress.listed, start_time, listing_end), False
+                self.checkpoint.record_page(key, queue, offset, match_ids)
+        return spread_over(progress.listed, start_time, listing_end), True
+
+    def _bucket(self, match_id: str, estimated_time: int) -> MonthPlan:
+        """Month a listed ID counts under: its stored gameCreation month, else its estimated one"""
+        entry = self.store.catalog.get(match_id)
+        if entry is not None and entry['month'] in self.months:
+            return self.months[entry['month']]
+        return self._month(estimated_time)
+
+    def _is_stored(self, match_id: str) -> bool:
+        return self.store.contains(match_id) or (self.cache is not None and match_id in self.cache)
+
+    def plan(self, start_time: int, end_time: Optional[int] = None) -> Dict[str, MonthPlan]:
+        """
+        Plan [start_time, end_time] (up to now if end_time is None).
+
+        Returns:
+            MonthPlan per month key (YYYY-MM), oldest first
+        """
+        searched_until = now_ms() if end_time is None else min(end_time, now_ms())
+        if end_time is None:
+            # The current year keeps its calendar bounds, as in PlayerExtraction.extract_range
+            end_time = year_end(searched_until)
+        self.months = {}
+        for month_start, _ in month_windows(start_time, searched_until):
+            self._month(month_start)
+        counted: Set[str] = set()
+
+        for window_start, window_end in reversed(year_windows(start_time, end_time)):
+            for queue in self.listing_queues:
+                listed, complete = self._list_window(queue, window_start, window_end)
+                if not complete:
+                    for month_start, _ in month_windows(window_start, min(window_end, searched_until)):
+                        self._month(month_start).complete = False
+
+                for match_id, estimated_time in listed:
+                    if match_id in counted:
+                        continue
+                    counted.add(match_id)
+                    month = self._bucket(match_id, estimated_time)
+                    month.listed += 1
+                    if self._is_stored(match_id):
+                        month.stored += 1
+                    elif match_id in self.seen:
+                        month.shared += 1
+                    else:
+                        month.to_fetch += 1
+                        self.seen.add(match_id)
+
+        self.checkpoint.rewrite()
+        return dict(sorted(self.months.items()))
+
+
+def spread_over(match_ids: List[str], start_time: int, end_time: int) -> List[Tuple[str, int]]:
+    """
+    Pair the IDs of one listing (newest first) with evenly spaced times in
+    [start_time, end_time], as an estimate of when each game was played.
+    """
+    step = (end_time - start_time) / max(len(match_ids), 1)
+    return [(match_id, int(end_time - (i + 0.5) * step)) for i, match_id in enumerate(match_ids)]
+
+
+def calls_seconds(calls: int, limits: List[Tuple[int, float]]) -> float:
+    """Shortest time `calls` calls can take under (count, window) limits, starting with every window empty"""
+    if calls <= 0 or not limits:
+        return 0.0
+    return max(((calls - 1) // count) * window for count, window in limits)
+
+
+def scale_limits(limits: List[Tuple[int, float]], keys: int) -> List[Tuple[int, float]]:
+    """Combined limits of `keys` keys that each have these limits"""
+    return [(count * keys, window) for count, window in limits]
+
+
+def estimate_seconds(listing_calls: int, detail_calls: int, limiter, keys: int = 1,
+                     latency: float = 0.0, concurrency: int = 1) -> float:
+    """
+    Estimated wall-clock time of an extraction's API calls.
+
+    The rate bound takes the app limits over every call and each method's
+    limits over its own calls, with the per-key limits of `limiter`
+    multiplied by `keys`. The latency bound assumes listing calls go one at
+    a time and detail calls `concurrency` at a time. The estimate is the
+    larger of the two; retries and 429s come on top.
+    """
+    rate_bound = max(
+        calls_seconds(listing_calls + detail_calls, scale_limits(limiter.limits(), keys)),
+        calls_seconds(listing_calls, scale_limits(limiter.limits(METHOD_MATCH_IDS), keys)),
+        calls_seconds(detail_calls, scale_limits(limiter.limits(METHOD_MATCH_DETAILS), keys)),
+    )
+    latency_bound = latency * (listing_calls + detail_calls / max(concurrency, 1))
+    return max(rate_bound, latency_bound)
+
+
+def keys_to_fit(listing_calls: int, detail_calls: int, limiter, budget_seconds: float,
+                latency: float = 0.0, concurrency: int = 1) -> Optional[int]:
+    """Fewest keys (with `limiter`'s per-key limits) that finish within budget_seconds, None if none do"""
+    for keys in range(1, MAX_POOL_SIZE + 1):
+        if estimate_seconds(listing_calls, detail_calls, limiter, keys, latency,
+                            concurrency) <= budget_seconds:
+            return keys
+    return None
+
+
+def format_duration(seconds: float) -> str:
+    if seconds < 60:
+        return f"{seconds:.0f}s"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f}m"
+    hours = seconds / 3600
+    return f"{hours:.1f}h" if hours < 48 else f"{hours / 24:.1f}d"
+
+
+def plan_lines(months: Dict[str, MonthPlan]) -> List[str]:
+    """Per-month table of a player's plan"""
+    lines = [f"   {'month':<8} {'listed':>7} {'stored':>7} {'shared':>7} {'fetch':>7} "
+             f"{'pages':>6} {'calls now':>9}"]
+    for month in months.values():
+        note = "" if month.complete else "  (listing failed, incomplete)"
+        lines.append(f"   {month.month:<8} {month.listed:>7} {month.stored:>7} {month.shared:>7} "
+                     f"{month.to_fetch:>7} {month.listing_pages:>6} {month.listing_calls:>9}{note}")
+    return lines
+
+
+def region_totals(plans: List[Dict[str, MonthPlan]]) -> Dict[str, int]:
+    totals = {'listed': 0, 'to_fetch': 0, 'listing_pages': 0}
+    for months in plans:
+        for month in months.values():
+            totals['listed'] += month.listed
+            totals['to_fetch'] += month.to_fetch
+            totals['listing_pages'] += month.listing_pages
+    return totals
+
+
+def pool_size_hint(listing_calls: int, detail_calls: int, limiter, budget_hours: float,
+                   latency: float, concurrency: int) -> str:
+    keys = keys_to_fit(listing_calls, detail_calls, limiter, budget_hours * 3600, latency, concurrency)
+    if keys is None:
+        return f"more than {MAX_POOL_SIZE} keys to finish within {budget_hours:g}h"
+    return f"{keys} key{'s' if keys > 1 else ''} to finish within {budget_hours:g}h"
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Extraction State
+Durable per-player bookkeeping for the match extractor.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from match_journal import iter_records, truncate_torn_tail
+
+
+def atomic_write_json(path: Path, data, indent: Optional[int] = 2):
+    """Write JSON to a temp file and rename it over the target so readers never see a partial file"""
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=indent)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_json(path: Path, default):
+    """Load a JSON file, returning `default` if it does not exist yet"""
+    if not path.exists():
+        return default
+    with open(path) as f:
+        return json.load(f)
+
+
+class WatermarkStore:
+    """
+    Per-queue high-water marks for one player.
+
+    A watermark is the newest match already stored for a queue, as
+    {"game_creation": <ms>, "match_id": "<id>"}. Queue None is the
+    single-pass listing across every queue, stored under "any".
+    Stored in data/{player_id}/watermarks.json.
+    """
+
+    FILENAME = "watermarks.json"
+    ANY_QUEUE = "any"
+
+    def __init__(self, data_dir: Path):
+        self.path = Path(data_dir) / self.FILENAME
+        self.marks: Dict[str, Dict] = load_json(self.path, {})
+
+    def _key(self, queue: Optional[int]) -> str:
+        return self.ANY_QUEUE if queue is None else str(queue)
+
+    def get(self, queue: Optional[int]) -> Optional[Dict]:
+        return self.marks.get(self._key(queue))
+
+    def advance(self, queue: Optional[int], game_creation: int, match_id: str) -> bool:
+        """Move the queue's watermark forward if this match is newer. Returns True if it moved."""
+        current = self.get(queue)
+        if current and current['game_creation'] >= game_creation:
+            return False
+        self.marks[self._key(queue)] = {'game_creation': game_creation, 'match_id': match_id}
+        return True
+
+    def ensure(self, queue: Optional[int], game_creation: int):
+        """Give a queue with no stored matches a watermark at the end of the range already searched"""
+        if not self.get(queue):
+            self.marks[self._key(queue)] = {'game_creation': game_creation, 'match_id': None}
+
+    def advance_from_match(self, match_data: Dict) -> bool:
+        info = match_data['info']
+        return self.advance(info['queueId'], info['gameCreation'], match_data['metadata']['matchId'])
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_json(self.path, self.marks)
+
+
+class ListingProgress:
+    """Checkpointed progress of one (window, queue) listing"""
+
+    def __init__(self):
+        self.end_time: Optional[int] = None
+        self.pages: Dict[int, List[str]] = {}
+        self.stored: Set[str] = set()
+        self.split = False
+        self.done = False
+
+    @property
+    def listed(self) -> List[str]:
+        return [match_id for offset in sorted(self.pages) for match_id in self.pages[offset]]
+
+
+class ExtractionCheckpoint:
+    """
+    Crash-resumable record of how far extraction got for one player.
+
+    For every (listing window, queue) it keeps the listing end time in use
+    (queue None for a single-pass listing that covers every queue),
+    each page of match IDs already listed (by pagination offset), the IDs
+    whose details are stored, whether the window was split into halves, and
+    whether it finished. Events are appended to
+    data/{player_id}/extraction_state.jsonl as they happen, so a restarted run
+    replays them and carries on from the last page and match it reached.
+    """
+
+    FILENAME = "extraction_state.jsonl"
+
+    def __init__(self, data_dir: Path):
+        self.path = Path(data_dir) / self.FILENAME
+        self.progress: Dict[Tuple[str, int], ListingProgress] = {}
+        self._file = None
+
+        if self.path.exists():
+            for event in iter_records(self.path):
+                self._apply(event)
+
+    def _apply(self, event: Dict):
+        key = (event['window'], event['queue'])
+        if event.get('reset'):
+            self.progress.pop(key, None)
+            return
+
+        progress = self.progress.setdefault(key, ListingProgress())
+        if 'end_time' in event:
+            progress.end_time = event['end_time']
+        if 'offset' in event:
+            progress.pages[event['offset']] = event['ids']
+        if 'stored' in event:
+            progress.stored.update(event['stored'])
+        if event.get('split'):
+            progress.split = True
+        if event.get('done'):
+            progress.done = True
+
+    def _log(self, event: Dict):
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # A run killed mid-write leaves a partial line that replay skips; never append to it
+            truncate_torn_tail(self.path)
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(json.dumps(event, separators=(',', ':')) + '\n')
+        self._file.flush()
+        self._apply(event)
+
+    def get(self, window: str, queue: Optional[int]) -> ListingProgress:
+        return self.progress.get((window, queue)) or ListingProgress()
+
+    def start(self, window: str, queue: Optional[int], end_time: int) -> ListingProgress:
+        """Begin (or restart) a listing pinned to end_time so offsets stay stable on resume"""
+        if (window, queue) in self.progress:
+            self._log({'window': window, 'queue': queue, 'reset': True})
+        self._log({'window': window, 'queue': queue, 'end_time': end_time})
+        return self.progress[(window, queue)]
+
+    def record_page(self, window: str, queue: Optional[int], offset: int, match_ids: List[str]):
+        self._log({'window': window, 'queue': queue, 'offset': offset, 'ids': match_ids})
+
+    def record_stored(self, window: str, queue: Optional[int], match_id: str):
+        self._log({'window': window, 'queue': queue, 'stored': [match_id]})
+
+    def mark_split(self, window: str, queue: Optional[int]):
+        self._log({'window': window, 'queue': queue, 'split': True})
+
+    def mark_done(self, window: str, queue: Optional[int], end_time: Optional[int] = None):
+        """Mark a listing finished, optionally as covering up to a later end_time (split windows only)"""
+        event = {'window': window, 'queue': queue, 'done': True}
+        if end_time is not None:
+            event['end_time'] = end_time
+        self._log(event)
+
+    def rewrite(self):
+        """Collapse the event log into one snapshot per listing plus its pages"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            # Single-pass listings use queue None, which sorts ahead of the per-queue ones
+            ordered = sorted(self.progress.items(), key=lambda item: (item[0][0], item[0][1] or 0))
+            for (window, queue), progress in ordered:
+                snapshot = {'window': window, 'queue': queue, 'end_time': progress.end_time,
+                            'stored': sorted(progress.stored), 'split': progress.split,
+                            'done': progress.done}
+                f.write(json.dumps(snapshot, separators=(',', ':')) + '\n')
+                for offset, match_ids in sorted(progress.pages.items()):
+                    page = {'window': window, 'queue': queue, 'offset': offset, 'ids': match_ids}
+                    f.write(json.dumps(page, separators=(',', ':')) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+
+class DeadLetterQueue:
+    """
+    Match IDs of one player whose details could not be fetched.
+
+    Each failure appends a record to data/{player_id}/dead_letters.jsonl with
+    the reason, the HTTP status if there was one, the number of calls spent
+    on the match so far (summed over runs) and where it was listed: the
+    window and queue of the listing (window None outside range extraction),
+    the queues it is filed for (None for any) and the time range it must
+    fall in. A {"id", "resolved": true} record removes it once stored.
+
+    A 404 is permanent: the match does not exist, so repairs skip it unless
+    asked not to.
+    """
+
+    FILENAME = "dead_letters.jsonl"
+
+    def __init__(self, data_dir: Path):
+        self.path = Path(data_dir) / self.FILENAME
+        self.letters: Dict[str, Dict] = {}
+        self._file = None
+
+        if self.path.exists():
+            for event in iter_records(self.path):
+                self._apply(event)
+
+    def _apply(self, event: Dict):
+        if event.get('resolved'):
+            self.letters.pop(event['id'], None)
+        else:
+            self.letters[event['id']] = {key: value for key, value in event.items() if key != 'id'}
+
+    def _log(self, event: Dict):
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            truncate_torn_tail(self.path)
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(json.dumps(event, separators=(',', ':')) + '\n')
+        self._file.flush()
+        self._apply(event)
+
+    def __len__(self) -> int:
+        return len(self.letters)
+
+    def __contains__(self, match_id: str) -> bool:
+        return match_id in self.letters
+
+    def record(self, match_id: str, reason: str, attempts: int, status: Optional[int],
+               listing: Dict):
+        """
+        Record (or update) a failed match.
+
+        Args:
+            listing: {"window", "queue", "targets", "start_time", "end_time"}
+                describing where the match was listed
+        """
+        previous = self.letters.get(match_id, {}).get('attempts', 0)
+        self._log({'id': match_id, 'reason': reason, 'status': status,
+                   'attempts': previous + attempts, 'permanent': status == 404, **listing})
+
+    def resolve(self, match_id: str):
+        if match_id in self.letters:
+            self._log({'id': match_id, 'resolved': True})
+
+    def pending(self, include_permanent: bool = False) -> List[Tuple[str, Dict]]:
+        """Dead letters worth retrying, as (match_id, record) pairs"""
+        return [(match_id, letter) for match_id, letter in self.letters.items()
+                if include_permanent or not letter['permanent']]
+
+    def rewrite(self):
+        """Collapse the log to one record per unresolved match"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        if not self.letters:
+            if self.path.exists():
+                self.path.unlink()
+            return
+
+        tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for match_id, letter in self.letters.items():
+                f.write(json.dumps({'id': match_id, **letter}, separators=(',', ':')) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
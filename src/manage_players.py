@@ -13,20 +13,23 @@ from pathlib import Path
 # Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent.parent))
 
+from api_key_pool import ApiKeyPool, read_api_keys
+from rate_limiter import METHOD_ACCOUNT, api_base_url
+from retry_policy import REQUEST_TIMEOUT
+
 PLAYERS_FILE = Path(__file__).parent.parent / "players.json"
 API_KEY_FILE = Path(__file__).parent.parent / ".env"
 
 
-def load_api_key():
-    """Load Riot API key from .env file"""
+def load_api_keys():
+    """Load Riot API keys (RIOT_API_KEY, plus any comma-separated RIOT_API_KEYS) from .env file"""
     if not API_KEY_FILE.exists():
         print("Error: .env file not found. Please create it with RIOT_API_KEY=your_key")
         sys.exit(1)
     
-    with open(API_KEY_FILE) as f:
-        for line in f:
-            if line.startswith('RIOT_API_KEY='):
-                return line.strip().split('=', 1)[1]
+    api_keys = read_api_keys(API_KEY_FILE)
+    if api_keys:
+        return api_keys
     
     print("Error: RIOT_API_KEY not found in .env file")
     sys.exit(1)
@@ -48,8 +51,8 @@ def save_players(data):
     print(f"✓ Saved to {PLAYERS_FILE}")
 
 
-def fetch_puuid(riot_id, region, api_key):
-    """Fetch PUUID from Riot ID (GameName#TAG)"""
+def fetch_puuid(riot_id, region, api_keys, base_url=None):
+    """Fetch PUUID from Riot ID (GameName#TAG), from base_url or $RIOT_API_BASE_URL if set"""
     if '#' not in riot_id:
         print("Error: Riot ID must be in format GameName#TAG")
         return None
@@ -57,11 +60,27 @@ def fetch_puuid(riot_id, region, api_key):
     game_name, tag_line = riot_id.split('#', 1)
     
     # Use ACCOUNT-V1 endpoint
-    url = f"https://{region}.api.riotgames.com/riot/account/v1/accounts/by-riot-id/{game_name}/{tag_line}"
-    headers = {"X-Riot-Token": api_key}
+    url = f"{api_base_url(region, base_url)}/riot/account/v1/accounts/by-riot-id/{game_name}/{tag_line}"
     
+    # Reserve the call against the same budget as any extraction running on these keys
+    key_pool = ApiKeyPool(api_keys, region)
     try:
-        response = requests.get(url, headers=headers)
+        while True:
+            key_pool.acquire(METHOD_ACCOUNT)
+            try:
+                response = requests.get(url, headers={"X-Riot-Token": key_pool.current_key()},
+                                        timeout=REQUEST_TIMEOUT)
+            except requests.exceptions.RequestException:
+                key_pool.update_from_headers(METHOD_ACCOUNT, {})
+                raise
+            key_pool.update_from_headers(METHOD_ACCOUNT, response.headers)
+            if response.status_code in (401, 403) and key_pool.disable(f"HTTP {response.status_code}"):
+                continue
+            if response.status_code != 429:
+                break
+            retry_after = int(response.headers.get('Retry-After', 10))
+            print(f"Rate limited, retrying in {retry_after}s...")
+            key_pool.block_for(retry_after)
         response.raise_for_status()
         data = response.json()
         return data['puuid']
@@ -70,6 +89,8 @@ def fetch_puuid(riot_id, region, api_key):
         if hasattr(e, 'response') and e.response is not None:
             print(f"Response: {e.response.text}")
         return None
+    finally:
+        key_pool.close()
 
 
 def list_players():
@@ -96,7 +117,7 @@ def add_player():
     print("\n=== Add New Player ===\n")
     
     data = load_players()
-    api_key = load_api_key()
+    api_keys = load_api_keys()
     
     # Get player info
     riot_id = input("Enter Riot ID (GameName#TAG): ").strip()
@@ -114,7 +135,7 @@ def add_player():
     
     # Fetch PUUID
     print(f"\nFetching PUUID for {riot_id}...")
-    puuid = fetch_puuid(riot_id, region, api_key)
+    puuid = fetch_puuid(riot_id, region, api_keys)
     
     if not puuid:
         print("Failed to fetch PUUID. Player not added.")
@@ -208,9 +229,9 @@ def update_player():
             player['region'] = new_region
         if new_riot_id and new_riot_id != player['riot_id']:
             # Need to fetch new PUUID
-            api_key = load_api_key()
+            api_keys = load_api_keys()
             print(f"\nFetching new PUUID for {new_riot_id}...")
-            puuid = fetch_puuid(new_riot_id, player['region'], api_key)
+            puuid = fetch_puuid(new_riot_id, player['region'], api_keys)
             if puuid:
                 player['riot_id'] = new_riot_id
                 player['puuid'] = puuid
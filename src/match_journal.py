@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Match Journal
+Append-only JSONL files of raw matches (one compact match per line) and the
+sealed, compressed segments they are compacted into.
+"""
+
+import errno
+import gzip
+import json
+import lzma
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Tuple
+
+if os.name == 'nt':
+    import msvcrt
+
+    def _lock_file(lock_file):
+        lock_file.seek(0)
+        while True:
+            try:
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError as e:
+                # LK_LOCK gives up after ten one-second attempts; keep waiting like flock does
+                if e.errno != errno.EDEADLOCK:
+                    raise
+
+    def _unlock_file(lock_file):
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def _lock_file(lock_file):
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+    def _unlock_file(lock_file):
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+# Segment compression by file suffix: gzip is fast, xz is roughly a third smaller
+CODECS = {
+    '.gz': gzip.open,
+    '.xz': lzma.open,
+}
+
+# Bytes read at a time when streaming a legacy pretty-printed JSON array
+ARRAY_CHUNK_SIZE = 1 << 16
+
+
+def compact_json(record: Dict) -> str:
+    return json.dumps(record, separators=(',', ':'))
+
+
+def _open_text(path: Path):
+    opener = CODECS.get(path.suffix)
+    if opener is not None:
+        return opener(path, 'rt', encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+def iter_records_with_offsets(path: Path) -> Iterator[Tuple[int, Dict]]:
+    """
+    Stream (byte_offset, record) pairs from an uncompressed journal.
+
+    A torn final line (the process died mid-append) is skipped rather than
+    treated as corruption.
+    """
+    with open(path, 'rb') as f:
+        while True:
+            offset = f.tell()
+            line = f.readline()
+            if not line:
+                return
+            if not line.endswith(b'\n'):
+                return
+            yield offset, json.loads(line)
+
+
+def iter_records(path: Path) -> Iterator[Dict]:
+    """Stream records one at a time from a journal or a sealed (.gz or .xz) segment"""
+    with _open_text(path) as f:
+        for line in f:
+            if not line.endswith('\n'):
+                return
+            yield json.loads(line)
+
+
+def truncate_torn_tail(path: Path):
+    """Drop a partial last line left by a crash so new appends start on a clean line"""
+    if not path.exists():
+        return
+    with open(path, 'rb+') as f:
+        data_end = f.seek(0, os.SEEK_END)
+        if data_end == 0:
+            return
+        f.seek(data_end - 1)
+        if f.read(1) == b'\n':
+            return
+        # Walk back to the last complete line
+        pos = data_end - 1
+        while pos > 0:
+            f.seek(pos - 1)
+            if f.read(1) == b'\n':
+                break
+            pos -= 1
+        f.truncate(pos)
+
+
+@contextmanager
+def journal_lock(path: Path):
+    """
+    Hold the exclusive lock of a journal, shared by every process.
+
+    Appending to a journal, trimming its torn tail and compacting it all
+    happen under this lock ({journal}.lock, which is never deleted, locked
+    with flock, or msvcrt.locking on Windows), so two extractor processes never interleave writes or seal a
+    journal the other is still appending to.
+    """
+    lock_path = path.with_name(path.name + '.lock')
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, 'a+b') as lock_file:
+        _lock_file(lock_file)
+        try:
+            yield
+        finally:
+            _unlock_file(lock_file)
+
+
+class JournalWriter:
+    """
+    Appends records to a JSONL journal.
+
+    Every append is flushed and fsynced before returning, so a crash loses at
+    most the record being written. Appends take the journal's lock and
+    write at its current end, so offsets stay right with several processes
+    appending; a journal another process compacted away is reopened (as a
+    new file) on the next append. Safe to share between threads.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = None
+        self._lock = threading.Lock()
+
+    def _is_open_on_path(self) -> bool:
+        """Whether the open file is still the one at self.path (not compacted and unlinked)"""
+        try:
+            return os.fstat(self._file.fileno()).st_ino == os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return False
+
+    def append(self, record: Dict) -> int:
+        """Append one record. Returns the byte offset it was written at."""
+        line = (compact_json(record) + '\n').encode('utf-8')
+        with self._lock, journal_lock(self.path):
+            if self._file is None or not self._is_open_on_path():
+                if self._file is not None:
+                    self._file.close()
+                # Under the journal lock, so no live writer is mid-line
+                truncate_torn_tail(self.path)
+                self._file = open(self.path, 'ab')
+            offset = self._file.seek(0, os.SEEK_END)
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        return offset
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def iter_json_array(path: Path) -> Iterator[Dict]:
+    """
+    Stream the objects of a file holding one JSON array (such as the legacy
+    pretty-printed raw_matches_*.json), holding one object in memory at a time.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = f.read(ARRAY_CHUNK_SIZE).lstrip()
+        if not buffer:
+            return
+        if not buffer.startswith('['):
+            raise ValueError(f"{path} does not contain a JSON array")
+        buffer = buffer[1:]
+
+        while True:
+            buffer = buffer.lstrip()
+            if buffer.startswith(']'):
+                return
+            if buffer.startswith(','):
+                buffer = buffer[1:]
+                continue
+            try:
+                record, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                # The next object is not fully buffered yet
+                chunk = f.read(ARRAY_CHUNK_SIZE)
+                if not chunk:
+                    raise
+                buffer += chunk
+                continue
+            yield record
+            buffer = buffer[end:]
+
+
+def read_record_at(path: Path, offset: int) -> Dict:
+    """Read the single journal record starting at a byte offset"""
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        return json.loads(f.readline())
+
+
+def seal_segment(sources, segment_path: Path) -> int:
+    """
+    Write records from the given files into one compressed, sealed segment.
+    The codec follows the segment's suffix (see CODECS).
+
+    Sources are read in order and duplicates (by match ID) are dropped. The
+    segment is written to a temp file and renamed into place, so a crash
+    during compaction leaves the inputs untouched.
+
+    Returns:
+        Number of records in the segment
+    """
+    tmp_path = segment_path.with_name(segment_path.name + '.tmp')
+    seen = set()
+    with CODECS[segment_path.suffix](tmp_path, 'wt', encoding='utf-8') as out:
+        for source in sources:
+            if not source.exists():
+                continue
+            for record in iter_records(source):
+                match_id = record['metadata']['matchId']
+                if match_id in seen:
+                    continue
+                seen.add(match_id)
+                out.write(compact_json(record) + '\n')
+
+    with open(tmp_path, 'rb') as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, segment_path)
+    return len(seen)
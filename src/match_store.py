@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Raw Match Store
+One global store of MATCH-V5 payloads keyed by match ID, plus a per-player
+membership index, so a match shared by several tracked players is fetched
+and stored once.
+"""
+
+import argparse
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from extraction_state import atomic_write_json, load_json
+from match_journal import (CODECS, JournalWriter, compact_json, iter_json_array, iter_records,
+                           iter_records_with_offsets, journal_lock, read_record_at, seal_segment)
+
+RAW_STORE_DIR = Path("data/raw")
+
+# Compression for newly sealed segments ("gz" or "xz"); existing segments keep theirs until resealed
+DEFAULT_SEGMENT_CODEC = "gz"
+
+
+def month_key_for(timestamp_ms: int) -> str:
+    """Month partition (YYYY-MM, UTC) that a gameCreation timestamp belongs to"""
+    return datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc).strftime('%Y-%m')
+
+
+class MatchStore:
+    """
+    Journaled raw match store shared by all players.
+
+    Layout under data/raw:
+        journal/{month}.jsonl        open months, one compact match per line,
+                                     appended and fsynced per match
+        segments/{month}.jsonl.gz    finished months, sealed and compressed
+                                     (.jsonl.xz when sealed with the xz codec)
+        segments/{month}.ids.json    catalog of a sealed segment
+
+    Months are the UTC month of gameCreation. An in-memory catalog maps each
+    stored match ID to its month, queue and gameCreation so existence checks
+    never touch the payloads.
+    """
+
+    def __init__(self, root: Path = RAW_STORE_DIR, codec: str = DEFAULT_SEGMENT_CODEC):
+        if f".{codec}" not in CODECS:
+            raise ValueError(f"Unknown segment codec {codec!r} (expected one of "
+                             f"{', '.join(suffix[1:] for suffix in CODECS)})")
+        self.root = Path(root)
+        self.journal_dir = self.root / "journal"
+        self.segments_dir = self.root / "segments"
+        self.codec = codec
+        self.catalog: Dict[str, Dict] = {}
+        self._segments: Dict[str, Path] = {}
+        self._writers: Dict[str, JournalWriter] = {}
+        self._lock = threading.Lock()
+        self._load_catalog()
+
+    def _journal_path(self, month_key: str) -> Path:
+        return self.journal_dir / f"{month_key}.jsonl"
+
+    def _segment_path(self, month_key: str) -> Path:
+        """The month's sealed segment, or where a new one would be written"""
+        existing = self._segments.get(month_key)
+        if existing is not None:
+            return existing
+        return self.segments_dir / f"{month_key}.jsonl.{self.codec}"
+
+    def _find_segment(self, month_key: str):
+        """Pick up a segment of the month sealed (by any process) after the catalog was loaded"""
+        for suffix in CODECS:
+            segment = self.segments_dir / f"{month_key}.jsonl{suffix}"
+            if segment.exists():
+                self._segments[month_key] = segment
+
+    def _sidecar_path(self, month_key: str) -> Path:
+        return self.segments_dir / f"{month_key}.ids.json"
+
+    def _catalog_record(self, match_data: Dict, month_key: str, offset: Optional[int]):
+        info = match_data['info']
+        self.catalog[match_data['metadata']['matchId']] = {
+            'month': month_key,
+            'queue': info['queueId'],
+            'game_creation': info['gameCreation'],
+            'offset': offset,
+        }
+
+    def _load_catalog(self):
+        for suffix in CODECS:
+            for segment in self.segments_dir.glob(f"*.jsonl{suffix}"):
+                self._segments[segment.name[:-len(f".jsonl{suffix}")]] = segment
+
+        for sidecar in sorted(self.segments_dir.glob("*.ids.json")):
+            month_key = sidecar.name[:-len(".ids.json")]
+            for match_id, (queue, game_creation) in load_json(sidecar, {}).items():
+                self.catalog[match_id] = {
+                    'month': month_key,
+                    'queue': queue,
+                    'game_creation': game_creation,
+                    'offset': None,
+                }
+
+        for journal in sorted(self.journal_dir.glob("*.jsonl")):
+            for offset, match_data in iter_records_with_offsets(journal):
+                self._catalog_record(match_data, journal.stem, offset)
+
+    def __len__(self) -> int:
+        return len(self.catalog)
+
+    def contains(self, match_id: str) -> bool:
+        return match_id in self.catalog
+
+    def summary(self, match_id: str) -> Optional[Dict]:
+        """
+        Catalog view of a stored match in MATCH-V5 shape.
+
+        Carries only metadata.matchId, info.queueId and info.gameCreation,
+        which is all the extractor needs to file a match under a player.
+        """
+        entry = self.catalog.get(match_id)
+        if entry is None:
+            return None
+        return {
+            'metadata': {'matchId': match_id},
+            'info': {'queueId': entry['queue'], 'gameCreation': entry['game_creation']},
+        }
+
+    def get(self, match_id: str) -> Optional[Dict]:
+        """Read one full match (a seek for open months, a segment scan for sealed ones)"""
+        entry = self.catalog.get(match_id)
+        if entry is None:
+            return None
+        journal = self._journal_path(entry['month'])
+        if entry['offset'] is not None and journal.exists():
+            # Another process may have compacted the journal since, and a new one started
+            try:
+                match_data = read_record_at(journal, entry['offset'])
+            except ValueError:
+                match_data = None
+            if match_data is not None and match_data['metadata']['matchId'] == match_id:
+                return match_data
+        for match_data in self.iter_month(entry['month']):
+            if match_data['metadata']['matchId'] == match_id:
+                return match_data
+        return None
+
+    def put(self, match_data: Dict) -> bool:
+        """Append a match to its month's journal. Returns False if it was already stored."""
+        match_id = match_data['metadata']['matchId']
+        month_key = month_key_for(match_data['info']['gameCreation'])
+        with self._lock:
+            if match_id in self.catalog:
+                return False
+            writer = self._writers.get(month_key)
+            if writer is None:
+                writer = self._writers[month_key] = JournalWriter(self._journal_path(month_key))
+            offset = writer.append(match_data)
+            self._catalog_record(match_data, month_key, offset)
+        return True
+
+    def iter_month(self, month_key: str) -> Iterator[Dict]:
+        """Stream every stored match of a month, sealed segment first"""
+        for path in (self._segment_path(month_key), self._journal_path(month_key)):
+            if path.exists():
+                yield from iter_records(path)
+
+    def iter_matches(self, match_ids) -> Iterator[Dict]:
+        """Stream the given matches month by month, holding one match in memory at a time"""
+        wanted = set(match_ids)
+        months = sorted({self.catalog[m]['month'] for m in wanted if m in self.catalog})
+        for month_key in months:
+            for match_data in self.iter_month(month_key):
+                match_id = match_data['metadata']['matchId']
+                if match_id in wanted:
+                    # A crash mid-compaction can leave a match in both segment and journal
+                    wanted.discard(match_id)
+                    yield match_data
+
+    def open_months(self) -> List[str]:
+        return sorted(path.stem for path in self.journal_dir.glob("*.jsonl"))
+
+    def compact(self, month_key: str) -> int:
+        """
+        Fold a month's journal (and any earlier segment) into one sealed segment.
+
+        A segment sealed with a different codec than the store's is rewritten
+        even when there is no journal to fold in.
+        """
+        journal = self._journal_path(month_key)
+        with self._lock, journal_lock(journal):
+            writer = self._writers.pop(month_key, None)
+            if writer is not None:
+                writer.close()
+
+            # Another process may have sealed the month since this store was opened
+            self._find_segment(month_key)
+            previous = self._segments.get(month_key)
+            target = self.segments_dir / f"{month_key}.jsonl.{self.codec}"
+            if not journal.exists() and (previous is None or previous == target):
+                return 0
+
+            self.segments_dir.mkdir(parents=True, exist_ok=True)
+            count = seal_segment([path for path in (previous, journal) if path is not None], target)
+            self._segments[month_key] = target
+
+            # The segment also holds what other processes stored, so catalog from it
+            month_ids = {}
+            for match_data in iter_records(target):
+                self._catalog_record(match_data, month_key, None)
+                entry = self.catalog[match_data['metadata']['matchId']]
+                month_ids[match_data['metadata']['matchId']] = [entry['queue'], entry['game_creation']]
+            atomic_write_json(self._sidecar_path(month_key), month_ids, indent=None)
+            if journal.exists():
+                journal.unlink()
+            if previous is not None and previous != target:
+                previous.unlink()
+        return count
+
+    def sealed_months(self) -> List[str]:
+        return sorted(self._segments)
+
+    def disk_usage(self) -> Dict[str, int]:
+        """Bytes on disk for open journals and sealed segments"""
+        return {
+            'journal': sum(path.stat().st_size for path in self.journal_dir.glob("*.jsonl")),
+            'segments': sum(path.stat().st_size for path in self._segments.values()),
+        }
+
+    def compact_finished_months(self) -> Dict[str, int]:
+        """Seal every open month that is already over (UTC)"""
+        current = month_key_for(int(time.time() * 1000))
+        return {
+            month_key: self.compact(month_key)
+            for month_key in self.open_months()
+            if month_key < current
+        }
+
+    def close(self):
+        with self._lock:
+            for writer in self._writers.values():
+                writer.close()
+            self._writers.clear()
+
+
+class PlayerMatchIndex:
+    """
+    Which stored matches belong to one player.
+
+    Stored as an append-only data/{player_id}/match_index.jsonl with one
+    {"match_id", "month", "queue", "game_creation"} record per line, so
+    recording a match costs one small append.
+    """
+
+    FILENAME = "match_index.jsonl"
+    LEGACY_FILENAME = "match_index.json"
+
+    def __init__(self, data_dir: Path):
+        self.path = Path(data_dir) / self.FILENAME
+        self.entries: Dict[str, Dict] = {}
+        self._file = None
+
+        if self.path.exists():
+            for record in iter_records(self.path):
+                self.entries[record.pop('match_id')] = record
+        else:
+            legacy = load_json(Path(data_dir) / self.LEGACY_FILENAME, {})
+            for match_id, entry in legacy.items():
+                self._append(match_id, entry)
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def __contains__(self, match_id: str) -> bool:
+        return match_id in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _append(self, match_id: str, entry: Dict):
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(compact_json({'match_id': match_id, **entry}) + '\n')
+        self._file.flush()
+        self.entries[match_id] = entry
+
+    def add(self, match_data: Dict) -> bool:
+        """Record a match for this player. Returns False if it was already indexed."""
+        match_id = match_data['metadata']['matchId']
+        if match_id in self.entries:
+            return False
+
+        info = match_data['info']
+        self._append(match_id, {
+            'month': month_key_for(info['gameCreation']),
+            'queue': info['queueId'],
+            'game_creation': info['gameCreation'],
+        })
+        return True
+
+    def ids_by_month(self) -> Dict[str, List[str]]:
+        """Indexed match IDs grouped by month, months in chronological order"""
+        months: Dict[str, List[str]] = {}
+        for match_id, entry in self.entries.items():
+            months.setdefault(entry['month'], []).append(match_id)
+        return dict(sorted(months.items()))
+
+    def sync(self):
+        """Make every recorded entry durable"""
+        if self._file is not None:
+            os.fsync(self._file.fileno())
+
+
+def import_raw_files(data_dir: Path, store: MatchStore, index: PlayerMatchIndex,
+                     remove: bool = False) -> int:
+    """
+    Copy a player's legacy raw_matches_*.json contents into the shared store and index.
+
+    Files are streamed one match at a time. With remove set, each file is
+    deleted once every match in it is durably stored and indexed.
+    """
+    imported = 0
+    for raw_file in sorted(Path(data_dir).glob("raw_matches_*.json")):
+        for match_data in iter_json_array(raw_file):
+            store.put(match_data)
+            if index.add(match_data):
+                imported += 1
+        if remove:
+            index.sync()
+            raw_file.unlink()
+    return imported
+
+
+def iter_player_matches(index: PlayerMatchIndex, store: MatchStore) -> Iterator[Dict]:
+    """Stream a player's stored matches month by month"""
+    return store.iter_matches(index.entries)
+
+
+def _format_bytes(size: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def main():
+    """Report on the raw match store and seal or recompress its months"""
+    parser = argparse.ArgumentParser(description="Inspect and compact the shared raw match store")
+    parser.add_argument('--seal', action='store_true',
+                        help="Seal every open month, including the current one")
+    parser.add_argument('--codec', choices=[suffix[1:] for suffix in CODECS], default=DEFAULT_SEGMENT_CODEC,
+                        help="Compression for sealed segments; with --seal, existing segments "
+                             "in another codec are rewritten (default: %(default)s)")
+    parser.add_argument('--import-legacy', action='store_true',
+                        help="Move every player's raw_matches_*.json into the store, deleting the "
+                             "files once imported")
+    args = parser.parse_args()
+
+    store = MatchStore(codec=args.codec)
+
+    if args.import_legacy:
+        for data_dir in sorted(path for path in RAW_STORE_DIR.parent.iterdir()
+                               if path.is_dir() and path != RAW_STORE_DIR):
+            if not any(data_dir.glob("raw_matches_*.json")):
+                continue
+            index = PlayerMatchIndex(data_dir)
+            imported = import_raw_files(data_dir, store, index, remove=True)
+            print(f"  📦 {data_dir.name}: imported {imported} matches")
+
+    if args.seal:
+        months = sorted(set(store.open_months()) | set(store.sealed_months()))
+        for month_key in months:
+            count = store.compact(month_key)
+            if count:
+                print(f"  🗜️  Sealed {month_key}: {count} matches")
+
+    usage = store.disk_usage()
+    print(f"\n📊 {len(store)} matches in {store.root}")
+    print(f"   Open journals:   {_format_bytes(usage['journal'])} ({len(store.open_months())} months)")
+    print(f"   Sealed segments: {_format_bytes(usage['segments'])} ({len(store.sealed_months())} months)")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
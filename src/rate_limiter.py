@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+Riot API Rate Limiter
+Multi-window token buckets driven by the X-App-Rate-Limit / X-Method-Rate-Limit headers,
+kept either in memory or in a SQLite ledger shared by every process using the same key.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Tuple
+from urllib.parse import urlparse
+
+# Personal development key limits, used until the first response tells us otherwise
+DEFAULT_APP_LIMITS = [(20, 1), (100, 120)]
+
+# Endpoint groups that Riot limits separately
+METHOD_ACCOUNT = "account"
+METHOD_MATCH_IDS = "match-ids"
+METHOD_MATCH_DETAILS = "match-details"
+METHOD_SUMMONER = "summoner"
+
+# Call ledger shared by every script in this checkout, wherever it is run from
+LEDGER_PATH = Path(__file__).parent.parent / "data" / "rate_limits.sqlite"
+
+# Points every Riot client at another host, e.g. the local stand-in server
+BASE_URL_ENV = "RIOT_API_BASE_URL"
+
+# How long ledger calls are kept for a bucket whose limits are not known yet
+# (Riot's longest method window is ten minutes)
+UNKNOWN_LIMIT_RETENTION = 600
+
+# How often a caller held back only by calls still in flight looks again
+IN_FLIGHT_POLL = 0.01
+
+# A ledger call still in flight after this long (its process died) stops holding a token
+IN_FLIGHT_TIMEOUT = 60
+
+
+def parse_rate_header(value: Optional[str]) -> List[Tuple[int, int]]:
+    """
+    Parse a Riot rate limit header.
+
+    Args:
+        value: Header value such as "20:1,100:120"
+
+    Returns:
+        List of (count, window_seconds) pairs, empty if the header is missing
+    """
+    pairs = []
+    if not value:
+        return pairs
+
+    for part in value.split(','):
+        count, _, window = part.strip().partition(':')
+        if count and window:
+            pairs.append((int(count), int(window)))
+    return pairs
+
+
+def method_for_url(url: str) -> str:
+    """Endpoint group a Riot API URL is rate limited under"""
+    path = urlparse(url).path
+    if path.startswith('/riot/account/'):
+        return METHOD_ACCOUNT
+    if path.startswith('/lol/match/v5/matches/by-puuid/'):
+        return METHOD_MATCH_IDS
+    if path.startswith('/lol/match/v5/matches/'):
+        return METHOD_MATCH_DETAILS
+    if path.startswith('/lol/summoner/'):
+        return METHOD_SUMMONER
+    return path
+
+
+def api_base_url(routing: str, base_url: Optional[str] = None) -> str:
+    """Base URL for a routing value: base_url if given, else $RIOT_API_BASE_URL, else Riot's own host"""
+    return base_url or os.environ.get(BASE_URL_ENV) or f"https://{routing}.api.riotgames.com"
+
+
+def limiter_scope(api_key: str, routing: str) -> str:
+    """Ledger scope for one API key on one routing value (the key itself is never stored)"""
+    return f"{hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]}:{routing}"
+
+
+class TokenBucket:
+    """
+    One rate limit window: `limit` calls per `window` seconds.
+
+    A granted call holds a token while it is in flight and is then stamped
+    with the time its response came back. The server counts a call when it
+    arrives, which is no later than that, so a token never frees up here
+    before the server's window has let go of the call; stamping at grant
+    time would let calls slow to arrive land in one server window.
+    """
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self.calls = deque()
+        self.in_flight = 0
+
+    def _expire(self, now: float):
+        while self.calls and now - self.calls[0] >= self.window:
+            self.calls.popleft()
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available (0 if one is available now)"""
+        self._expire(now)
+        used = len(self.calls) + self.in_flight
+        if used < self.limit:
+            return 0.0
+        # Calls in flight have no stamp to expire, so only answered calls can free a token
+        expiring = used - self.limit
+        if expiring >= len(self.calls):
+            return IN_FLIGHT_POLL
+        return self.calls[expiring] + self.window - now
+
+    def consume(self, now: float):
+        self.in_flight += 1
+
+    def complete(self, now: float):
+        """Stamp the oldest call in flight with the time its response came back"""
+        if self.in_flight:
+            self.in_flight -= 1
+            self.calls.append(now)
+
+    def sync(self, used: int, now: float):
+        """Account for calls the server has counted but we have not (e.g. other clients)"""
+        self._expire(now)
+        for _ in range(used - len(self.calls) - self.in_flight):
+            self.calls.append(now)
+
+
+class RateLimiter:
+    """
+    Rate limiter for one API key on one routing region.
+
+    Keeps an application-wide set of buckets plus a set per method. Bucket
+    limits start from DEFAULT_APP_LIMITS and are replaced by whatever the
+    response headers report.
+    """
+
+    def __init__(self, app_limits: List[Tuple[int, float]] = None,
+                 method_limits: Dict[str, List[Tuple[int, float]]] = None):
+        self.app_buckets = [TokenBucket(c, w) for c, w in (app_limits or DEFAULT_APP_LIMITS)]
+        self.method_buckets: Dict[str, List[TokenBucket]] = {
+            method: [TokenBucket(c, w) for c, w in limits]
+            for method, limits in (method_limits or {}).items()
+        }
+        self.blocked_until = 0.0
+        self.total_sleep = 0.0
+        self._lock = threading.Lock()
+
+    def _buckets_for(self, method: str) -> List[TokenBucket]:
+        return self.app_buckets + self.method_buckets.get(method, [])
+
+    def limits(self, method: Optional[str] = None) -> List[Tuple[int, float]]:
+        """(count, window_seconds) limits in force for a method, or the app limits for None"""
+        with self._lock:
+            buckets = self.app_buckets if method is None else self.method_buckets.get(method, [])
+            return [(bucket.limit, bucket.window) for bucket in buckets]
+
+    def _try_acquire(self, method: str, now: float) -> float:
+        wait_time = self.blocked_until - now
+        for bucket in self._buckets_for(method):
+            wait_time = max(wait_time, bucket.wait_time(now))
+
+        if wait_time <= 0:
+            for bucket in self._buckets_for(method):
+                bucket.consume(now)
+        return wait_time
+
+    def try_acquire(self, method: str) -> float:
+        """
+        Take a token for `method` from every bucket if one is free right now.
+
+        Returns:
+            0 if the call may go, otherwise seconds until it could (nothing is taken)
+        """
+        with self._lock:
+            return self._try_acquire(method, time.time())
+
+    def acquire(self, method: str) -> float:
+        """
+        Block until a call to `method` is allowed and take a token from every bucket.
+
+        Returns:
+            Seconds spent sleeping
+        """
+        slept = 0.0
+        announced = False
+        while True:
+            wait_time = self.try_acquire(method)
+            if wait_time <= 0:
+                break
+
+            if wait_time > 5 and not announced:
+                print(f"  ⏳ Rate limit reached. Waiting {wait_time:.0f}s...")
+                announced = True
+            time.sleep(wait_time)
+            slept += wait_time
+
+        if slept:
+            with self._lock:
+                self.total_sleep += slept
+        return slept
+
+    @staticmethod
+    def _rebuild(buckets: List[TokenBucket], limits: List[Tuple[int, int]]) -> List[TokenBucket]:
+        """Apply new limits while keeping the call history of matching windows"""
+        existing = {bucket.window: bucket for bucket in buckets}
+        in_flight = max((bucket.in_flight for bucket in buckets), default=0)
+        rebuilt = []
+        for limit, window in limits:
+            bucket = existing.get(window)
+            if bucket is None:
+                bucket = TokenBucket(limit, window)
+                bucket.in_flight = in_flight
+            bucket.limit = limit
+            rebuilt.append(bucket)
+        return rebuilt
+
+    def _apply(self, buckets: List[TokenBucket], limit_header: Optional[str],
+               count_header: Optional[str], now: float) -> List[TokenBucket]:
+        limits = parse_rate_header(limit_header)
+        if limits:
+            buckets = self._rebuild(buckets, limits)
+
+        counts = dict((window, used) for used, window in parse_rate_header(count_header))
+        for bucket in buckets:
+            if bucket.window in counts:
+                bucket.sync(counts[bucket.window], now)
+        return buckets
+
+    def update_from_headers(self, method: str, headers: Mapping[str, str]):
+        """
+        Count a granted call as answered now, then update limits and usage
+        from its response's rate limit headers.
+
+        Called once for every call acquire() granted, with empty headers if
+        the call failed without a response.
+        """
+        now = time.time()
+        with self._lock:
+            for bucket in self._buckets_for(method):
+                bucket.complete(now)
+            self.app_buckets = self._apply(
+                self.app_buckets,
+                headers.get('X-App-Rate-Limit'),
+                headers.get('X-App-Rate-Limit-Count'),
+                now,
+            )
+            self.method_buckets[method] = self._apply(
+                self.method_buckets.get(method, []),
+                headers.get('X-Method-Rate-Limit'),
+                headers.get('X-Method-Rate-Limit-Count'),
+                now,
+            )
+
+    def block_for(self, seconds: float):
+        """Pause all calls through this limiter (e.g. after a 429 with Retry-After)"""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.time() + seconds)
+
+
+class SharedRateLimiter(RateLimiter):
+    """
+    Rate limiter whose call history, learned limits and Retry-After blocks
+    live in a SQLite ledger, so every process using the same key and routing
+    value (the scope) draws from one budget.
+
+    Each reservation checks and records its calls inside one IMMEDIATE
+    transaction, which holds the ledger's write lock, so two processes can
+    never both take the last token of a window. As in TokenBucket, a call
+    holds its token until its response comes back: it is recorded
+    IN_FLIGHT_TIMEOUT seconds ahead and restamped with the answer time by
+    update_from_headers (on the thread that acquired it), so a process that
+    dies mid-call frees its tokens after a while. Limits reported by
+    response headers are written back for every process to use; until any
+    have been seen, the limits passed in (or DEFAULT_APP_LIMITS) apply.
+    """
+
+    def __init__(self, scope: str, path: Path = LEDGER_PATH,
+                 app_limits: List[Tuple[int, float]] = None,
+                 method_limits: Dict[str, List[Tuple[int, float]]] = None):
+        super().__init__(app_limits, method_limits)
+        self.scope = scope
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), timeout=60, isolation_level=None,
+                                   check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS calls (bucket TEXT NOT NULL, ts REAL NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS calls_by_bucket ON calls (bucket, ts)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS limits (bucket TEXT NOT NULL, window REAL NOT NULL, "
+                         "count INTEGER NOT NULL, PRIMARY KEY (bucket, window))")
+        self._db.execute("CREATE TABLE IF NOT EXISTS blocks (scope TEXT PRIMARY KEY, until REAL NOT NULL)")
+        # Ledger rows of the call each thread has in flight
+        self._in_flight = threading.local()
+
+    def _bucket_name(self, method: Optional[str]) -> str:
+        return f"{self.scope}|{method}" if method else f"{self.scope}|app"
+
+    def _transaction(self):
+        self._db.execute("BEGIN IMMEDIATE")
+        return self._db
+
+    def _limits_for(self, method: Optional[str]) -> List[Tuple[int, float]]:
+        rows = self._db.execute("SELECT count, window FROM limits WHERE bucket = ?",
+                                (self._bucket_name(method),)).fetchall()
+        if rows:
+            return rows
+        buckets = self.app_buckets if method is None else self.method_buckets.get(method, [])
+        return [(bucket.limit, bucket.window) for bucket in buckets]
+
+    def limits(self, method: Optional[str] = None) -> List[Tuple[int, float]]:
+        """Limits in force for a method (or the app), as last reported to any process"""
+        with self._lock:
+            return [(count, window) for count, window in self._limits_for(method)]
+
+    def _try_acquire(self, method: str, now: float) -> float:
+        db = self._transaction()
+        try:
+            row = db.execute("SELECT until FROM blocks WHERE scope = ?", (self.scope,)).fetchone()
+            wait_time = (row[0] if row else 0.0) - now
+
+            for bucket_method in (None, method):
+                bucket = self._bucket_name(bucket_method)
+                limits = self._limits_for(bucket_method)
+                retention = max((window for _, window in limits), default=UNKNOWN_LIMIT_RETENTION)
+                db.execute("DELETE FROM calls WHERE bucket = ? AND ts <= ?", (bucket, now - retention))
+                for limit, window in limits:
+                    # The limit-th most recent call in the window is the one that has to expire
+                    row = db.execute("SELECT ts FROM calls WHERE bucket = ? AND ts > ? "
+                                     "ORDER BY ts DESC LIMIT 1 OFFSET ?",
+                                     (bucket, now - window, limit - 1)).fetchone()
+                    if row:
+                        # A call still in flight frees its token only once answered
+                        wait_time = max(wait_time, IN_FLIGHT_POLL if row[0] > now else row[0] + window - now)
+
+            if wait_time <= 0:
+                self._in_flight.rows = [
+                    db.execute("INSERT INTO calls (bucket, ts) VALUES (?, ?)",
+                               (self._bucket_name(bucket_method), now + IN_FLIGHT_TIMEOUT)).lastrowid
+                    for bucket_method in (None, method)]
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return wait_time
+
+    def _store(self, method: Optional[str], limit_header: Optional[str],
+               count_header: Optional[str], now: float):
+        bucket = self._bucket_name(method)
+        limits = parse_rate_header(limit_header)
+        if limits:
+            self._db.execute("DELETE FROM limits WHERE bucket = ?", (bucket,))
+            self._db.executemany("INSERT INTO limits (bucket, window, count) VALUES (?, ?, ?)",
+                                 [(bucket, window, count) for count, window in limits])
+
+        # Calls the server has counted but the ledger has not (e.g. another machine)
+        for used, window in parse_rate_header(count_header):
+            recorded = self._db.execute("SELECT COUNT(*) FROM calls WHERE bucket = ? AND ts > ?",
+                                        (bucket, now - window)).fetchone()[0]
+            if used > recorded:
+                self._db.executemany("INSERT INTO calls (bucket, ts) VALUES (?, ?)",
+                                     [(bucket, now)] * (used - recorded))
+
+    def update_from_headers(self, method: str, headers: Mapping[str, str]):
+        """Restamp this thread's call in flight as answered now and record its response's limits and usage"""
+        now = time.time()
+        with self._lock:
+            db = self._transaction()
+            try:
+                rows = getattr(self._in_flight, 'rows', [])
+                self._in_flight.rows = []
+                db.executemany("UPDATE calls SET ts = ? WHERE rowid = ?", [(now, row) for row in rows])
+                self._store(None, headers.get('X-App-Rate-Limit'),
+                            headers.get('X-App-Rate-Limit-Count'), now)
+                self._store(method, headers.get('X-Method-Rate-Limit'),
+                            headers.get('X-Method-Rate-Limit-Count'), now)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    def block_for(self, seconds: float):
+        """Pause all calls on this key and routing value, in every process"""
+        until = time.time() + seconds
+        with self._lock:
+            self._db.execute("INSERT INTO blocks (scope, until) VALUES (?, ?) "
+                             "ON CONFLICT (scope) DO UPDATE SET until = MAX(until, excluded.until)",
+                             (self.scope, until))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def shared_limiter(api_key: str, routing: str, path: Path = LEDGER_PATH) -> SharedRateLimiter:
+    """The cross-process limiter for an API key on a routing value (e.g. "americas", "na1")"""
+    return SharedRateLimiter(limiter_scope(api_key, routing), path)
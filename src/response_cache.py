@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Match Response Cache
+Persistent, compressed on-disk cache of MATCH-V5 match detail responses,
+keyed by match ID, that a Riot client checks before using the network. The
+extractor uses it only with --cache, since its match store already holds
+every fetched match.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+CACHE_DIR = Path("data/cache/matches")
+
+
+class ResponseCache:
+    """
+    Immutable cache of match detail responses.
+
+    Layout under data/cache/matches:
+        {shard}/{match_id}.json.gz   one compressed response per match, spread
+                                     over 256 shard directories
+        index.jsonl                  append-only log of {"id", "size"} puts
+                                     and {"id", "evicted": true} evictions
+
+    A match's details never change once the game is over, so entries are
+    never invalidated. With max_bytes set, the oldest entries are evicted
+    once the cache grows past it. The index is replayed on open so existence
+    checks never touch the entry files. Safe to share between threads.
+    """
+
+    INDEX_FILENAME = "index.jsonl"
+
+    def __init__(self, root: Path = CACHE_DIR, max_bytes: Optional[int] = None):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.index_path = self.root / self.INDEX_FILENAME
+        # match_id -> compressed size, oldest first
+        self.entries: "OrderedDict[str, int]" = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._index_file = None
+        self._lock = threading.Lock()
+        self._load_index()
+
+    def _entry_path(self, match_id: str) -> Path:
+        shard = hashlib.sha1(match_id.encode('utf-8')).hexdigest()[:2]
+        return self.root / shard / f"{match_id}.json.gz"
+
+    def _load_index(self):
+        if not self.index_path.exists():
+            self._rebuild_index()
+            return
+
+        log_lines = 0
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.endswith('\n'):
+                    break
+                log_lines += 1
+                event = json.loads(line)
+                size = self.entries.pop(event['id'], None)
+                if size is not None:
+                    self.total_bytes -= size
+                if not event.get('evicted'):
+                    self.entries[event['id']] = event['size']
+                    self.total_bytes += event['size']
+
+        if log_lines > 2 * len(self.entries) + 100:
+            self._rewrite_index()
+
+    def _rebuild_index(self):
+        """Recover the index from the entry files, oldest first by modification time"""
+        found = []
+        for path in self.root.glob("*/*.json.gz"):
+            stat = path.stat()
+            found.append((stat.st_mtime, path.name[:-len(".json.gz")], stat.st_size))
+        for _, match_id, size in sorted(found):
+            self.entries[match_id] = size
+            self.total_bytes += size
+        if found:
+            self._rewrite_index()
+
+    def _rewrite_index(self):
+        tmp_path = self.index_path.with_name(self.index_path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for match_id, size in self.entries.items():
+                f.write(json.dumps({'id': match_id, 'size': size}) + '\n')
+        os.replace(tmp_path, self.index_path)
+
+    def _log(self, event: Dict):
+        if self._index_file is None:
+            self.root.mkdir(parents=True, exist_ok=True)
+            self._index_file = open(self.index_path, 'a', encoding='utf-8')
+        self._index_file.write(json.dumps(event) + '\n')
+        self._index_file.flush()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, match_id: str) -> bool:
+        return match_id in self.entries
+
+    def get(self, match_id: str) -> Optional[Dict]:
+        """Cached response for a match, or None"""
+        if match_id not in self.entries:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        try:
+            with gzip.open(self._entry_path(match_id), 'rt', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, EOFError, ValueError):
+            # Deleted or damaged behind our back: forget it and let the caller refetch
+            with self._lock:
+                self._forget(match_id)
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, match_id: str, data: Dict):
+        """Store a response, then evict the oldest entries if the cache is over max_bytes"""
+        path = self._entry_path(match_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+        size = path.stat().st_size
+
+        with self._lock:
+            if match_id in self.entries:
+                self.total_bytes -= self.entries.pop(match_id)
+            self.entries[match_id] = size
+            self.total_bytes += size
+            self._log({'id': match_id, 'size': size})
+            self._evict()
+
+    def _forget(self, match_id: str):
+        size = self.entries.pop(match_id, None)
+        if size is None:
+            return
+        self.total_bytes -= size
+        self._log({'id': match_id, 'evicted': True})
+
+    def _evict(self):
+        if self.max_bytes is None:
+            return
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            match_id = next(iter(self.entries))
+            self._forget(match_id)
+            try:
+                self._entry_path(match_id).unlink()
+            except FileNotFoundError:
+                pass
+
+    def close(self):
+        with self._lock:
+            if self._index_file is not None:
+                self._index_file.close()
+                self._index_file = None
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Retry Policy
+How failed Riot API calls are retried: per-outcome handling, jittered
+exponential backoff, and a circuit breaker shared by every worker talking
+to the same host.
+"""
+
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+
+# Seconds to wait for a response before treating the call as timed out
+REQUEST_TIMEOUT = 10
+
+# Seconds a half-open breaker waits for its probe to report before letting another caller probe
+PROBE_TIMEOUT = 6 * REQUEST_TIMEOUT
+
+OUTCOME_OK = "ok"
+OUTCOME_RATE_LIMITED = "rate-limited"
+OUTCOME_SERVER_ERROR = "server-error"
+OUTCOME_NOT_FOUND = "not-found"
+OUTCOME_UNAUTHORIZED = "unauthorized"
+OUTCOME_CLIENT_ERROR = "client-error"
+
+
+class RiotAPIError(Exception):
+    """A call failed in a way retrying cannot fix (e.g. a rejected or expired API key)"""
+
+
+class RequestFailed(Exception):
+    """
+    One resource could not be fetched: it does not exist, the request was
+    rejected, or the retry policy gave up on it.
+    """
+
+    def __init__(self, reason: str, attempts: int, status: Optional[int] = None):
+        super().__init__(reason)
+        self.reason = reason
+        self.attempts = attempts
+        self.status = status
+
+    @property
+    def permanent(self) -> bool:
+        """True if the resource does not exist, so no retry will ever succeed"""
+        return self.status == 404
+
+
+def classify(status_code: int) -> str:
+    """Map an HTTP status to how it should be handled"""
+    if status_code == 429:
+        return OUTCOME_RATE_LIMITED
+    if status_code >= 500:
+        return OUTCOME_SERVER_ERROR
+    if status_code == 404:
+        return OUTCOME_NOT_FOUND
+    if status_code in (401, 403):
+        return OUTCOME_UNAUTHORIZED
+    if status_code >= 400:
+        return OUTCOME_CLIENT_ERROR
+    return OUTCOME_OK
+
+
+class RetryPolicy:
+    """
+    Retry limits and delays for one kind of call.
+
+    5xx responses, timeouts and connection errors are retried with full-jitter
+    exponential backoff: attempt n waits a random time up to
+    min(max_delay, base_delay * 2**n). A 429 waits exactly as long as its
+    Retry-After header says and does not use up an attempt (falling back to
+    backoff when the header is missing). Other 4xx responses are not retried.
+    """
+
+    def __init__(self, max_attempts: int = 6, base_delay: float = 0.5, max_delay: float = 30.0,
+                 max_rate_limited: int = 20):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_rate_limited = max_rate_limited
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    @staticmethod
+    def retry_after(response: requests.Response) -> Optional[float]:
+        value = response.headers.get('Retry-After')
+        try:
+            return float(value) if value is not None else None
+        except ValueError:
+            return None
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+
+class CircuitBreaker:
+    """
+    Stops every caller of a host once it is clearly down.
+
+    After failure_threshold consecutive server errors or timeouts the
+    breaker opens and every caller waits out the cooldown. Then one probe
+    call is let through: success closes the breaker, failure reopens it
+    with the cooldown doubled (up to max_cooldown). Any answer that is not
+    a server error counts as success, since the host is up. A probe that
+    ends without reporting either (its caller raised) must call
+    abandon_probe(); one that has not reported after probe_timeout seconds
+    is given up on anyway, so the breaker never stays half-open.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 15.0, max_cooldown: float = 300.0,
+                 probe_timeout: float = PROBE_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.probe_timeout = probe_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.open_until = 0.0
+        self.trips = 0
+        # Thread making the probe call, and when it started
+        self._probe_owner: Optional[int] = None
+        self._probe_started = 0.0
+        self._cond = threading.Condition()
+
+    def before_call(self) -> float:
+        """
+        Wait until a call may be made.
+
+        Returns:
+            Seconds spent waiting
+        """
+        waited = 0.0
+        with self._cond:
+            while True:
+                now = time.time()
+                if self.state == self.CLOSED:
+                    return waited
+                probe_overdue = self.state == self.HALF_OPEN and now - self._probe_started >= self.probe_timeout
+                if (self.state == self.OPEN and now >= self.open_until) or probe_overdue:
+                    # This caller becomes the probe; the rest wait for its result
+                    self.state = self.HALF_OPEN
+                    self._probe_owner = threading.get_ident()
+                    self._probe_started = now
+                    return waited
+                if self.state == self.OPEN:
+                    timeout = self.open_until - now
+                else:
+                    timeout = min(1.0, self._probe_started + self.probe_timeout - now)
+                self._cond.wait(timeout)
+                waited += time.time() - now
+
+    def record_success(self):
+        with self._cond:
+            if self.state != self.CLOSED:
+                print("  ✅ Upstream answering again, resuming")
+            self.state = self.CLOSED
+            self.failures = 0
+            self.cooldown = self.base_cooldown
+            self._probe_owner = None
+            self._cond.notify_all()
+
+    def record_failure(self) -> bool:
+        """Count a failure. Returns True if it opened the breaker."""
+        with self._cond:
+            self.failures += 1
+            self._probe_owner = None
+            if self.state == self.HALF_OPEN:
+                self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+            elif self.state == self.OPEN or self.failures < self.failure_threshold:
+                return False
+
+            self.state = self.OPEN
+            self.open_until = time.time() + self.cooldown
+            self.trips += 1
+            print(f"  🔌 Upstream looks down ({self.failures} failures in a row); "
+                  f"pausing all calls for {self.cooldown:.0f}s")
+            self._cond.notify_all()
+            return True
+
+    def abandon_probe(self):
+        """
+        Give up the probe this thread is making without a result (its call
+        raised something other than a request error): the next caller probes
+        instead. Does nothing if this thread is not the probe.
+        """
+        with self._cond:
+            if self.state == self.HALF_OPEN and self._probe_owner == threading.get_ident():
+                self.state = self.OPEN
+                self.open_until = time.time()
+                self._probe_owner = None
+                self._cond.notify_all()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(host: str) -> CircuitBreaker:
+    """The circuit breaker shared by every client in this process calling a host"""
+    with _breakers_lock:
+        if host not in _breakers:
+            _breakers[host] = CircuitBreaker()
+        return _breakers[host]
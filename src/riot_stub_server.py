@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+"""
+Local Riot API Stand-in Server
+Serves synthetic or recorded ACCOUNT-V1 and MATCH-V5 payloads, with Riot-style
+rate limit headers, 429s, latency and 5xx faults, so the extractor can be
+load-tested and benchmarked offline.
+"""
+
+import gzip
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Collection, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+from match_journal import iter_json_array
+from match_store import MatchStore
+from rate_limiter import method_for_url, parse_rate_header
+
+
+# Roughly one game every six hours, starting 2024-01-01
+DEFAULT_FIRST_GAME = 1704067200000
+DEFAULT_GAME_SPACING = 6 * 60 * 60 * 1000
+
+CHAMPIONS = [
+    (1, "Annie"), (18, "Tristana"), (15, "Sivir"), (90, "Malzahar"),
+    (111, "Nautilus"), (143, "Zyra"), (110, "Varus"), (141, "Kayn"),
+    (99, "Lux"), (64, "LeeSin"), (222, "Jinx"), (412, "Thresh"),
+]
+POSITIONS = ["TOP", "JUNGLE", "MIDDLE", "BOTTOM", "UTILITY"]
+
+
+def synthetic_match(match_id: str, puuid: str, game_creation: int,
+                    queue_id: int, seed: Optional[int] = None) -> Dict:
+    """
+    Build a MATCH-V5 shaped payload containing the given player.
+
+    Args:
+        match_id: Match ID to embed in the metadata
+        puuid: PUUID of the tracked player (always participant 1)
+        game_creation: gameCreation timestamp in milliseconds
+        queue_id: Queue ID of the game
+        seed: Optional seed, defaults to a value derived from the match ID
+
+    Returns:
+        Match data dict with 10 participants
+    """
+    rng = random.Random(seed if seed is not None else match_id)
+    puuids = [puuid] + [f"stub-puuid-{match_id}-{i}" for i in range(1, 10)]
+    duration = rng.randint(900, 2400)
+    team_win = rng.choice([100, 200])
+
+    participants = []
+    for i, participant_puuid in enumerate(puuids):
+        team_id = 100 if i < 5 else 200
+        champion_id, champion_name = rng.choice(CHAMPIONS)
+        kills = rng.randint(0, 15)
+        participant = {
+            'puuid': participant_puuid,
+            'summonerName': f"Stub{i}",
+            'riotIdGameName': f"Stub{i}",
+            'riotIdTagLine': "STUB",
+            'championId': champion_id,
+            'championName': champion_name,
+            'teamId': team_id,
+            'teamPosition': POSITIONS[i % 5],
+            'win': team_id == team_win,
+            'kills': kills,
+            'deaths': rng.randint(0, 12),
+            'assists': rng.randint(0, 20),
+            'totalMinionsKilled': rng.randint(10, 280),
+            'neutralMinionsKilled': rng.randint(0, 60),
+            'goldEarned': rng.randint(5000, 18000),
+            'totalDamageDealtToChampions': rng.randint(3000, 45000),
+            'totalDamageTaken': rng.randint(5000, 40000),
+            'visionScore': rng.randint(5, 90),
+            'wardsPlaced': rng.randint(2, 40),
+            'wardsKilled': rng.randint(0, 15),
+            'visionWardsBoughtInGame': rng.randint(0, 6),
+            'doubleKills': rng.randint(0, 2),
+            'tripleKills': rng.randint(0, 1),
+            'quadraKills': 0,
+            'pentaKills': 0,
+            'largestKillingSpree': rng.randint(0, 8),
+            'turretKills': rng.randint(0, 3),
+            'inhibitorKills': rng.randint(0, 1),
+            'champLevel': rng.randint(8, 18),
+            'challenges': {
+                'killParticipation': rng.random(),
+                'soloKills': rng.randint(0, 4),
+                'damagePerMinute': rng.uniform(200, 1500),
+            },
+            'perks': {
+                'styles': [
+                    {'style': 8000, 'selections': [{'perk': p} for p in (8005, 9111, 9104, 8014)]},
+                    {'style': 8100, 'selections': [{'perk': p} for p in (8139, 8135)]},
+                ]
+            },
+        }
+        for slot in range(7):
+            participant[f'item{slot}'] = rng.choice([0, 1055, 3153, 3006, 6672, 3031, 3340])
+        participants.append(participant)
+
+    return {
+        'metadata': {'matchId': match_id, 'participants': puuids},
+        'info': {
+            'gameCreation': game_creation,
+            'gameDuration': duration,
+            'gameMode': "CLASSIC",
+            'gameVersion': "15.2.1",
+            'queueId': queue_id,
+            'participants': participants,
+        },
+    }
+
+
+class StubMatchHistory:
+    """Deterministic synthetic match history shared by every PUUID"""
+
+    def __init__(self, match_count: int = 400, queues: List[int] = None,
+                 first_game: int = DEFAULT_FIRST_GAME, spacing: int = DEFAULT_GAME_SPACING,
+                 platform: str = "NA1"):
+        self.queues = queues or [400, 420]
+        # Newest first, like the real by-puuid endpoint
+        self.games = [
+            (f"{platform}_{1000000 + i}", first_game + i * spacing, self.queues[i % len(self.queues)])
+            for i in reversed(range(match_count))
+        ]
+        self.by_id = {match_id: (created, queue) for match_id, created, queue in self.games}
+
+    def list_ids(self, start_time: Optional[int], end_time: Optional[int],
+                 queue: Optional[int], start: int, count: int, puuid: Optional[str] = None) -> List[str]:
+        """Return a page of match IDs filtered like MATCH-V5 does"""
+        ids = [
+            match_id for match_id, created, game_queue in self.games
+            if (start_time is None or created >= start_time * 1000)
+            and (end_time is None or created <= end_time * 1000)
+            and (queue is None or game_queue == queue)
+        ]
+        return ids[start:start + count]
+
+    def payload(self, match_id: str, puuid: str) -> Optional[Dict]:
+        if match_id not in self.by_id:
+            return None
+        created, queue = self.by_id[match_id]
+        return synthetic_match(match_id, puuid, created, queue)
+
+
+class RecordedMatchHistory(StubMatchHistory):
+    """
+    Replays recorded MATCH-V5 payloads instead of synthetic ones.
+
+    Listing by PUUID only returns the matches that PUUID played in, and
+    details are served exactly as recorded. Everything is held in memory.
+    """
+
+    def __init__(self, matches: Iterable[Dict]):
+        self.payloads = {match['metadata']['matchId']: match for match in matches}
+        self.games = sorted(
+            ((match_id, match['info']['gameCreation'], match['info']['queueId'])
+             for match_id, match in self.payloads.items()),
+            key=lambda game: game[1], reverse=True,
+        )
+        self.by_id = {match_id: (created, queue) for match_id, created, queue in self.games}
+        self.queues = sorted({queue for _, _, queue in self.games})
+
+    @classmethod
+    def load(cls, path: Path) -> "RecordedMatchHistory":
+        """
+        Load recordings from a match store root (e.g. data/raw), or from a
+        directory of JSON files holding one match or an array of them, plain
+        or gzipped (e.g. data/cache/matches or legacy raw_matches_*.json).
+        """
+        return cls(_iter_recorded(Path(path)))
+
+    def list_ids(self, start_time: Optional[int], end_time: Optional[int],
+                 queue: Optional[int], start: int, count: int, puuid: Optional[str] = None) -> List[str]:
+        ids = super().list_ids(start_time, end_time, queue, 0, len(self.games))
+        if puuid is not None:
+            ids = [match_id for match_id in ids
+                   if puuid in self.payloads[match_id]['metadata'].get('participants', [])]
+        return ids[start:start + count]
+
+    def payload(self, match_id: str, puuid: str) -> Optional[Dict]:
+        return self.payloads.get(match_id)
+
+
+def _iter_recorded(path: Path) -> Iterator[Dict]:
+    if (path / "journal").is_dir() or (path / "segments").is_dir():
+        store = MatchStore(path)
+        yield from store.iter_matches(list(store.catalog))
+        return
+
+    for file in sorted(path.rglob("*.json*")):
+        if file.name.endswith(".json.gz"):
+            with gzip.open(file, 'rt', encoding='utf-8') as f:
+                data = json.load(f)
+            yield from (data if isinstance(data, list) else [data])
+        elif file.suffix == ".json":
+            yield from iter_json_array(file)
+
+
+class StubRateLimits:
+    """
+    Riot-style rate limits enforced by the stand-in, per API key.
+
+    Every answered call is reported in X-App-Rate-Limit(-Count) and
+    X-Method-Rate-Limit(-Count) headers. A call over any window gets a 429
+    with Retry-After and X-Rate-Limit-Type, and is not counted.
+    """
+
+    def __init__(self, app_limits: List[Tuple[int, int]],
+                 method_limits: Optional[Dict[str, List[Tuple[int, int]]]] = None):
+        self.app_limits = app_limits
+        self.method_limits = method_limits or {}
+        self._calls: Dict[Tuple[str, str, int], deque] = {}
+        self._lock = threading.Lock()
+
+    def _window(self, api_key: str, bucket: str, window: int, now: float) -> deque:
+        calls = self._calls.setdefault((api_key, bucket, window), deque())
+        while calls and now - calls[0] >= window:
+            calls.popleft()
+        return calls
+
+    @staticmethod
+    def _header(limits: List[Tuple[int, int]]) -> str:
+        return ",".join(f"{count}:{window}" for count, window in limits)
+
+    def hit(self, api_key: str, method: str) -> Tuple[Optional[int], Dict[str, str]]:
+        """
+        Count a call if every window has room.
+
+        Returns:
+            (Retry-After seconds, or None if the call is allowed; response headers)
+        """
+        scopes = [("application", "app", self.app_limits),
+                  ("method", method, self.method_limits.get(method, []))]
+        now = time.time()
+        with self._lock:
+            retry_after, limit_type = 0.0, None
+            for scope, bucket, limits in scopes:
+                for count, window in limits:
+                    calls = self._window(api_key, bucket, window, now)
+                    if len(calls) >= count:
+                        wait = calls[len(calls) - count] + window - now
+                        if wait > retry_after or limit_type is None:
+                            retry_after, limit_type = wait, scope
+
+            if limit_type is None:
+                for _, bucket, limits in scopes:
+                    for _, window in limits:
+                        self._window(api_key, bucket, window, now).append(now)
+
+            headers = {}
+            for prefix, (_, bucket, limits) in zip(("X-App", "X-Method"), scopes):
+                if limits:
+                    headers[f"{prefix}-Rate-Limit"] = self._header(limits)
+                    headers[f"{prefix}-Rate-Limit-Count"] = ",".join(
+                        f"{len(self._window(api_key, bucket, window, now))}:{window}" for _, window in limits)
+
+        if limit_type is None:
+            return None, headers
+        headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+        headers['X-Rate-Limit-Type'] = limit_type
+        return int(headers['Retry-After']), headers
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Request handler for the ACCOUNT-V1 and MATCH-V5 subset used by the extractor"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload, headers: Dict = None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.record_status(status)
+
+    def _send_error(self, status: int, message: str, headers: Dict = None):
+        self._send_json(status, {'status': {'status_code': status, 'message': message}}, headers)
+
+    def do_GET(self):
+        server = self.server
+        server.record_request()
+        if server.latency:
+            time.sleep(server.latency)
+
+        parsed = urlparse(self.path)
+        parts = [unquote(part) for part in parsed.path.strip('/').split('/')]
+        query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        api_key = self.headers.get('X-Riot-Token', "")
+
+        if server.api_keys is not None and api_key not in server.api_keys:
+            self._send_error(403, "Forbidden")
+            return
+        if server.fault():
+            self._send_error(server.error_status, "Service unavailable")
+            return
+
+        headers = {}
+        if server.rate_limits is not None:
+            retry_after, headers = server.rate_limits.hit(api_key, method_for_url(parsed.path))
+            if retry_after is not None:
+                self._send_error(429, "Rate limit exceeded", headers)
+                return
+
+        # /riot/account/v1/accounts/by-riot-id/{gameName}/{tagLine}
+        if parts[:5] == ['riot', 'account', 'v1', 'accounts', 'by-riot-id'] and len(parts) == 7:
+            self._send_json(200, {'puuid': server.puuid, 'gameName': parts[5], 'tagLine': parts[6]}, headers)
+            return
+
+        # /riot/account/v1/accounts/by-puuid/{puuid}
+        if parts[:5] == ['riot', 'account', 'v1', 'accounts', 'by-puuid'] and len(parts) == 6:
+            self._send_json(200, {'puuid': parts[5], 'gameName': "Stub", 'tagLine': "STUB"}, headers)
+            return
+
+        # /lol/match/v5/matches/by-puuid/{puuid}/ids
+        if parts[:4] == ['lol', 'match', 'v5', 'matches'] and len(parts) == 7 and parts[4] == 'by-puuid':
+            ids = server.history.list_ids(
+                int(query['startTime']) if 'startTime' in query else None,
+                int(query['endTime']) if 'endTime' in query else None,
+                int(query['queue']) if 'queue' in query else None,
+                int(query.get('start', 0)),
+                min(int(query.get('count', 20)), 100),
+                parts[5],
+            )
+            self._send_json(200, ids, headers)
+            return
+
+        # /lol/match/v5/matches/{matchId}
+        if parts[:4] == ['lol', 'match', 'v5', 'matches'] and len(parts) == 5:
+            payload = server.history.payload(parts[4], server.puuid)
+            if payload is None:
+                self._send_error(404, "Data not found", headers)
+                return
+            self._send_json(200, payload, headers)
+            return
+
+        self._send_error(404, "Unknown endpoint", headers)
+
+
+class RiotStubServer(ThreadingHTTPServer):
+    """
+    Threaded local stand-in for the Riot API.
+
+    Every Riot ID resolves to `puuid`, and every synthetic match has that
+    PUUID as participant 1. Optional behaviour:
+        rate_limits   Riot-style limits (and headers) enforced per API key
+        latency       seconds added to every response
+        error_rate    share of calls answered with error_status instead
+        api_keys      keys accepted; any other gets a 403
+
+    Usage:
+        with RiotStubServer(puuid, latency=0.05) as server:
+            client = RiotAPIClient("stub-key", base_url=server.url)
+    """
+
+    daemon_threads = True
+
+    def __init__(self, puuid: str, history: StubMatchHistory = None,
+                 latency: float = 0.0, host: str = "127.0.0.1", port: int = 0,
+                 rate_limits: Optional[StubRateLimits] = None, error_rate: float = 0.0,
+                 error_status: int = 503, api_keys: Optional[Collection[str]] = None,
+                 seed: Optional[int] = None):
+        super().__init__((host, port), _StubHandler)
+        self.puuid = puuid
+        self.history = history or StubMatchHistory()
+        self.latency = latency
+        self.rate_limits = rate_limits
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.api_keys = set(api_keys) if api_keys is not None else None
+        self.request_count = 0
+        self.status_counts: Counter = Counter()
+        self._rng = random.Random(seed)
+        self._count_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record_request(self):
+        with self._count_lock:
+            self.request_count += 1
+
+    def record_status(self, status: int):
+        with self._count_lock:
+            self.status_counts[status] += 1
+
+    def fault(self) -> bool:
+        """Whether to answer this call with an injected server error"""
+        if not self.error_rate:
+            return False
+        with self._count_lock:
+            return self._rng.random() < self.error_rate
+
+    def start(self):
+        """Serve requests on a background thread"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def parse_method_limits(values: List[str]) -> Dict[str, List[Tuple[int, int]]]:
+    """Parse repeated METHOD=LIMITS options, e.g. match-details=2000:10"""
+    limits = {}
+    for value in values:
+        method, _, header = value.partition('=')
+        limits[method] = parse_rate_header(header)
+    return limits
+
+
+def main():
+    """Run the stand-in server in the foreground"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local Riot API stand-in server")
+    parser.add_argument('--port', type=int, default=8787)
+    parser.add_argument('--puuid', default="stub-player")
+    parser.add_argument('--matches', type=int, default=400)
+    parser.add_argument('--replay', type=Path, default=None,
+                        help="Serve recorded matches from a match store root (e.g. data/raw) or a "
+                             "directory of match JSON files instead of synthetic ones")
+    parser.add_argument('--latency', type=float, default=0.05, help="Seconds added to every response")
+    parser.add_argument('--app-limits', default=None,
+                        help="Enforce application limits per key, e.g. 20:1,100:120 (default: none)")
+    parser.add_argument('--method-limit', action='append', default=[], metavar="METHOD=LIMITS",
+                        help="Enforce a method limit, e.g. match-details=2000:10 (repeatable)")
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help="Share of calls answered with a server error (default: %(default)s)")
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--seed', type=int, default=None, help="Seed for fault injection")
+    args = parser.parse_args()
+
+    history = RecordedMatchHistory.load(args.replay) if args.replay else StubMatchHistory(args.matches)
+    rate_limits = None
+    if args.app_limits or args.method_limit:
+        rate_limits = StubRateLimits(parse_rate_header(args.app_limits),
+                                     parse_method_limits(args.method_limit))
+    server = RiotStubServer(args.puuid, history, args.latency, port=args.port, rate_limits=rate_limits,
+                            error_rate=args.error_rate, error_status=args.error_status, seed=args.seed)
+    print(f"🧪 Riot API stand-in listening on {server.url} ({len(history.games)} matches"
+          f"{', recorded' if args.replay else ''})")
+    print(f"   Point the extractor at it with RIOT_API_BASE_URL={server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
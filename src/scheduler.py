@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Fair-Share Scheduler
+Splits one rate limit budget between players extracting at the same time.
+"""
+
+import heapq
+import itertools
+import sys
+import threading
+import time
+from typing import Dict, List, Mapping, Optional
+
+# Priority lanes: a waiting live call always goes before any backfill call
+LANE_LIVE = 0
+LANE_BACKFILL = 1
+LANE_NAMES = {LANE_LIVE: "live", LANE_BACKFILL: "backfill"}
+
+
+class PlayerShare:
+    """One player's weight and usage of a shared budget"""
+
+    def __init__(self, player_id: str, weight: float):
+        self.player_id = player_id
+        self.weight = weight
+        self.finish = {lane: 0.0 for lane in LANE_NAMES}
+        self.calls = 0
+        self.lane_calls = {lane: 0 for lane in LANE_NAMES}
+        self.contended_calls = 0
+        self.waited = 0.0
+
+
+class FairShareScheduler:
+    """
+    Weighted fair queuing in front of a rate limiter.
+
+    Every call a player asks for gets a virtual start tag of
+    max(scheduler virtual time, the player's previous finish tag), and
+    advances the player's finish tag by 1/weight. Waiting calls are handed to
+    the limiter in tag order, so while several players are backlogged each
+    receives calls in proportion to its weight, however many threads it
+    fetches with. A player that goes idle does not bank credit: its next call
+    starts at the current virtual time.
+
+    Calls also carry a lane. Live calls (a player's newest matches) are
+    always handed out before backfill calls, so backfill only gets the budget
+    live work leaves over; fair queuing applies within each lane.
+
+    Only one call sits in the limiter at a time. The limiter decides when it
+    may go, so the budget is spent exactly as fast as without the scheduler.
+    """
+
+    def __init__(self, limiter, name: str = ""):
+        self.limiter = limiter
+        self.name = name
+        self.shares: Dict[str, PlayerShare] = {}
+        self.virtual_time = {lane: 0.0 for lane in LANE_NAMES}
+        self._waiting = []  # heap of (lane, start tag, sequence, player_id)
+        self._sequence = itertools.count()
+        self._busy = False
+        self._cond = threading.Condition()
+
+    def budget(self, player_id: str, weight: float = 1.0, lane: int = LANE_BACKFILL) -> "PlayerBudget":
+        """Register a player (once) and get the limiter view an API client in a lane should use"""
+        with self._cond:
+            if player_id not in self.shares:
+                self.shares[player_id] = PlayerShare(player_id, weight)
+        return PlayerBudget(self, player_id, lane)
+
+    def acquire(self, player_id: str, method: str, lane: int = LANE_BACKFILL) -> float:
+        """
+        Wait for the player's turn in its lane, then for the limiter.
+
+        Returns:
+            Seconds spent waiting in total
+        """
+        share = self.shares[player_id]
+        requested = time.time()
+        with self._cond:
+            start = max(self.virtual_time[lane], share.finish[lane])
+            share.finish[lane] = start + 1.0 / share.weight
+            ticket = (lane, start, next(self._sequence), player_id)
+            heapq.heappush(self._waiting, ticket)
+            while self._busy or self._waiting[0] is not ticket:
+                self._cond.wait()
+            heapq.heappop(self._waiting)
+            self._busy = True
+            self.virtual_time[lane] = start
+            contended = any(waiting[3] != player_id for waiting in self._waiting)
+
+        try:
+            self.limiter.acquire(method)
+        finally:
+            waited = time.time() - requested
+            with self._cond:
+                self._busy = False
+                share.calls += 1
+                share.lane_calls[lane] += 1
+                share.contended_calls += contended
+                share.waited += waited
+                self._cond.notify_all()
+        return waited
+
+    def fairness(self) -> Optional[float]:
+        """
+        Jain's fairness index of weighted calls made while other players were waiting too.
+
+        1.0 means the budget was split exactly by weight; 1/n means one of the
+        n players got all of it. None if players never competed.
+        """
+        loads = [share.contended_calls / share.weight
+                 for share in self.shares.values() if share.contended_calls]
+        if len(loads) < 2:
+            return None
+        return sum(loads) ** 2 / (len(loads) * sum(load * load for load in loads))
+
+    def report(self) -> List[str]:
+        """Lines describing how the budget was split"""
+        total = sum(share.calls for share in self.shares.values())
+        total_weight = sum(share.weight for share in self.shares.values())
+        title = f"⚖️  Rate budget split{f' ({self.name})' if self.name else ''}: {total} calls"
+        lines = [title]
+        for share in self.shares.values():
+            wait = share.waited / share.calls if share.calls else 0.0
+            lanes = ", ".join(f"{LANE_NAMES[lane]} {calls}" for lane, calls in share.lane_calls.items())
+            lines.append(f"   {share.player_id:<20} weight {share.weight:g} "
+                         f"(target {share.weight / total_weight:.0%})  calls {share.calls:>6} "
+                         f"({share.calls / total if total else 0:.0%}; {lanes})  avg wait {wait:.2f}s")
+        fairness = self.fairness()
+        if fairness is not None:
+            lines.append(f"   Fairness while competing (Jain's index, 1.0 = by weight): {fairness:.3f}")
+        return lines
+
+
+class PlayerBudget:
+    """
+    A player's view of a scheduled limiter, in one priority lane.
+
+    Has the limiter interface RiotAPIClient uses, so a client can be handed
+    one in place of the limiter itself.
+    """
+
+    def __init__(self, scheduler: FairShareScheduler, player_id: str, lane: int = LANE_BACKFILL):
+        self.scheduler = scheduler
+        self.player_id = player_id
+        self.lane = lane
+
+    def acquire(self, method: str) -> float:
+        return self.scheduler.acquire(self.player_id, method, self.lane)
+
+    def update_from_headers(self, method: str, headers: Mapping[str, str]):
+        self.scheduler.limiter.update_from_headers(method, headers)
+
+    def block_for(self, seconds: float):
+        self.scheduler.limiter.block_for(seconds)
+
+
+class PrefixedOutput:
+    """
+    Stand-in for sys.stdout while several players extract at once.
+
+    Each thread's output is buffered until a newline and then written as one
+    line prefixed with that thread's label, so lines from different players
+    never interleave. Carriage-return progress updates collapse to the last
+    one written before the newline.
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def set_label(self, label: str):
+        """Label every line the calling thread writes from now on"""
+        self._local.label = label
+
+    def write(self, text: str) -> int:
+        buffer = getattr(self._local, 'buffer', '') + text
+        *lines, self._local.buffer = buffer.split('\n')
+        if lines:
+            label = getattr(self._local, 'label', None)
+            prefix = f"[{label}] " if label else ""
+            with self._lock:
+                for line in lines:
+                    shown = [part for part in line.split('\r') if part.strip()]
+                    if shown:
+                        self.stream.write(f"{prefix}{shown[-1].rstrip()}\n")
+                self.stream.flush()
+        return len(text)
+
+    def flush(self):
+        with self._lock:
+            self.stream.flush()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Surrogate Key Registry
+Star schema surrogate keys that are unique across every player and stable
+across runs, kept in a SQLite file shared by every transform process.
+"""
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Hashable, Iterable, List
+
+# Shared by every player's transform in this checkout, wherever it is run from
+KEY_REGISTRY_PATH = Path(__file__).parent.parent / "data" / "surrogate_keys.sqlite"
+
+# Natural keys looked up per query (SQLite caps the number of bound parameters)
+QUERY_BATCH = 500
+
+
+def encode_natural_key(natural_key: Hashable) -> str:
+    """Text form of a natural key (an ID, a string, or a tuple of them)"""
+    return json.dumps(natural_key, separators=(',', ':'))
+
+
+class SurrogateKeyRegistry:
+    """
+    Natural key -> surrogate key mapping per dimension, persisted in SQLite.
+
+    A natural key gets the next free key of its dimension the first time
+    any player's transform sees it and keeps it from then on, so
+    data/{player_id} CSVs never use one key for two entities and a rerun
+    reproduces the keys of the last one. Assignment happens inside an
+    IMMEDIATE transaction that re-reads the mapping, so transforms running
+    in parallel processes agree on every key. Mappings already read are
+    cached in memory.
+    """
+
+    def __init__(self, path: Path = KEY_REGISTRY_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), timeout=60, isolation_level=None,
+                                   check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS surrogate_keys (dimension TEXT NOT NULL, "
+                         "natural_key TEXT NOT NULL, surrogate INTEGER NOT NULL, "
+                         "PRIMARY KEY (dimension, natural_key), UNIQUE (dimension, surrogate))")
+        self._cache: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def _known(self, dimension: str) -> Dict[str, int]:
+        known = self._cache.get(dimension)
+        if known is None:
+            rows = self._db.execute("SELECT natural_key, surrogate FROM surrogate_keys WHERE dimension = ?",
+                                    (dimension,)).fetchall()
+            known = self._cache[dimension] = dict(rows)
+        return known
+
+    def key_for(self, dimension: str, natural_key: Hashable) -> int:
+        """The surrogate key of a natural key, assigning the next free one on first sight"""
+        return self.keys_for(dimension, [natural_key])[0]
+
+    def keys_for(self, dimension: str, natural_keys: Iterable[Hashable]) -> List[int]:
+        """Surrogate keys of several natural keys, assigning any new ones in one transaction"""
+        encoded = [encode_natural_key(natural_key) for natural_key in natural_keys]
+        with self._lock:
+            known = self._known(dimension)
+            missing = [text for text in dict.fromkeys(encoded) if text not in known]
+            if missing:
+                self._assign(dimension, missing, known)
+            return [known[text] for text in encoded]
+
+    def _assign(self, dimension: str, missing: List[str], known: Dict[str, int]):
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have assigned some of them since they were cached
+            for start in range(0, len(missing), QUERY_BATCH):
+                batch = missing[start:start + QUERY_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                known.update(self._db.execute(
+                    f"SELECT natural_key, surrogate FROM surrogate_keys "
+                    f"WHERE dimension = ? AND natural_key IN ({placeholders})",
+                    [dimension] + batch).fetchall())
+            next_key = self._db.execute("SELECT COALESCE(MAX(surrogate), 0) + 1 FROM surrogate_keys "
+                                        "WHERE dimension = ?", (dimension,)).fetchone()[0]
+            rows = []
+            for text in missing:
+                if text not in known:
+                    rows.append((dimension, text, next_key))
+                    next_key += 1
+            self._db.executemany("INSERT INTO surrogate_keys (dimension, natural_key, surrogate) "
+                                 "VALUES (?, ?, ?)", rows)
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        known.update((text, key) for _, text, key in rows)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
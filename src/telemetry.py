@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Extraction Telemetry
+Latency histograms, status counts, sleep and stage timings for an extraction
+run, exported as JSON and in the Prometheus text format.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+TELEMETRY_DIR = Path("data/telemetry")
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Why a worker slept
+SLEEP_RATE_LIMIT = "rate-limit"       # waiting for the limiter, including Retry-After blocks
+SLEEP_BACKOFF = "backoff"             # retry backoff after a 5xx or timeout
+SLEEP_CIRCUIT_BREAKER = "circuit-breaker"
+
+# Timed stages
+STAGE_JSON_DECODE = "json-decode"
+STAGE_STORE_WRITE = "store-write"
+STAGE_CACHE_WRITE = "cache-write"
+# One year window of one listing pass, network and sleeps included
+STAGE_YEAR_WINDOW = "year-window"
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th quantile (None if it is past the last bucket)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        for bound, cumulative in zip(self.buckets, self.counts):
+            if cumulative >= rank:
+                return bound
+        return None
+
+    def to_dict(self) -> Dict:
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'mean': round(self.sum / self.count, 6) if self.count else None,
+            'max': round(self.max, 6),
+            'p50_le': self.quantile(0.5),
+            'p95_le': self.quantile(0.95),
+            'p99_le': self.quantile(0.99),
+            'buckets': {str(bound): count for bound, count in zip(self.buckets, self.counts)},
+        }
+
+
+class Telemetry:
+    """
+    Instrumentation for one extraction run, shared by every client and thread.
+
+    Records, per endpoint (rate limit method), a latency histogram and
+    counts by status code (or exception name for calls that got no
+    response); seconds slept per cause; seconds spent in stages such as JSON
+    decoding and store writes; and named event counters such as matches
+    fetched, from which matches/sec is derived.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.latency: Dict[str, Histogram] = {}
+        self.statuses: Dict[Tuple[str, str], int] = {}
+        self.sleep: Dict[str, float] = {}
+        self.stages: Dict[str, float] = {}
+        self.events: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def observe_request(self, endpoint: str, status, seconds: float):
+        with self._lock:
+            histogram = self.latency.get(endpoint)
+            if histogram is None:
+                histogram = self.latency[endpoint] = Histogram()
+            histogram.observe(seconds)
+            key = (endpoint, str(status))
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+
+    def add_sleep(self, cause: str, seconds: float):
+        if seconds > 0:
+            with self._lock:
+                self.sleep[cause] = self.sleep.get(cause, 0.0) + seconds
+
+    def add_stage(self, stage: str, seconds: float):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def timed(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(stage, time.perf_counter() - started)
+
+    def count(self, event: str, amount: int = 1):
+        with self._lock:
+            self.events[event] = self.events.get(event, 0) + amount
+
+    def status_count(self, predicate) -> int:
+        """Calls whose status (a string) satisfies predicate"""
+        with self._lock:
+            return sum(count for (_, status), count in self.statuses.items() if predicate(status))
+
+    def total_sleep(self) -> float:
+        with self._lock:
+            return sum(self.sleep.values())
+
+    def snapshot(self) -> Dict:
+        """Everything recorded so far, JSON-ready"""
+        with self._lock:
+            elapsed = time.time() - self.started
+            endpoints = {}
+            for endpoint, histogram in sorted(self.latency.items()):
+                endpoints[endpoint] = {
+                    'statuses': {status: count for (name, status), count in sorted(self.statuses.items())
+                                 if name == endpoint},
+                    'latency_seconds': histogram.to_dict(),
+                }
+            fetched = self.events.get('matches_fetched', 0)
+            return {
+                'started_at': datetime.fromtimestamp(self.started, tz=timezone.utc).isoformat(),
+                'elapsed_seconds': round(elapsed, 3),
+                'requests': endpoints,
+                'sleep_seconds': {cause: round(seconds, 3) for cause, seconds in sorted(self.sleep.items())},
+                'stage_seconds': {stage: round(seconds, 3) for stage, seconds in sorted(self.stages.items())},
+                'events': dict(sorted(self.events.items())),
+                'matches_per_second': round(fetched / elapsed, 3) if elapsed else 0.0,
+            }
+
+    def to_prometheus(self) -> str:
+        """Everything recorded so far in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines: List[str] = []
+
+        def metric(name: str, kind: str, help_text: str):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        metric("riot_request_duration_seconds", "histogram", "Riot API call latency by endpoint")
+        with self._lock:
+            for endpoint, histogram in sorted(self.latency.items()):
+                label = f'endpoint="{endpoint}"'
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    lines.append(f'riot_request_duration_seconds_bucket{{{label},le="{bound}"}} {count}')
+                lines.append(f'riot_request_duration_seconds_bucket{{{label},le="+Inf"}} {histogram.count}')
+                lines.append(f'riot_request_duration_seconds_sum{{{label}}} {histogram.sum:.6f}')
+                lines.append(f'riot_request_duration_seconds_count{{{label}}} {histogram.count}')
+
+        metric("riot_requests_total", "counter", "Riot API calls by endpoint and status")
+        for endpoint, data in snapshot['requests'].items():
+            for status, count in data['statuses'].items():
+                lines.append(f'riot_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}')
+
+        metric("extraction_sleep_seconds_total", "counter", "Seconds workers slept, by cause")
+        for cause, seconds in snapshot['sleep_seconds'].items():
+            lines.append(f'extraction_sleep_seconds_total{{cause="{cause}"}} {seconds}')
+
+        metric("extraction_stage_seconds_total", "counter", "Seconds spent per stage")
+        for stage, seconds in snapshot['stage_seconds'].items():
+            lines.append(f'extraction_stage_seconds_total{{stage="{stage}"}} {seconds}')
+
+        metric("extraction_events_total", "counter", "Extraction events such as matches fetched")
+        for event, count in snapshot['events'].items():
+            lines.append(f'extraction_events_total{{event="{event}"}} {count}')
+
+        metric("extraction_elapsed_seconds", "gauge", "Seconds since the run started")
+        lines.append(f"extraction_elapsed_seconds {snapshot['elapsed_seconds']}")
+        metric("extraction_matches_per_second", "gauge", "Matches fetched from the API per second of run")
+        lines.append(f"extraction_matches_per_second {snapshot['matches_per_second']}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, directory: Path = TELEMETRY_DIR, name: str = "extraction"):
+        """Write {name}.json and {name}.prom, each replaced atomically"""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        outputs = ((f"{name}.json", json.dumps(self.snapshot(), indent=2) + "\n"),
+                   (f"{name}.prom", self.to_prometheus()))
+        for filename, content in outputs:
+            path = directory / filename
+            tmp_path = path.with_name(path.name + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+
+    def summary_lines(self) -> List[str]:
+        """Short human-readable summary for the end of a run"""
+        snapshot = self.snapshot()
+        lines = [f"📈 Telemetry ({snapshot['elapsed_seconds']:.0f}s, "
+                 f"{snapshot['matches_per_second']:.2f} matches/s fetched)"]
+        for endpoint, data in snapshot['requests'].items():
+            latency = data['latency_seconds']
+            statuses = ", ".join(f"{status}: {count}" for status, count in data['statuses'].items())
+            p95 = latency['p95_le'] or f">{LATENCY_BUCKETS[-1]:g}"
+            lines.append(f"   {endpoint:<14} {latency['count']:>6} calls  "
+                         f"mean {latency['mean'] * 1000:.0f} ms  p95 ≤ {p95} s  ({statuses})")
+        if snapshot['sleep_seconds']:
+            lines.append("   Asleep: " + ", ".join(f"{cause} {seconds:.1f}s"
+                                                  for cause, seconds in snapshot['sleep_seconds'].items()))
+        if snapshot['stage_seconds']:
+            lines.append("   Stages: " + ", ".join(f"{stage} {seconds:.1f}s"
+                                                  for stage, seconds in snapshot['stage_seconds'].items()))
+        return lines
+
+
+class TelemetryWriter:
+    """Writes a Telemetry's JSON and Prometheus files every `interval` seconds until stopped"""
+
+    def __init__(self, telemetry: Telemetry, directory: Path = TELEMETRY_DIR, interval: float = 30.0):
+        self.telemetry = telemetry
+        self.directory = Path(directory)
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.telemetry.write(self.directory)
+
+    def start(self) -> "TelemetryWriter":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop writing periodically and write the final summary"""
+        self._stop.set()
+        self._thread.join()
+        self.telemetry.write(self.directory)
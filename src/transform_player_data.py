@@ -4,48 +4,125 @@ Transform Player Data to Star Schema
 Converts raw match JSON data to Kimball dimensional model CSVs
 """
 
+import argparse
 import json
 import csv
 import sys
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Set
+from typing import Dict, List, Optional, Set, Tuple
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 
 # Add parent directory to path
 sys.path.append(str(Path(__file__).parent.parent))
 
+from derived_metrics import DerivedMetricsBatch
+from dimension_registry import DimensionRegistry
+from extraction_state import atomic_write_json, load_json
+from match_journal import iter_json_array
+from match_store import MatchStore, PlayerMatchIndex, RAW_STORE_DIR
+from surrogate_keys import SurrogateKeyRegistry
+
+CHAMPION_COLUMNS = ('champion_key', 'champion_id', 'champion_name', 'role', 'icon_url')
+DATE_COLUMNS = ('date_key', 'full_date', 'year', 'month', 'day', 'day_of_week', 'is_weekend', 'hour_of_day')
+QUEUE_COLUMNS = ('queue_key', 'queue_id', 'queue_name', 'is_ranked')
+RUNE_COLUMNS = (
+    ('rune_key', 'rune_primary_id', 'rune_secondary_id', 'primary_style_name', 'sub_style_name')
+    + tuple(f'{prefix}_{field}'
+            for prefix in ('keystone', 'primary_rune2', 'primary_rune3', 'primary_rune4',
+                           'secondary_rune1', 'secondary_rune2')
+            for field in ('id', 'name', 'icon'))
+)
+ITEM_COLUMNS = ('item_key', 'item_id', 'item_name', 'icon_url')
+MATCH_METADATA_COLUMNS = ('match_key', 'match_id', 'timestamp')
+
+# What the last transform of a player left behind, for incremental runs
+TRANSFORM_STATE_FILE = 'transform_state.json'
+# Bump whenever the CSV layout changes, so every player is rebuilt once
+TRANSFORM_STATE_VERSION = 1
+
+# Tables that grow by one or more rows per match, so incremental runs append to them
+FACT_TABLES = ('fact_matches', 'bridge_match_items', 'bridge_match_participants')
+APPENDED_TABLES = FACT_TABLES + ('dim_match_metadata',)
+
+# Dimension each key column of the fact and bridge rows refers to
+ROW_KEY_DIMENSIONS = {
+    'match_key': 'dim_match_metadata',
+    'champion_key': 'dim_champion',
+    'date_key': 'dim_date',
+    'queue_key': 'dim_queue',
+    'rune_key': 'dim_rune',
+    'item_key': 'dim_items',
+}
+
+
+def _rune_signature(primary_style: int, sub_style: int, primary_runes: List[int],
+                    secondary_runes: List[int]):
+    """
+    Natural key of a rune setup: the styles plus the first four primary and
+    two secondary runes, padded with 0, which is what its row records
+    """
+    return (primary_style, sub_style,
+            tuple((primary_runes[:4] + [0] * 4)[:4]),
+            tuple((secondary_runes[:2] + [0] * 2)[:2]))
+
+
+# Natural key of a dimension row read back from its CSV (all values are strings there)
+ROW_NATURAL_KEYS = {
+    'dim_champion': lambda row: int(row['champion_id']),
+    'dim_date': lambda row: row['full_date'],
+    'dim_queue': lambda row: int(row['queue_id']),
+    'dim_rune': lambda row: _rune_signature(
+        int(row['rune_primary_id']), int(row['rune_secondary_id']),
+        [int(row[f'{prefix}_id']) for prefix in ('keystone', 'primary_rune2', 'primary_rune3', 'primary_rune4')],
+        [int(row[f'secondary_rune{i}_id']) for i in (1, 2)]),
+    'dim_items': lambda row: int(row['item_id']),
+    'dim_match_metadata': lambda row: row['match_id'],
+}
+
 
 class StarSchemaBuilder:
-    """Builds Kimball star schema from raw match data"""
+    """
+    Builds Kimball star schema from raw match data
+    
+    Surrogate keys come from `keys`, the key registry shared by every
+    player, so a key means the same champion, date, queue, rune setup or
+    match in every player's CSVs and keeps its value from run to run.
+    """
     
-    def __init__(self, player_id: str, puuid: str):
+    def __init__(self, player_id: str, puuid: str, keys: SurrogateKeyRegistry = None):
         self.player_id = player_id
         self.puuid = puuid
         self.data_dir = Path(f"data/{player_id}")
+        self.keys = keys if keys is not None else SurrogateKeyRegistry()
+        self._create_tables()
         
-        # Dimensions
-        self.dim_champions = {}
-        self.dim_dates = {}
-        self.dim_queues = {}
-        self.dim_runes = {}
-        self.dim_items = {}
-        self.dim_match_metadata = {}
-        
-        # Facts and bridges
+        # Load Data Dragon rune mapping
+        self.ddragon_runes = self._load_ddragon_runes()
+    
+    def _create_tables(self):
+        # Dimensions, each indexed by its natural key (items are keyed by item ID)
+        self.dim_champions = DimensionRegistry('dim_champion', CHAMPION_COLUMNS, self.keys)
+        self.dim_dates = DimensionRegistry('dim_date', DATE_COLUMNS, self.keys)
+        self.dim_queues = DimensionRegistry('dim_queue', QUEUE_COLUMNS, self.keys)
+        self.dim_runes = DimensionRegistry('dim_rune', RUNE_COLUMNS, self.keys)
+        self.dim_items = DimensionRegistry('dim_items', ITEM_COLUMNS)
+        self.dim_match_metadata = DimensionRegistry('dim_match_metadata', MATCH_METADATA_COLUMNS, self.keys)
+        
+        # Facts and bridges (in an incremental run, only the rows of new matches)
         self.fact_matches = []
         self.bridge_match_items = []
         self.bridge_match_participants = []
+        # Fact and participant rows whose KDA, per-minute and participation columns are still to compute
+        self.metrics = DerivedMetricsBatch()
         
-        # Counters for keys
-        self.champion_key_counter = 1
-        self.date_key_counter = 1
-        self.queue_key_counter = 1
-        self.rune_key_counter = 1
-        self.match_key_counter = 1
-        
-        # Load Data Dragon rune mapping
-        self.ddragon_runes = self._load_ddragon_runes()
+        # Dimension sizes as loaded from the last transform
+        self.loaded_sizes: Dict[str, int] = {}
+    
+    def _dimensions(self) -> List[DimensionRegistry]:
+        return [self.dim_champions, self.dim_dates, self.dim_queues, self.dim_runes,
+                self.dim_items, self.dim_match_metadata]
     
     def _load_ddragon_runes(self) -> Dict:
         """Load Data Dragon rune mapping from JSON file"""
@@ -62,38 +139,22 @@ class StarSchemaBuilder:
         
     def _get_or_create_champion_key(self, champion_id: int, champion_name: str) -> int:
         """Get existing or create new champion dimension key"""
-        for key, champ in self.dim_champions.items():
-            if champ['champion_id'] == champion_id:
-                return key
-        
-        key = self.champion_key_counter
-        self.champion_key_counter += 1
-        
-        self.dim_champions[key] = {
+        return self.dim_champions.get_or_create(champion_id, lambda key: {
             'champion_key': key,
             'champion_id': champion_id,
             'champion_name': champion_name,
             'role': 'Unknown',  # Can be enhanced later
             'icon_url': f'https://ddragon.leagueoflegends.com/cdn/15.2.1/img/champion/{champion_name}.png'
-        }
-        
-        return key
+        })
     
     def _get_or_create_date_key(self, timestamp: int) -> int:
         """Get existing or create new date dimension key"""
         dt = datetime.fromtimestamp(timestamp / 1000)
         date_str = dt.strftime('%Y-%m-%d')
         
-        for key, date_dim in self.dim_dates.items():
-            if date_dim['full_date'] == date_str:
-                return key
-        
-        key = self.date_key_counter
-        self.date_key_counter += 1
-        
         is_weekend = 1 if dt.weekday() >= 5 else 0
         
-        self.dim_dates[key] = {
+        return self.dim_dates.get_or_create(date_str, lambda key: {
             'date_key': key,
             'full_date': date_str,
             'year': dt.year,
@@ -102,49 +163,30 @@ class StarSchemaBuilder:
             'day_of_week': dt.strftime('%A'),
             'is_weekend': is_weekend,
             'hour_of_day': dt.hour
-        }
-        
-        return key
+        })
     
     def _get_or_create_queue_key(self, queue_id: int, queue_name: str) -> int:
         """Get existing or create new queue dimension key"""
-        for key, queue in self.dim_queues.items():
-            if queue['queue_id'] == queue_id:
-                return key
-        
-        key = self.queue_key_counter
-        self.queue_key_counter += 1
-        
         is_ranked = 1 if 'Ranked' in queue_name or queue_id == 420 else 0
         
-        self.dim_queues[key] = {
+        return self.dim_queues.get_or_create(queue_id, lambda key: {
             'queue_key': key,
             'queue_id': queue_id,
             'queue_name': queue_name,
             'is_ranked': is_ranked
-        }
-        
-        return key
+        })
     
     def _get_or_create_rune_key(self, primary_style: int, sub_style: int, 
                                  primary_runes: List[int], secondary_runes: List[int]) -> int:
         """Get existing or create new rune dimension key with full rune details"""
-        # Create signature for deduplication
-        rune_signature = (primary_style, sub_style, tuple(primary_runes), tuple(secondary_runes))
-        
-        for key, rune in self.dim_runes.items():
-            existing_sig = (
-                rune['rune_primary_id'], 
-                rune['rune_secondary_id'],
-                tuple([rune.get(f'primary_rune{i}_id', 0) for i in range(1, 5)]),
-                tuple([rune.get(f'secondary_rune{i}_id', 0) for i in range(1, 3)])
-            )
-            if existing_sig == rune_signature:
-                return key
-        
-        key = self.rune_key_counter
-        self.rune_key_counter += 1
-        
+        rune_signature = _rune_signature(primary_style, sub_style, primary_runes, secondary_runes)
+        return self.dim_runes.get_or_create(
+            rune_signature,
+            lambda key: self._build_rune_row(key, primary_style, sub_style, primary_runes, secondary_runes))
+    
+    def _build_rune_row(self, key: int, primary_style: int, sub_style: int,
+                        primary_runes: List[int], secondary_runes: List[int]) -> Dict:
+        """Rune dimension row with names and icons from Data Dragon"""
         # Rune names mapping (for trees)
         rune_tree_names = {
             8000: "Precision", 8100: "Domination", 8200: "Sorcery",
@@ -200,9 +242,7 @@ class StarSchemaBuilder:
             rune_record[f'secondary_rune{i}_name'] = 'None'
             rune_record[f'secondary_rune{i}_icon'] = ''
         
-        self.dim_runes[key] = rune_record
-        
-        return key
+        return rune_record
     
     def _add_items_to_dimensions(self, items: List[int]):
         """Add items to dimension table"""
@@ -210,13 +250,13 @@ class StarSchemaBuilder:
             if item_id == 0:
                 continue
             
-            if item_id not in self.dim_items:
-                self.dim_items[item_id] = {
-                    'item_key': item_id,
-                    'item_id': item_id,
-                    'item_name': f"Item_{item_id}",
-                    'icon_url': f'https://ddragon.leagueoflegends.com/cdn/15.2.1/img/item/{item_id}.png'
-                }
+            # Items are keyed by their own ID
+            self.dim_items.get_or_create(item_id, lambda key: {
+                'item_key': key,
+                'item_id': item_id,
+                'item_name': f"Item_{item_id}",
+                'icon_url': f'https://ddragon.leagueoflegends.com/cdn/15.2.1/img/item/{item_id}.png'
+            }, key=item_id)
     
     def process_match(self, match_data: Dict):
         """Process a single match and add to star schema"""
@@ -234,16 +274,16 @@ class StarSchemaBuilder:
             print(f"  Warning: Player not found in match {metadata['matchId']}")
             return
         
-        # Create match key
-        match_key = self.match_key_counter
-        self.match_key_counter += 1
+        # Skip a match already processed (e.g. listed in two raw files)
+        if metadata['matchId'] in self.dim_match_metadata:
+            return
         
-        # Add match metadata
-        self.dim_match_metadata[match_key] = {
-            'match_key': match_key,
+        # Create match key and metadata
+        match_key = self.dim_match_metadata.get_or_create(metadata['matchId'], lambda key: {
+            'match_key': key,
             'match_id': metadata['matchId'],
             'timestamp': info['gameCreation']
-        }
+        })
         
         # Get dimension keys
         champion_key = self._get_or_create_champion_key(
@@ -284,14 +324,11 @@ class StarSchemaBuilder:
         ]
         self._add_items_to_dimensions(items)
         
-        # Create fact row
-        deaths = player_participant['deaths'] if player_participant['deaths'] > 0 else 1
-        kda = (player_participant['kills'] + player_participant['assists']) / deaths
-        
+        # Create fact row (derived metrics are filled in by finish_metrics)
         cs_total = player_participant['totalMinionsKilled'] + player_participant['neutralMinionsKilled']
         game_duration_minutes = info['gameDuration'] / 60
         
-        self.fact_matches.append({
+        fact_row = {
             'match_key': match_key,
             'champion_key': champion_key,
             'date_key': date_key,
@@ -301,25 +338,27 @@ class StarSchemaBuilder:
             'kills': player_participant['kills'],
             'deaths': player_participant['deaths'],
             'assists': player_participant['assists'],
-            'kda': round(kda, 2),
+            'kda': None,
             'cs_total': cs_total,
-            'cs_per_minute': round(cs_total / game_duration_minutes, 2),
+            'cs_per_minute': None,
             'gold_earned': player_participant['goldEarned'],
-            'gold_per_minute': round(player_participant['goldEarned'] / game_duration_minutes, 2),
+            'gold_per_minute': None,
             'damage_dealt': player_participant['totalDamageDealtToChampions'],
-            'damage_per_minute': round(player_participant['totalDamageDealtToChampions'] / game_duration_minutes, 2),
+            'damage_per_minute': None,
             'damage_taken': player_participant['totalDamageTaken'],
             'vision_score': player_participant['visionScore'],
             'wards_placed': player_participant['wardsPlaced'],
             'wards_killed': player_participant['wardsKilled'],
             'control_wards_purchased': player_participant['visionWardsBoughtInGame'],
-            'kill_participation': round(player_participant.get('challenges', {}).get('killParticipation', 0), 3),
+            'kill_participation': None,
             'double_kills': player_participant['doubleKills'],
             'triple_kills': player_participant['tripleKills'],
             'quadra_kills': player_participant['quadraKills'],
             'penta_kills': player_participant['pentaKills'],
             'game_duration_minutes': round(game_duration_minutes, 2)
-        })
+        }
+        self.fact_matches.append(fact_row)
+        self.metrics.add(fact_row, player_participant, game_duration_minutes)
         
         # Create bridge for items
         for position, item_key in enumerate(items):
@@ -332,8 +371,6 @@ class StarSchemaBuilder:
         
         # Create bridge for all participants
         for participant in info['participants']:
-            p_deaths = participant['deaths'] if participant['deaths'] > 0 else 1
-            p_kda = (participant['kills'] + participant['assists']) / p_deaths
             p_cs = participant['totalMinionsKilled'] + participant['neutralMinionsKilled']
             
             p_items = [
@@ -346,7 +383,7 @@ class StarSchemaBuilder:
                 participant.get('item6', 0),
             ]
             
-            self.bridge_match_participants.append({
+            participant_row = {
                 'match_key': match_key,
                 'puuid': participant['puuid'],
                 'summoner_name': participant.get('summonerName', ''),
@@ -360,22 +397,182 @@ class StarSchemaBuilder:
                 'kills': participant['kills'],
                 'deaths': participant['deaths'],
                 'assists': participant['assists'],
-                'kda': round(p_kda, 2),
+                'kda': None,
                 'cs_total': p_cs,
-                'cs_per_minute': round(p_cs / game_duration_minutes, 2),
+                'cs_per_minute': None,
                 'gold_earned': participant['goldEarned'],
-                'gold_per_minute': round(participant['goldEarned'] / game_duration_minutes, 2),
+                'gold_per_minute': None,
                 'damage_dealt': participant['totalDamageDealtToChampions'],
-                'damage_per_minute': round(participant['totalDamageDealtToChampions'] / game_duration_minutes, 2),
+                'damage_per_minute': None,
                 'vision_score': participant['visionScore'],
                 'control_wards_purchased': participant['visionWardsBoughtInGame'],
-                'kill_participation': round(participant.get('challenges', {}).get('killParticipation', 0), 3),
+                'kill_participation': None,
                 'champion_level': participant['champLevel'],
                 'items': json.dumps(p_items)
-            })
+            }
+            self.bridge_match_participants.append(participant_row)
+            self.metrics.add(participant_row, participant, game_duration_minutes)
+    
+    def finish_metrics(self):
+        """Compute the derived metrics of every row added since the last call, in one batch"""
+        self.metrics.apply()
+    
+    def _csv_sizes(self) -> Dict[str, int]:
+        """Byte size of every CSV the transform writes (None for those not written)"""
+        sizes = {}
+        for name in [dimension.name for dimension in self._dimensions()] + list(FACT_TABLES):
+            path = self.data_dir / f'{name}.csv'
+            sizes[name] = path.stat().st_size if path.exists() else None
+        return sizes
+    
+    def load_previous(self) -> bool:
+        """
+        Load the dimensions the last transform exported, for an incremental run.
+        
+        Returns False (leaving the builder empty) when there is nothing to
+        build on: no transform state, one from another CSV layout, CSVs
+        changed since it was saved (e.g. an interrupted run), or surrogate
+        keys that no longer match the key registry.
+        """
+        state = load_json(self.data_dir / TRANSFORM_STATE_FILE, None)
+        if not state or state.get('version') != TRANSFORM_STATE_VERSION:
+            return False
+        if state.get('csv_sizes') != self._csv_sizes() or not PlayerMatchIndex(self.data_dir).exists():
+            return False
+        
+        for dimension in self._dimensions():
+            with open(self.data_dir / f'{dimension.name}.csv', newline='') as f:
+                reader = csv.DictReader(f)
+                if reader.fieldnames is not None and tuple(reader.fieldnames) != dimension.columns:
+                    break
+                natural_key = ROW_NATURAL_KEYS[dimension.name]
+                key_column = dimension.columns[0]
+                for row in reader:
+                    dimension.restore(int(row[key_column]), natural_key(row), row)
+            
+            if dimension.keys is not None and dimension:
+                natural_keys = [ROW_NATURAL_KEYS[dimension.name](row) for row in dimension.values()]
+                if self.keys.keys_for(dimension.name, natural_keys) != list(dimension):
+                    break
+        else:
+            self.loaded_sizes = {dimension.name: len(dimension) for dimension in self._dimensions()}
+            return True
+        
+        self._create_tables()
+        return False
+    
+    def process_new_matches(self, store: MatchStore = None) -> int:
+        """Process the indexed matches that are not in the loaded dimensions yet"""
+        index = PlayerMatchIndex(self.data_dir)
+        new_ids = [match_id for match_ids in index.ids_by_month().values() for match_id in match_ids
+                   if match_id not in self.dim_match_metadata]
+        print(f"  {len(index)} indexed matches, {len(new_ids)} not transformed yet")
+        if not new_ids:
+            return 0
+        
+        if store is None:
+            store = MatchStore()
+        processed = 0
+        for match in store.iter_matches(new_ids):
+            self.process_match(match)
+            processed += 1
+        if processed < len(new_ids):
+            print(f"  Warning: {len(new_ids) - processed} indexed matches are missing from the match store")
+        print(f"  ✓ Processed {processed} new matches")
+        return processed
     
-    def load_and_process_all_matches(self):
-        """Load all raw match files and process them"""
+    def shards(self, new_only: bool = False) -> List[Tuple[str, Optional[List[str]], Optional[Path]]]:
+        """
+        The player's matches split for transform_shard(), in processing order.
+        
+        Returns:
+            (label, match IDs, None) per month of the match index, or
+            (label, None, raw file) per legacy raw file for a player without one.
+            With new_only, only matches not in the loaded dimensions.
+        """
+        index = PlayerMatchIndex(self.data_dir)
+        if not index.exists():
+            return [(raw_file.name, None, raw_file) for raw_file in sorted(self.data_dir.glob("raw_matches_*.json"))]
+        
+        shards = []
+        for month_key, match_ids in index.ids_by_month().items():
+            if new_only:
+                match_ids = [match_id for match_id in match_ids if match_id not in self.dim_match_metadata]
+            if match_ids:
+                shards.append((month_key, match_ids, None))
+        return shards
+    
+    def merge_shard(self, shard: Dict) -> int:
+        """
+        Add the rows transform_shard() built for a shard under this builder's keys.
+        
+        Dimension rows are matched by natural key; new ones get their keys
+        from the shared registry in the shard's order, so merging the same
+        shards in the same order always assigns the same keys as a
+        sequential transform would. Matches already merged are skipped.
+        
+        Returns:
+            Number of matches added
+        """
+        key_maps: Dict[str, Dict[int, int]] = {}
+        skipped = set()
+        for dimension in self._dimensions():
+            rows = shard['dimensions'][dimension.name]
+            key_column = dimension.columns[0]
+            if dimension.keys is not None:
+                # Assign every key this shard adds in one transaction
+                dimension.keys.keys_for(dimension.name, [natural_key for natural_key, _ in rows
+                                                         if natural_key not in dimension])
+            
+            key_map = key_maps[dimension.name] = {}
+            for natural_key, row in rows:
+                if dimension is self.dim_match_metadata and natural_key in dimension:
+                    skipped.add(row[key_column])
+                    continue
+                key_map[row[key_column]] = dimension.get_or_create(
+                    natural_key, lambda key: {**row, key_column: key},
+                    key=row[key_column] if dimension.keys is None else None)
+        
+        for name in FACT_TABLES:
+            table = getattr(self, name)
+            for row in shard[name]:
+                if row['match_key'] in skipped:
+                    continue
+                for column, dimension_name in ROW_KEY_DIMENSIONS.items():
+                    if column in row:
+                        row[column] = key_maps[dimension_name][row[column]]
+                table.append(row)
+        return len(key_maps['dim_match_metadata'])
+    
+    def load_and_process_all_matches(self, store: MatchStore = None):
+        """Load the player's matches from the shared store and process them"""
+        index = PlayerMatchIndex(self.data_dir)
+        if not index.exists():
+            self._load_legacy_raw_files()
+            return
+        
+        months = index.ids_by_month()
+        print(f"  Found {len(index)} indexed matches across {len(months)} months")
+        
+        if store is None:
+            store = MatchStore()
+        total_matches = 0
+        for month_key, match_ids in months.items():
+            month_matches = 0
+            for match in store.iter_matches(match_ids):
+                self.process_match(match)
+                month_matches += 1
+            
+            if month_matches < len(match_ids):
+                print(f"  Warning: {len(match_ids) - month_matches} indexed matches from {month_key} "
+                      f"are missing from the match store")
+            total_matches += month_matches
+            print(f"    {month_key}: {month_matches} matches")
+        
+        print(f"  ✓ Processed {total_matches} total matches")
+    
+    def _load_legacy_raw_files(self):
+        """Load per-player raw_matches_*.json files written before the shared store"""
         # Use monthly files for organization
         raw_files = sorted(self.data_dir.glob("raw_matches_*.json"))
         
@@ -389,57 +586,30 @@ class StarSchemaBuilder:
         for raw_file in raw_files:
             print(f"  Processing {raw_file.name}...")
             
-            with open(raw_file) as f:
-                matches = json.load(f)
-            
-            for match in matches:
+            file_matches = 0
+            for match in iter_json_array(raw_file):
                 self.process_match(match)
+                file_matches += 1
             
-            total_matches += len(matches)
-            print(f"    {len(matches)} matches")
+            total_matches += file_matches
+            print(f"    {file_matches} matches")
         
         print(f"  ✓ Processed {total_matches} total matches")
     
     def export_to_csv(self):
         """Export all data to CSV files"""
         print(f"  Exporting CSVs to {self.data_dir}...")
+        self.finish_metrics()
         
         # Export dimensions
-        with open(self.data_dir / 'dim_champion.csv', 'w', newline='') as f:
-            if self.dim_champions:
-                writer = csv.DictWriter(f, fieldnames=list(self.dim_champions[next(iter(self.dim_champions))].keys()))
-                writer.writeheader()
-                writer.writerows(self.dim_champions.values())
-        
-        with open(self.data_dir / 'dim_date.csv', 'w', newline='') as f:
-            if self.dim_dates:
-                writer = csv.DictWriter(f, fieldnames=list(self.dim_dates[next(iter(self.dim_dates))].keys()))
-                writer.writeheader()
-                writer.writerows(self.dim_dates.values())
-        
-        with open(self.data_dir / 'dim_queue.csv', 'w', newline='') as f:
-            if self.dim_queues:
-                writer = csv.DictWriter(f, fieldnames=list(self.dim_queues[next(iter(self.dim_queues))].keys()))
-                writer.writeheader()
-                writer.writerows(self.dim_queues.values())
-        
-        with open(self.data_dir / 'dim_rune.csv', 'w', newline='') as f:
-            if self.dim_runes:
-                writer = csv.DictWriter(f, fieldnames=list(self.dim_runes[next(iter(self.dim_runes))].keys()))
-                writer.writeheader()
-                writer.writerows(self.dim_runes.values())
-        
-        with open(self.data_dir / 'dim_items.csv', 'w', newline='') as f:
-            if self.dim_items:
-                writer = csv.DictWriter(f, fieldnames=list(self.dim_items[next(iter(self.dim_items))].keys()))
-                writer.writeheader()
-                writer.writerows(self.dim_items.values())
-        
-        with open(self.data_dir / 'dim_match_metadata.csv', 'w', newline='') as f:
-            if self.dim_match_metadata:
-                writer = csv.DictWriter(f, fieldnames=list(self.dim_match_metadata[next(iter(self.dim_match_metadata))].keys()))
-                writer.writeheader()
-                writer.writerows(self.dim_match_metadata.values())
+        dimensions = [self.dim_champions, self.dim_dates, self.dim_queues, self.dim_runes,
+                      self.dim_items, self.dim_match_metadata]
+        for dimension in dimensions:
+            with open(self.data_dir / f'{dimension.name}.csv', 'w', newline='') as f:
+                if dimension:
+                    writer = csv.DictWriter(f, fieldnames=dimension.columns)
+                    writer.writeheader()
+                    writer.writerows(dimension.values())
         
         # Export fact table
         if self.fact_matches:
@@ -462,27 +632,223 @@ class StarSchemaBuilder:
                 writer.writerows(self.bridge_match_participants)
         
         print(f"  ✓ Exported all CSVs")
+    
+    def append_to_csv(self):
+        """
+        Export the rows of an incremental run: append the new matches to the
+        fact, bridge and match metadata CSVs and rewrite only the other
+        dimensions that gained rows
+        """
+        self.finish_metrics()
+        appended = {
+            'dim_match_metadata': self.dim_match_metadata.to_list()[self.loaded_sizes['dim_match_metadata']:],
+            'fact_matches': self.fact_matches,
+            'bridge_match_items': self.bridge_match_items,
+            'bridge_match_participants': self.bridge_match_participants,
+        }
+        for name, rows in appended.items():
+            if not rows:
+                continue
+            path = self.data_dir / f'{name}.csv'
+            new_file = not path.exists() or path.stat().st_size == 0
+            with open(path, 'a', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+                if new_file:
+                    writer.writeheader()
+                writer.writerows(rows)
+        
+        changed = [dimension for dimension in self._dimensions()
+                   if dimension.name not in APPENDED_TABLES
+                   and len(dimension) != self.loaded_sizes[dimension.name]]
+        for dimension in changed:
+            with open(self.data_dir / f'{dimension.name}.csv', 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=dimension.columns)
+                writer.writeheader()
+                writer.writerows(dimension.values())
+        
+        print(f"  ✓ Appended {len(self.fact_matches)} matches, rewrote "
+              f"{', '.join(dimension.name for dimension in changed) or 'no dimensions'}")
+    
+    def save_state(self):
+        """Record what the CSVs hold now, so the next run can build on them"""
+        atomic_write_json(self.data_dir / TRANSFORM_STATE_FILE, {
+            'version': TRANSFORM_STATE_VERSION,
+            'matches': len(self.dim_match_metadata),
+            'csv_sizes': self._csv_sizes(),
+        })
+
+
+# Match store of a transform worker process, opened once by _init_shard_worker
+_shard_store: Optional[MatchStore] = None
+
+
+def _init_shard_worker(store_root: str):
+    global _shard_store
+    _shard_store = MatchStore(Path(store_root))
+
+
+def transform_shard(player_id: str, puuid: str, match_ids: Optional[List[str]] = None,
+                    raw_file: Optional[Path] = None) -> Dict:
+    """
+    Star schema rows of one shard of a player's matches, for merge_shard().
+    
+    Runs in a worker process on stored matches (match_ids) or a legacy raw
+    file. Keys come from a private in-memory registry, so every dimension
+    row travels with its natural key and the parent process maps them onto
+    the shared keys.
+    """
+    keys = SurrogateKeyRegistry(Path(':memory:'))
+    builder = StarSchemaBuilder(player_id, puuid, keys)
+    matches = iter_json_array(raw_file) if raw_file is not None else _shard_store.iter_matches(match_ids)
+    count = 0
+    for match in matches:
+        builder.process_match(match)
+        count += 1
+    builder.finish_metrics()
+    keys.close()
+    
+    return {
+        'matches': count,
+        'dimensions': {dimension.name: list(zip(dimension.natural_keys(), dimension.values()))
+                       for dimension in builder._dimensions()},
+        'fact_matches': builder.fact_matches,
+        'bridge_match_items': builder.bridge_match_items,
+        'bridge_match_participants': builder.bridge_match_participants,
+    }
+
+
+def transform_players_parallel(players: List[Dict], workers: int, keys: SurrogateKeyRegistry,
+                               full: bool = False, store_root: Path = RAW_STORE_DIR):
+    """
+    Transform several players with their month shards spread across a process pool.
+    
+    Each player's builder loads what its last transform exported (unless
+    `full`), workers build the rows of every shard still to process, and
+    the parent merges each player's shards in month order, players in the
+    order given, so the keys assigned never depend on which worker finished
+    first.
+    """
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_shard_worker,
+                             initargs=(str(store_root),)) as executor:
+        pending = []
+        for player in players:
+            builder = StarSchemaBuilder(player['id'], player['puuid'], keys)
+            incremental = not full and builder.load_previous()
+            futures = [executor.submit(transform_shard, builder.player_id, builder.puuid, match_ids, raw_file)
+                       for _, match_ids, raw_file in builder.shards(new_only=incremental)]
+            pending.append((builder, incremental, futures))
+        print(f"  {sum(len(futures) for _, _, futures in pending)} shards across {workers} workers")
+        
+        for builder, incremental, futures in pending:
+            added = sum(builder.merge_shard(future.result()) for future in futures)
+            if incremental:
+                builder.append_to_csv()
+            else:
+                builder.export_to_csv()
+            builder.save_state()
+            print(f"  ✓ {builder.player_id}: {added} {'new ' if incremental else ''}matches from "
+                  f"{len(futures)} shards, {len(builder.dim_match_metadata)} in total")
 
 
-def transform_player(player_id: str, puuid: str):
-    """Transform data for a single player"""
+def transform_player(player_id: str, puuid: str, store: MatchStore = None,
+                     keys: SurrogateKeyRegistry = None, full: bool = False):
+    """
+    Transform data for a single player (reading from `store` if given, e.g. mid-extraction).
+    
+    Builds on the CSVs of the last transform, processing only matches it
+    did not have, unless `full` is set or they cannot be built on.
+    """
     print(f"\n{'='*60}")
     print(f"🔄 Transforming data for player: {player_id}")
     print(f"{'='*60}")
     
-    builder = StarSchemaBuilder(player_id, puuid)
-    builder.load_and_process_all_matches()
-    builder.export_to_csv()
+    owns_keys = keys is None
+    builder = StarSchemaBuilder(player_id, puuid, keys)
+    if not full and builder.load_previous():
+        print(f"  Loaded {len(builder.dim_match_metadata)} transformed matches")
+        builder.process_new_matches(store)
+        builder.append_to_csv()
+    else:
+        builder.load_and_process_all_matches(store)
+        builder.export_to_csv()
+    builder.save_state()
+    if owns_keys:
+        builder.keys.close()
     
     print(f"\n✓ Transformation complete for {player_id}")
-    print(f"  Fact matches: {len(builder.fact_matches)}")
+    print(f"  Fact matches: {len(builder.dim_match_metadata)}")
     print(f"  Champions: {len(builder.dim_champions)}")
     print(f"  Dates: {len(builder.dim_dates)}")
     print(f"  Items: {len(builder.dim_items)}")
 
 
+def rekey_player_csvs(player_id: str, keys: SurrogateKeyRegistry):
+    """
+    Renumber a player's CSVs onto the shared surrogate keys, without their raw matches.
+    
+    For CSVs exported when every player's keys started at 1. Each dimension
+    row gets the key `keys` holds for its natural key (rows that now share
+    one, such as repeated rune setups, collapse into the first) and the fact
+    and bridge key columns follow. A missing transform state makes the next
+    transform rebuild from the raw matches anyway.
+    """
+    builder = StarSchemaBuilder(player_id, '', keys)
+    data_dir = builder.data_dir
+    key_maps: Dict[str, Dict[str, int]] = {}
+    for dimension in builder._dimensions():
+        path = data_dir / f'{dimension.name}.csv'
+        if not path.exists() or path.stat().st_size == 0:
+            continue
+        with open(path, newline='') as f:
+            rows = list(csv.DictReader(f))
+        key_column = dimension.columns[0]
+        natural_keys = [ROW_NATURAL_KEYS[dimension.name](row) for row in rows]
+        if dimension.keys is not None:
+            new_keys = keys.keys_for(dimension.name, natural_keys)
+        else:
+            new_keys = [int(row[key_column]) for row in rows]
+        key_map = key_maps[dimension.name] = {}
+        for row, natural_key, key in zip(rows, natural_keys, new_keys):
+            key_map[row[key_column]] = key
+            if natural_key not in dimension:
+                dimension.restore(key, natural_key, {**row, key_column: key})
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=dimension.columns)
+            writer.writeheader()
+            writer.writerows(dimension.values())
+    
+    for name in FACT_TABLES:
+        path = data_dir / f'{name}.csv'
+        if not path.exists() or path.stat().st_size == 0:
+            continue
+        with open(path, newline='') as f:
+            reader = csv.DictReader(f)
+            fieldnames = reader.fieldnames
+            rows = list(reader)
+        for row in rows:
+            for column, dimension_name in ROW_KEY_DIMENSIONS.items():
+                if column in row:
+                    row[column] = key_maps[dimension_name][row[column]]
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+    (data_dir / TRANSFORM_STATE_FILE).unlink(missing_ok=True)
+    print(f"  ✓ {player_id}: renumbered {', '.join(key_maps)}")
+
+
 def main():
     """Main transformation function"""
+    parser = argparse.ArgumentParser(description="Transform extracted matches into star schema CSVs")
+    parser.add_argument('--full', action='store_true',
+                        help="Rebuild every table from all matches instead of adding only new ones")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Worker processes; above 1, players' month shards are transformed in "
+                             "parallel (default: %(default)s)")
+    parser.add_argument('--rekey', action='store_true',
+                        help="Only renumber existing CSVs written with per-player keys onto the shared keys")
+    args = parser.parse_args()
+    
     players_file = Path("players.json")
     
     if not players_file.exists():
@@ -499,8 +865,17 @@ def main():
     print("🔄 League of Legends Data Transformation")
     print(f"📊 Transforming data for {len(players_data['players'])} player(s)")
     
-    for player in players_data['players']:
-        transform_player(player['id'], player['puuid'])
+    # One key registry for every player, so their CSVs share surrogate keys
+    keys = SurrogateKeyRegistry()
+    if args.rekey:
+        for player in players_data['players']:
+            rekey_player_csvs(player['id'], keys)
+    elif args.workers > 1:
+        transform_players_parallel(players_data['players'], args.workers, keys, full=args.full)
+    else:
+        for player in players_data['players']:
+            transform_player(player['id'], player['puuid'], keys=keys, full=args.full)
+    keys.close()
     
     print("\n" + "="*60)
     print("🎉 All transformations complete!")
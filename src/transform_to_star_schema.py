@@ -12,27 +12,43 @@ from typing import List, Dict, Set, Tuple, Optional
 from datetime import datetime
 from collections import defaultdict
 
+from derived_metrics import DerivedMetricsBatch
+from dimension_registry import DimensionRegistry
+from surrogate_keys import SurrogateKeyRegistry
+
+CHAMPION_COLUMNS = ('champion_key', 'champion_id', 'champion_name', 'role', 'icon_url')
+DATE_COLUMNS = ('date_key', 'full_date', 'year', 'month', 'day', 'day_of_week', 'week_of_year',
+                'is_weekend', 'hour_of_day')
+QUEUE_COLUMNS = ('queue_key', 'queue_id', 'queue_name', 'is_ranked', 'game_mode')
+RUNE_COLUMNS = ('rune_key', 'primary_style_id', 'primary_style_name', 'sub_style_id', 'sub_style_name',
+                'perk_ids')
+ITEM_COLUMNS = ('item_key', 'item_id', 'item_name', 'icon_url')
+MATCH_METADATA_COLUMNS = ('match_key', 'match_id', 'game_duration_seconds', 'game_version', 'timestamp')
+
 
 class StarSchemaBuilder:
     """Builds a Kimball star schema from League of Legends match data."""
     
-    def __init__(self, player_puuid: str, use_ddragon: bool = True):
+    def __init__(self, player_puuid: str, use_ddragon: bool = True,
+                 keys: Optional[SurrogateKeyRegistry] = None):
         """
         Initialize the star schema builder.
         
         Args:
             player_puuid: The PUUID of the player whose data we're analyzing
             use_ddragon: Whether to enrich data with Data Dragon (champion/item names)
+            keys: Registry to take champion, rune and match keys from, so they
+                agree with other builders and runs (default: numbered from 1)
         """
         self.player_puuid = player_puuid
         self.use_ddragon = use_ddragon
         
-        # Dimension tables
-        self.dim_champions = {}  # champion_id -> champion data
-        self.dim_dates = {}  # date_key -> date data
-        self.dim_queues = {}  # queue_id -> queue data
-        self.dim_runes = {}  # rune_key -> rune data
-        self.dim_items = {}  # item_id -> item data
+        # Dimension tables, each indexed by its natural key
+        self.dim_champions = DimensionRegistry('dim_champion', CHAMPION_COLUMNS, keys)  # by champion_id
+        self.dim_dates = DimensionRegistry('dim_date', DATE_COLUMNS)  # by date_key (YYYYMMDD)
+        self.dim_queues = DimensionRegistry('dim_queue', QUEUE_COLUMNS)  # by queue_id
+        self.dim_runes = DimensionRegistry('dim_rune', RUNE_COLUMNS, keys)  # by rune setup
+        self.dim_items = DimensionRegistry('dim_items', ITEM_COLUMNS)  # by item_id
         
         # Fact table
         self.fact_matches = []
@@ -41,18 +57,11 @@ class StarSchemaBuilder:
         self.bridge_match_items = []
         self.bridge_match_participants = []  # NEW: All 10 participants per match
         
-        # Metadata
-        self.dim_match_metadata = []
+        # Rows whose KDA, per-minute and kill participation columns are still to compute
+        self.metrics = DerivedMetricsBatch(team_kill_participation=True, int_kda_without_deaths=True)
         
-        # Counters for surrogate keys
-        self.champion_key_counter = 1
-        self.rune_key_counter = 1
-        self.match_key_counter = 1
-        
-        # Mappings for lookups
-        self.champion_id_to_key = {}
-        self.rune_signature_to_key = {}
-        self.match_id_to_key = {}
+        # Metadata, by match_id
+        self.dim_match_metadata = DimensionRegistry('dim_match_metadata', MATCH_METADATA_COLUMNS, keys)
         
         # Data Dragon mappings
         self.ddragon_champions = {}
@@ -120,34 +129,27 @@ class StarSchemaBuilder:
     def _get_or_create_champion_key(self, champion_id: int, champion_name: str, 
                                     role: str) -> int:
         """Get existing champion key or create new one."""
-        if champion_id not in self.champion_id_to_key:
-            key = self.champion_key_counter
-            self.champion_key_counter += 1
-            
+        def build_row(key: int) -> Dict:
             # Enrich with Data Dragon if available
             icon_url = self._get_champion_icon_url(champion_id) if self.use_ddragon else ""
             
-            self.dim_champions[key] = {
+            return {
                 'champion_key': key,
                 'champion_id': champion_id,
                 'champion_name': champion_name,
                 'role': role,
                 'icon_url': icon_url
             }
-            self.champion_id_to_key[champion_id] = key
-            return key
-        return self.champion_id_to_key[champion_id]
+        
+        return self.dim_champions.get_or_create(champion_id, build_row)
     
     def _get_or_create_rune_key(self, primary_style: int, sub_style: int, 
                                perks: List[int]) -> int:
         """Get existing rune key or create new one."""
-        # Create signature from rune setup
-        signature = f"{primary_style}_{sub_style}_{'_'.join(map(str, sorted(perks)))}"
+        # Signature of the rune setup (the perks in any order)
+        signature = (primary_style, sub_style, tuple(sorted(perks)))
         
-        if signature not in self.rune_signature_to_key:
-            key = self.rune_key_counter
-            self.rune_key_counter += 1
-            
+        def build_row(key: int) -> Dict:
             # Enrich with Data Dragon if available
             primary_name = "Unknown"
             sub_name = "Unknown"
@@ -158,7 +160,7 @@ class StarSchemaBuilder:
                 if sub_style in self.ddragon_runes:
                     sub_name = self.ddragon_runes[sub_style]['name']
             
-            self.dim_runes[key] = {
+            return {
                 'rune_key': key,
                 'primary_style_id': primary_style,
                 'primary_style_name': primary_name,
@@ -166,45 +168,40 @@ class StarSchemaBuilder:
                 'sub_style_name': sub_name,
                 'perk_ids': json.dumps(perks)
             }
-            self.rune_signature_to_key[signature] = key
-            return key
-        return self.rune_signature_to_key[signature]
+        
+        return self.dim_runes.get_or_create(signature, build_row)
     
     def _get_or_create_date_key(self, timestamp_ms: int) -> int:
         """Get existing date key or create new one."""
         dt = datetime.fromtimestamp(timestamp_ms / 1000)
         date_key = int(dt.strftime('%Y%m%d'))
         
-        if date_key not in self.dim_dates:
-            self.dim_dates[date_key] = {
-                'date_key': date_key,
-                'full_date': dt.strftime('%Y-%m-%d'),
-                'year': dt.year,
-                'month': dt.month,
-                'day': dt.day,
-                'day_of_week': dt.strftime('%A'),
-                'week_of_year': dt.isocalendar()[1],
-                'is_weekend': 1 if dt.weekday() >= 5 else 0,
-                'hour_of_day': dt.hour
-            }
-        return date_key
+        return self.dim_dates.get_or_create(date_key, lambda key: {
+            'date_key': key,
+            'full_date': dt.strftime('%Y-%m-%d'),
+            'year': dt.year,
+            'month': dt.month,
+            'day': dt.day,
+            'day_of_week': dt.strftime('%A'),
+            'week_of_year': dt.isocalendar()[1],
+            'is_weekend': 1 if dt.weekday() >= 5 else 0,
+            'hour_of_day': dt.hour
+        }, key=date_key)
     
     def _get_or_create_queue_key(self, queue_id: int, game_mode: str) -> int:
         """Get existing queue key or create new one."""
-        if queue_id not in self.dim_queues:
-            queue_names = {
-                400: 'Draft Normal',
-                420: 'Ranked Solo/Duo',
-            }
-            
-            self.dim_queues[queue_id] = {
-                'queue_key': queue_id,
-                'queue_id': queue_id,
-                'queue_name': queue_names.get(queue_id, f'Queue {queue_id}'),
-                'is_ranked': 1 if queue_id == 420 else 0,
-                'game_mode': game_mode
-            }
-        return queue_id
+        queue_names = {
+            400: 'Draft Normal',
+            420: 'Ranked Solo/Duo',
+        }
+        
+        return self.dim_queues.get_or_create(queue_id, lambda key: {
+            'queue_key': key,
+            'queue_id': queue_id,
+            'queue_name': queue_names.get(queue_id, f'Queue {queue_id}'),
+            'is_ranked': 1 if queue_id == 420 else 0,
+            'game_mode': game_mode
+        }, key=queue_id)
     
     def _add_items_to_dimensions(self, items: List[int]):
         """Add items to dimension table if not exists."""
@@ -218,12 +215,12 @@ class StarSchemaBuilder:
                     item_name = self.ddragon_items[item_id]['name']
                     icon_url = self._get_item_icon_url(item_id)
                 
-                self.dim_items[item_id] = {
-                    'item_key': item_id,
+                self.dim_items.get_or_create(item_id, lambda key: {
+                    'item_key': key,
                     'item_id': item_id,
                     'item_name': item_name,
                     'icon_url': icon_url
-                }
+                }, key=item_id)
     
     def process_match(self, match_data: Dict):
         """
@@ -237,7 +234,7 @@ class StarSchemaBuilder:
         match_id = metadata['matchId']
         
         # Skip if already processed
-        if match_id in self.match_id_to_key:
+        if match_id in self.dim_match_metadata:
             return
         
         # Find player's participant data
@@ -251,10 +248,14 @@ class StarSchemaBuilder:
             print(f"⚠️  Player not found in match {match_id}")
             return
         
-        # Generate match key
-        match_key = self.match_key_counter
-        self.match_key_counter += 1
-        self.match_id_to_key[match_id] = match_key
+        # Generate match key, with the match metadata row
+        match_key = self.dim_match_metadata.get_or_create(match_id, lambda key: {
+            'match_key': key,
+            'match_id': match_id,
+            'game_duration_seconds': info['gameDuration'],
+            'game_version': info['gameVersion'],
+            'timestamp': info['gameCreation']
+        })
         
         # Get dimension keys
         champion_key = self._get_or_create_champion_key(
@@ -301,23 +302,14 @@ class StarSchemaBuilder:
                     'item_position': position
                 })
         
-        # Calculate derived metrics
+        # Derived metrics are filled in by finish_metrics
         game_duration_minutes = info['gameDuration'] / 60
-        kills = player_data['kills']
-        deaths = player_data['deaths']
-        assists = player_data['assists']
-        kda = ((kills + assists) / deaths) if deaths > 0 else (kills + assists)
-        
         cs_total = player_data['totalMinionsKilled'] + player_data.get('neutralMinionsKilled', 0)
         
-        # Get team kills for participation
-        team_id = player_data['teamId']
-        team_kills = 0
+        # Kills per team, for kill participation
+        team_kills = defaultdict(int)
         for participant in info['participants']:
-            if participant['teamId'] == team_id:
-                team_kills += participant['kills']
-        
-        kill_participation = ((kills + assists) / team_kills) if team_kills > 0 else 0
+            team_kills[participant['teamId']] += participant['kills']
         
         # Build fact row
         fact_row = {
@@ -329,23 +321,23 @@ class StarSchemaBuilder:
             'rune_secondary_key': rune_secondary_key,
             
             # Core stats
-            'kills': kills,
-            'deaths': deaths,
-            'assists': assists,
-            'kda': round(kda, 2),
+            'kills': player_data['kills'],
+            'deaths': player_data['deaths'],
+            'assists': player_data['assists'],
+            'kda': None,
             
             # Economy
             'gold_earned': player_data['goldEarned'],
-            'gold_per_minute': round(player_data['goldEarned'] / game_duration_minutes, 2),
+            'gold_per_minute': None,
             
             # Damage
             'damage_dealt': player_data['totalDamageDealtToChampions'],
             'damage_taken': player_data['totalDamageTaken'],
-            'damage_per_minute': round(player_data['totalDamageDealtToChampions'] / game_duration_minutes, 2),
+            'damage_per_minute': None,
             
             # Farming
             'cs_total': cs_total,
-            'cs_per_minute': round(cs_total / game_duration_minutes, 2),
+            'cs_per_minute': None,
             
             # Vision
             'vision_score': player_data['visionScore'],
@@ -354,7 +346,7 @@ class StarSchemaBuilder:
             'control_wards_purchased': player_data.get('visionWardsBoughtInGame', 0),
             
             # Participation
-            'kill_participation': round(kill_participation, 3),
+            'kill_participation': None,
             
             # Multi-kills
             'double_kills': player_data.get('doubleKills', 0),
@@ -379,20 +371,13 @@ class StarSchemaBuilder:
         }
         
         self.fact_matches.append(fact_row)
-        
-        # Add match metadata
-        self.dim_match_metadata.append({
-            'match_key': match_key,
-            'match_id': match_id,
-            'game_duration_seconds': info['gameDuration'],
-            'game_version': info['gameVersion'],
-            'timestamp': info['gameCreation']
-        })
+        self.metrics.add(fact_row, player_data, game_duration_minutes, team_kills[player_data['teamId']])
         
         # Extract all 10 participants for expandable match details
-        self._extract_all_participants(match_key, info, player_data['puuid'])
+        self._extract_all_participants(match_key, info, player_data['puuid'], team_kills)
     
-    def _extract_all_participants(self, match_key: int, info: Dict, player_puuid: str):
+    def _extract_all_participants(self, match_key: int, info: Dict, player_puuid: str,
+                                  team_kills: Dict[int, int]):
         """
         Extract all 10 participants from a match for expandable details.
         
@@ -400,16 +385,11 @@ class StarSchemaBuilder:
             match_key: Match surrogate key
             info: Match info dict
             player_puuid: Player's PUUID to mark which participant is the player
+            team_kills: Kills per team ID
         """
         game_duration_minutes = info['gameDuration'] / 60
         
         for idx, participant in enumerate(info['participants'], 1):
-            # Get team kills for participation
-            team_kills = sum(p['kills'] for p in info['participants'] 
-                           if p['teamId'] == participant['teamId'])
-            
-            kill_participation = ((participant['kills'] + participant['assists']) / team_kills) if team_kills > 0 else 0
-            
             cs_total = participant['totalMinionsKilled'] + participant.get('neutralMinionsKilled', 0)
             
             # Get items
@@ -434,22 +414,20 @@ class StarSchemaBuilder:
                 'kills': participant['kills'],
                 'deaths': participant['deaths'],
                 'assists': participant['assists'],
-                'kda': round(((participant['kills'] + participant['assists']) / participant['deaths']) 
-                            if participant['deaths'] > 0 
-                            else (participant['kills'] + participant['assists']), 2),
+                'kda': None,
                 
                 # Economy
                 'gold_earned': participant['goldEarned'],
-                'gold_per_minute': round(participant['goldEarned'] / game_duration_minutes, 2),
+                'gold_per_minute': None,
                 
                 # Damage
                 'damage_dealt': participant['totalDamageDealtToChampions'],
                 'damage_taken': participant['totalDamageTaken'],
-                'damage_per_minute': round(participant['totalDamageDealtToChampions'] / game_duration_minutes, 2),
+                'damage_per_minute': None,
                 
                 # Farm
                 'cs_total': cs_total,
-                'cs_per_minute': round(cs_total / game_duration_minutes, 2),
+                'cs_per_minute': None,
                 
                 # Vision
                 'vision_score': participant['visionScore'],
@@ -458,7 +436,7 @@ class StarSchemaBuilder:
                 'control_wards_purchased': participant.get('visionWardsBoughtInGame', 0),
                 
                 # Participation
-                'kill_participation': round(kill_participation, 3),
+                'kill_participation': None,
                 
                 # Multi-kills
                 'double_kills': participant.get('doubleKills', 0),
@@ -478,6 +456,12 @@ class StarSchemaBuilder:
             }
             
             self.bridge_match_participants.append(participant_row)
+            self.metrics.add(participant_row, participant, game_duration_minutes,
+                             team_kills[participant['teamId']])
+    
+    def finish_metrics(self):
+        """Compute the derived metrics of every row added since the last call, in one batch"""
+        self.metrics.apply()
     
     def export_to_csv(self, output_dir: str = 'data'):
         """
@@ -487,6 +471,7 @@ class StarSchemaBuilder:
             output_dir: Directory to save CSV files
         """
         os.makedirs(output_dir, exist_ok=True)
+        self.finish_metrics()
         
         print(f"\n📊 Exporting star schema to {output_dir}/")
         
@@ -512,10 +497,9 @@ class StarSchemaBuilder:
         for filename, dimension_dict in dimensions:
             if dimension_dict:
                 filepath = os.path.join(output_dir, filename)
-                data = list(dimension_dict.values())
-                keys = data[0].keys()
+                data = dimension_dict.to_list()
                 with open(filepath, 'w', newline='', encoding='utf-8') as f:
-                    writer = csv.DictWriter(f, fieldnames=keys)
+                    writer = csv.DictWriter(f, fieldnames=dimension_dict.columns)
                     writer.writeheader()
                     writer.writerows(data)
                 print(f"✅ {filepath} ({len(data)} rows)")
@@ -542,11 +526,10 @@ class StarSchemaBuilder:
         # Export metadata
         if self.dim_match_metadata:
             metadata_file = os.path.join(output_dir, 'dim_match_metadata.csv')
-            keys = self.dim_match_metadata[0].keys()
             with open(metadata_file, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=keys)
+                writer = csv.DictWriter(f, fieldnames=self.dim_match_metadata.columns)
                 writer.writeheader()
-                writer.writerows(self.dim_match_metadata)
+                writer.writerows(self.dim_match_metadata.values())
             print(f"✅ {metadata_file} ({len(self.dim_match_metadata)} rows)")
         
         print(f"\n{'='*60}")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Listing Window Planner
+Splits an extraction date range into time windows for match ID listing.
+
+Windows start as calendar years (so an inactive year costs one listing call)
+and are halved only when a listing comes back with a full page of IDs.
+"""
+
+from datetime import datetime, timezone
+from typing import List, Tuple
+
+DEFAULT_START_DATE = "2024-01-01"
+
+# The by-puuid endpoint returns at most this many IDs per call
+PAGE_SIZE = 100
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+# Below this span a full window is paged with offsets instead of split again
+MIN_SPLIT_MS = 60 * 60 * 1000
+
+
+def parse_date(value: str) -> int:
+    """Parse YYYY-MM-DD (UTC midnight) into epoch milliseconds"""
+    dt = datetime.strptime(value, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1000)
+
+
+def now_ms() -> int:
+    return int(datetime.now(timezone.utc).timestamp() * 1000)
+
+
+def year_end(timestamp_ms: int) -> int:
+    """Last millisecond of the calendar year (UTC) containing a timestamp"""
+    year = datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc).year
+    return int(datetime(year + 1, 1, 1, tzinfo=timezone.utc).timestamp() * 1000) - 1
+
+
+def month_end(timestamp_ms: int) -> int:
+    """Last millisecond of the calendar month (UTC) containing a timestamp"""
+    dt = datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc)
+    next_month = datetime(dt.year + dt.month // 12, dt.month % 12 + 1, 1, tzinfo=timezone.utc)
+    return int(next_month.timestamp() * 1000) - 1
+
+
+def year_windows(start_time: int, end_time: int) -> List[Tuple[int, int]]:
+    """
+    Calendar-year windows covering [start_time, end_time], both inclusive.
+
+    Returns:
+        List of (start_ms, end_ms) pairs, oldest first
+    """
+    windows = []
+    cursor = start_time
+    while cursor <= end_time:
+        last = year_end(cursor)
+        windows.append((cursor, min(last, end_time)))
+        cursor = last + 1
+    return windows
+
+
+def month_windows(start_time: int, end_time: int) -> List[Tuple[int, int]]:
+    """
+    Calendar-month windows covering [start_time, end_time], both inclusive.
+
+    Returns:
+        List of (start_ms, end_ms) pairs, oldest first
+    """
+    windows = []
+    cursor = start_time
+    while cursor <= end_time:
+        last = month_end(cursor)
+        windows.append((cursor, min(last, end_time)))
+        cursor = last + 1
+    return windows
+
+
+def can_split(start_time: int, end_time: int) -> bool:
+    return end_time - start_time > MIN_SPLIT_MS
+
+
+def split_window(start_time: int, end_time: int) -> List[Tuple[int, int]]:
+    """Halve a window. Returns the newer half first, matching the API's newest-first order."""
+    mid = start_time + (end_time - start_time) // 2
+    return [(mid + 1, end_time), (start_time, mid)]
+
+
+def window_key(start_time: int, end_time: int) -> str:
+    return f"{start_time}-{end_time}"
+
+
+def describe_window(start_time: int, end_time: int) -> str:
+    fmt = '%Y-%m-%d %H:%M'
+    start = datetime.fromtimestamp(start_time / 1000, tz=timezone.utc).strftime(fmt)
+    end = datetime.fromtimestamp(end_time / 1000, tz=timezone.utc).strftime(fmt)
+    return f"{start} → {end}"
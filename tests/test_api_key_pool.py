@@ -0,0 +1,114 @@
+"""Pooled API keys: rejected keys leave rotation, a 429 pauses only the key that got it"""
+
+import contextlib
+import io
+import threading
+
+import pytest
+
+import extract_2024_2025
+from api_key_pool import ApiKeyPool
+from extract_2024_2025 import RiotAPIClient, plan_players
+from match_store import MatchStore
+from rate_limiter import METHOD_MATCH_IDS, RateLimiter
+from retry_policy import CircuitBreaker, RiotAPIError
+from window_planner import DAY_MS, now_ms
+
+PUUID = "pool-player"
+
+
+def key_pool(*api_keys):
+    return ApiKeyPool(list(api_keys), "americas", lambda api_key, routing: RateLimiter([(100000, 1)]))
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self.headers = {}
+        self.payload = payload
+        self.text = ""
+
+    def json(self):
+        return self.payload
+
+
+def answering(monkeypatch, accepted, status=403):
+    """Answer every request with `status` unless sent with an accepted key; returns the keys sent"""
+    sent = []
+
+    def get(url, headers, params=None, timeout=None):
+        sent.append(headers["X-Riot-Token"])
+        if headers["X-Riot-Token"] in accepted:
+            return FakeResponse(200, ["NA1_1"])
+        return FakeResponse(status)
+
+    monkeypatch.setattr(extract_2024_2025.requests, 'get', get)
+    return sent
+
+
+def list_ids(client):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return client.get_match_ids(PUUID, 0, now_ms(), 0, 100)
+
+
+@pytest.mark.parametrize("status", [401, 403])
+def test_rejected_key_is_disabled(monkeypatch, status):
+    pool = key_pool("rejected", "accepted")
+    sent = answering(monkeypatch, {"accepted"}, status)
+    client = RiotAPIClient(pool, base_url="http://stub.invalid", breaker=CircuitBreaker())
+    for _ in range(4):
+        assert list_ids(client) == ["NA1_1"]
+
+    # The rejected key was tried once, then left out of rotation
+    assert sent == ["rejected"] + ["accepted"] * 4
+    assert [key.api_key for key in pool.active()] == ["accepted"]
+    assert pool.keys[0].disabled == f"HTTP {status}"
+
+
+def test_every_key_rejected_raises(monkeypatch):
+    pool = key_pool("first", "second")
+    sent = answering(monkeypatch, set())
+    client = RiotAPIClient(pool, base_url="http://stub.invalid", breaker=CircuitBreaker())
+    with pytest.raises(RiotAPIError):
+        list_ids(client)
+    with pytest.raises(RiotAPIError):
+        list_ids(client)
+
+    assert sent == ["first", "second"]
+    assert len(pool) == 0
+    with pytest.raises(RiotAPIError):
+        pool.acquire(METHOD_MATCH_IDS)
+
+
+def test_block_for_pauses_only_the_threads_key():
+    pool = key_pool("first", "second")
+    blocked = []
+
+    def rate_limited():
+        pool.acquire(METHOD_MATCH_IDS)
+        blocked.append(pool.current_key())
+        pool.block_for(60)
+
+    thread = threading.Thread(target=rate_limited)
+    thread.start()
+    thread.join()
+
+    # This thread never acquired, and every call now goes to the other key without waiting
+    other = [key for key in pool.keys if key.api_key != blocked[0]][0]
+    for _ in range(4):
+        assert pool.acquire(METHOD_MATCH_IDS) == 0.0
+        assert pool.current_key() == other.api_key
+    assert other.calls == 4
+    blocked_key = [key for key in pool.keys if key.api_key == blocked[0]][0]
+    assert blocked_key.calls == 1 and blocked_key.limiter.try_acquire(METHOD_MATCH_IDS) > 50
+
+
+def test_plan_with_every_key_rejected_raises(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    pool = key_pool("first")
+    pool.keys[0].disabled = "HTTP 403"
+    # Nothing to list yet, so only the estimate needs a key
+    player = {'id': "p1", 'puuid': PUUID, 'region': "americas", 'display_name': "Pool#NA1"}
+    with pytest.raises(RiotAPIError), contextlib.redirect_stdout(io.StringIO()):
+        plan_players([player], {"americas": pool}, MatchStore(), now_ms() + DAY_MS,
+                     base_url="http://127.0.0.1:9")
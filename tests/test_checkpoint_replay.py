@@ -0,0 +1,93 @@
+"""A range extraction killed part way resumes from its checkpoint"""
+
+import contextlib
+import io
+import multiprocessing
+import os
+import signal
+import time
+
+from extract_2024_2025 import PlayerExtraction, RiotAPIClient
+from extraction_state import DeadLetterQueue, ExtractionCheckpoint
+from match_store import MatchStore
+from rate_limiter import RateLimiter
+from retry_policy import CircuitBreaker
+from riot_stub_server import RiotStubServer, StubMatchHistory
+from window_planner import parse_date
+
+PUUID = "replay-player"
+QUEUES = [420, 400]
+START = parse_date("2024-01-01")
+END = parse_date("2024-03-01") - 1
+# One game every six hours from 2024-01-01: 240 of them fall in the range
+IN_RANGE = 240
+
+
+def extract(url):
+    client = RiotAPIClient("stub-key", base_url=url, limiter=RateLimiter([(100000, 1)]),
+                           breaker=CircuitBreaker())
+    extraction = PlayerExtraction(client, "p1", PUUID, MatchStore(), queues=QUEUES)
+    with contextlib.redirect_stdout(io.StringIO()):
+        added = extraction.extract_range(START, END)
+    extraction.checkpoint.rewrite()
+    return extraction, added
+
+
+def test_killed_extraction_resumes_from_checkpoint(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with RiotStubServer(PUUID, StubMatchHistory(300), latency=0.005) as server:
+        worker = multiprocessing.Process(target=extract, args=(server.url,))
+        worker.start()
+        deadline = time.time() + 60
+        while server.request_count < 100 and worker.is_alive() and time.time() < deadline:
+            time.sleep(0.01)
+        os.kill(worker.pid, signal.SIGKILL)
+        worker.join(timeout=10)
+        assert worker.exitcode == -signal.SIGKILL
+
+        # As if the kill also tore the line being written
+        checkpoint_file = tmp_path / "data" / "p1" / ExtractionCheckpoint.FILENAME
+        with open(checkpoint_file, 'a') as f:
+            f.write('{"window":"1704067200000-')
+        checkpoint = ExtractionCheckpoint(checkpoint_file.parent)
+        recorded = sum(len(progress.listed) for progress in checkpoint.progress.values())
+        assert recorded > 0
+        stored_before = len(MatchStore().catalog)
+        assert 0 < stored_before < IN_RANGE
+
+        requests_before = server.request_count
+        extraction, added = extract(server.url)
+        resumed_requests = server.request_count - requests_before
+
+    assert len(extraction.index.entries) == IN_RANGE
+    assert len(MatchStore().catalog) == IN_RANGE
+    # Stored matches are reused and recorded pages are not listed again
+    assert resumed_requests < IN_RANGE - stored_before + 10
+    # A second replay finds nothing left to do
+    with RiotStubServer(PUUID, StubMatchHistory(300)) as server:
+        _, added = extract(server.url)
+        assert added == 0 and server.request_count == 0
+
+
+def test_events_after_a_torn_line_replay(tmp_path):
+    checkpoint = ExtractionCheckpoint(tmp_path)
+    checkpoint.start("w", 420, 5)
+    checkpoint.record_page("w", 420, 0, ["NA1_1"])
+    checkpoint._file.close()
+    with open(checkpoint.path, 'a') as f:
+        f.write('{"window":"w","queue":420,"sto')
+
+    ExtractionCheckpoint(tmp_path).mark_done("w", 420)
+    progress = ExtractionCheckpoint(tmp_path).get("w", 420)
+    assert progress.done and progress.listed == ["NA1_1"]
+
+
+def test_dead_letters_after_a_torn_line_replay(tmp_path):
+    letters = DeadLetterQueue(tmp_path)
+    letters.record("NA1_1", "timeout", 3, None, {})
+    letters._file.close()
+    with open(letters.path, 'a') as f:
+        f.write('{"id":"NA1_2","rea')
+
+    DeadLetterQueue(tmp_path).record("NA1_3", "server error", 1, 503, {})
+    assert sorted(DeadLetterQueue(tmp_path).letters) == ["NA1_1", "NA1_3"]
@@ -0,0 +1,60 @@
+"""DerivedMetricsBatch: NumPy and row-by-row computations agree"""
+
+import pytest
+
+import derived_metrics
+from derived_metrics import DerivedMetricsBatch, METRIC_DIGITS
+from riot_stub_server import synthetic_match
+
+needs_numpy = pytest.mark.skipif(derived_metrics.np is None, reason="NumPy is not installed")
+
+
+def batch_of(matches, team_kill_participation=False):
+    batch = DerivedMetricsBatch(team_kill_participation=team_kill_participation,
+                                int_kda_without_deaths=team_kill_participation)
+    for match in matches:
+        info = match['info']
+        team_kills = {}
+        for participant in info['participants']:
+            team_kills[participant['teamId']] = team_kills.get(participant['teamId'], 0) + participant['kills']
+        for participant in info['participants']:
+            batch.add({}, participant, info['gameDuration'] / 60, team_kills[participant['teamId']])
+    return batch
+
+
+@needs_numpy
+@pytest.mark.parametrize("team_kill_participation", [False, True])
+def test_numpy_matches_row_by_row(team_kill_participation):
+    matches = [synthetic_match(f"NA1_{i}", "me", 1704067200000 + i * 3_600_000, 420) for i in range(200)]
+    batch = batch_of(matches, team_kill_participation)
+    # repr also tells an int KDA or participation from a float one
+    assert repr(batch.compute(vectorized=True)) == repr(batch.compute(vectorized=False))
+
+
+@needs_numpy
+def test_rounding_matches_round_near_ties():
+    values = [2.675, 1.005, 0.125, 10.0 / 3, 1234.565]
+    rounded = derived_metrics.round_like_python(derived_metrics.np.array(values), 2).tolist()
+    assert rounded == [round(value, 2) for value in values]
+
+
+@pytest.mark.parametrize("vectorized", [
+    pytest.param(True, marks=needs_numpy),
+    False,
+])
+def test_zero_duration_gives_zero_per_minute_metrics(vectorized):
+    match = synthetic_match("NA1_0", "me", 1704067200000, 420)
+    match['info']['gameDuration'] = 0
+    metrics = batch_of([match]).compute(vectorized=vectorized)
+    for metric in ('cs_per_minute', 'gold_per_minute', 'damage_per_minute'):
+        assert metrics[metric] == [0.0] * 10
+    assert len(metrics['kda']) == 10
+
+
+def test_apply_fills_rows_and_empties_batch():
+    match = synthetic_match("NA1_0", "me", 1704067200000, 420)
+    batch = batch_of([match])
+    rows = batch.rows
+    batch.apply()
+    assert len(batch) == 0
+    assert all(set(METRIC_DIGITS) <= set(row) for row in rows)
@@ -0,0 +1,107 @@
+"""Journals: torn-tail recovery and appends from several processes"""
+
+import importlib.util
+import multiprocessing
+import os
+import sys
+import types
+
+import match_journal
+from match_journal import JournalWriter, iter_records, iter_records_with_offsets, read_record_at
+from match_store import MatchStore
+from riot_stub_server import synthetic_match
+
+
+def match(i):
+    return synthetic_match(f"NA1_{i}", "me", 1704067200000 + i * 3_600_000, 420)
+
+
+def test_torn_tail_is_skipped_then_trimmed(tmp_path):
+    path = tmp_path / "2024-01.jsonl"
+    writer = JournalWriter(path)
+    offsets = [writer.append({'id': i}) for i in range(3)]
+    writer.close()
+    with open(path, 'ab') as f:
+        f.write(b'{"id": 3, "pad')
+
+    assert [record['id'] for record in iter_records(path)] == [0, 1, 2]
+    assert [offset for offset, _ in iter_records_with_offsets(path)] == offsets
+
+    writer = JournalWriter(path)
+    offset = writer.append({'id': 4})
+    writer.close()
+    assert offset == path.stat().st_size - len(b'{"id":4}\n')
+    assert [record['id'] for record in iter_records(path)] == [0, 1, 2, 4]
+    assert read_record_at(path, offset) == {'id': 4}
+
+
+def test_store_recovers_from_a_torn_journal(tmp_path):
+    store = MatchStore(tmp_path)
+    for i in range(5):
+        store.put(match(i))
+    store.close()
+    journal = next((tmp_path / "journal").glob("*.jsonl"))
+    with open(journal, 'ab') as f:
+        f.write(b'{"metadata": {"matchId": "NA1_5"')
+
+    store = MatchStore(tmp_path)
+    assert sorted(store.catalog) == [f"NA1_{i}" for i in range(5)]
+    assert not store.contains("NA1_5")
+    store.put(match(5))
+    store.put(match(6))
+    assert store.get("NA1_2")['metadata']['matchId'] == "NA1_2"
+    assert store.get("NA1_6")['metadata']['matchId'] == "NA1_6"
+    store.close()
+    assert sorted(MatchStore(tmp_path).catalog) == [f"NA1_{i}" for i in range(7)]
+
+
+def append_many(path, tag, count, results):
+    writer = JournalWriter(path)
+    results.put([(writer.append({'id': f"{tag}{i}"}), f"{tag}{i}") for i in range(count)])
+    writer.close()
+
+
+def test_offsets_stay_right_with_two_writing_processes(tmp_path):
+    path = tmp_path / "2024-01.jsonl"
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=append_many, args=(path, tag, 200, results)) for tag in "AB"]
+    for worker in workers:
+        worker.start()
+    appended = results.get(timeout=60) + results.get(timeout=60)
+    for worker in workers:
+        worker.join(timeout=60)
+
+    assert len(list(iter_records(path))) == 400
+    for offset, record_id in appended:
+        assert read_record_at(path, offset) == {'id': record_id}
+
+
+def test_compaction_keeps_appends_of_another_store(tmp_path):
+    first, second = MatchStore(tmp_path), MatchStore(tmp_path)
+    first.put(match(0))
+    second.put(match(1))
+    first.compact("2024-01")
+    # second still holds the journal first just sealed and unlinked
+    second.put(match(2))
+    second.compact("2024-01")
+    first.close()
+    second.close()
+
+    assert sorted(MatchStore(tmp_path).catalog) == ["NA1_0", "NA1_1", "NA1_2"]
+
+
+def test_windows_locks_with_msvcrt(tmp_path, monkeypatch):
+    calls = []
+    fake_msvcrt = types.SimpleNamespace(LK_LOCK=1, LK_UNLCK=0,
+                                        locking=lambda fd, mode, size: calls.append((mode, size)))
+    monkeypatch.setattr(os, 'name', 'nt')
+    monkeypatch.setitem(sys.modules, 'msvcrt', fake_msvcrt)
+    # No fcntl on Windows: importing it must not be attempted
+    monkeypatch.setitem(sys.modules, 'fcntl', None)
+    spec = importlib.util.spec_from_file_location("match_journal_on_windows", match_journal.__file__)
+    windows_journal = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(windows_journal)
+
+    with windows_journal.journal_lock(tmp_path / "2024-01.jsonl"):
+        assert calls == [(fake_msvcrt.LK_LOCK, 1)]
+    assert calls == [(fake_msvcrt.LK_LOCK, 1), (fake_msvcrt.LK_UNLCK, 1)]
@@ -0,0 +1,96 @@
+"""RateLimiter against a server-side sliding window, on a fake clock"""
+
+import random
+
+import pytest
+
+import rate_limiter
+from rate_limiter import METHOD_MATCH_DETAILS, RateLimiter, TokenBucket
+
+LIMIT, WINDOW = 5, 1.0
+TICK = 0.001
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, 'time', fake.time)
+    return fake
+
+
+def run_workers(limiter, clock, workers, seconds, seed):
+    """
+    Simulate `workers` threads calling through the limiter for `seconds`,
+    each call taking a random time to reach the server and to come back.
+
+    Returns:
+        Arrival times at the server, in order
+    """
+    rng = random.Random(seed)
+    arrivals = []
+    # Per worker: None when idle, else (arrival time, response time)
+    in_flight = [None] * workers
+    end = clock.now + seconds
+    while clock.now < end:
+        for worker, call in enumerate(in_flight):
+            if call is not None and clock.now >= call[1]:
+                limiter.update_from_headers(METHOD_MATCH_DETAILS, {})
+                in_flight[worker] = call = None
+            if call is not None and call[0] is not None and clock.now >= call[0]:
+                arrivals.append(call[0])
+                in_flight[worker] = call = (None, call[1])
+            if call is None and limiter.try_acquire(METHOD_MATCH_DETAILS) <= 0:
+                arrive = clock.now + rng.uniform(0.005, 0.3)
+                in_flight[worker] = (arrive, arrive + rng.uniform(0.005, 0.05))
+        clock.now += TICK
+    return arrivals
+
+
+def busiest_server_window(arrivals):
+    """Most arrivals the server counted within one WINDOW, as a sliding window counts them"""
+    return max(sum(1 for t in arrivals if start <= t < start + WINDOW) for start in arrivals)
+
+
+@pytest.mark.parametrize("workers", [1, 4, 16])
+def test_calls_in_flight_never_overrun_the_server(clock, workers):
+    limiter = RateLimiter([(LIMIT, WINDOW)])
+    arrivals = run_workers(limiter, clock, workers, seconds=10, seed=workers)
+
+    assert busiest_server_window(arrivals) <= LIMIT
+    # Still close to the budget: each call holds its token for at most a window plus its round trip
+    assert len(arrivals) >= 10 * LIMIT * WINDOW / (WINDOW + 0.35) - LIMIT
+
+
+def test_token_is_held_until_the_response(clock):
+    bucket = TokenBucket(2, WINDOW)
+    bucket.consume(clock.now)
+    bucket.consume(clock.now)
+    clock.now += 5 * WINDOW
+    # Both calls are still in flight, however long ago they were granted
+    assert bucket.wait_time(clock.now) == rate_limiter.IN_FLIGHT_POLL
+
+    bucket.complete(clock.now)
+    clock.now += 0.25
+    assert bucket.wait_time(clock.now) == pytest.approx(WINDOW - 0.25)
+    clock.now += WINDOW
+    # The answered call has left the window; the one still in flight holds the other token
+    assert bucket.wait_time(clock.now) == 0.0
+    bucket.consume(clock.now)
+    assert bucket.wait_time(clock.now) == rate_limiter.IN_FLIGHT_POLL
+
+
+def test_header_counts_add_calls_from_elsewhere(clock):
+    limiter = RateLimiter([(LIMIT, WINDOW)])
+    assert limiter.try_acquire(METHOD_MATCH_DETAILS) <= 0
+    limiter.update_from_headers(METHOD_MATCH_DETAILS, {'X-App-Rate-Limit': f"{LIMIT}:1",
+                                                       'X-App-Rate-Limit-Count': f"{LIMIT}:1"})
+    # The server counted LIMIT calls, this one included: the window is full until they expire
+    assert limiter.try_acquire(METHOD_MATCH_DETAILS) == pytest.approx(WINDOW)
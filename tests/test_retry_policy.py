@@ -0,0 +1,163 @@
+"""CircuitBreaker state changes and RetryPolicy's Retry-After handling, on a fake clock"""
+
+import threading
+
+import pytest
+
+import retry_policy
+from extract_2024_2025 import RiotAPIClient
+from retry_policy import CircuitBreaker, RetryPolicy
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(retry_policy.time, 'time', fake.time)
+    return fake
+
+
+def tripped(clock, **options) -> CircuitBreaker:
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=10, **options)
+    breaker.record_failure()
+    assert breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and breaker.open_until == clock.now + 10
+    return breaker
+
+
+def in_thread(func) -> threading.Thread:
+    thread = threading.Thread(target=func, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_open_turns_half_open_after_the_cooldown(clock):
+    breaker = tripped(clock)
+    clock.now += 10
+    assert breaker.before_call() == 0.0
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.cooldown == 10
+
+
+def test_failed_probe_reopens_with_a_longer_cooldown(clock):
+    breaker = tripped(clock)
+    clock.now += 10
+    breaker.before_call()
+    assert breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and breaker.open_until == clock.now + 20
+
+
+def test_half_open_lets_exactly_one_probe_through(clock):
+    breaker = tripped(clock)
+    clock.now += 10
+    breaker.before_call()
+
+    through = []
+    waiters = [in_thread(lambda: through.append(breaker.before_call())) for _ in range(3)]
+    for waiter in waiters:
+        waiter.join(timeout=0.3)
+    assert through == [] and breaker.state == CircuitBreaker.HALF_OPEN
+
+    breaker.record_success()
+    for waiter in waiters:
+        waiter.join(timeout=5)
+    assert len(through) == 3
+
+
+def test_abandoned_probe_hands_over_to_the_next_caller(clock):
+    breaker = tripped(clock)
+    clock.now += 10
+    breaker.before_call()
+
+    # Only the probe's own thread can abandon it
+    in_thread(breaker.abandon_probe).join(timeout=5)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    breaker.abandon_probe()
+    assert breaker.state == CircuitBreaker.OPEN and breaker.open_until == clock.now
+    probe = in_thread(breaker.before_call)
+    probe.join(timeout=5)
+    assert not probe.is_alive() and breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker._probe_owner == probe.ident
+
+
+def test_silent_probe_is_given_up_after_the_probe_timeout(clock):
+    breaker = tripped(clock, probe_timeout=60)
+    clock.now += 10
+    breaker.before_call()
+
+    waiter = in_thread(breaker.before_call)
+    waiter.join(timeout=0.3)
+    assert waiter.is_alive()
+
+    clock.now += 60
+    # The waiter looks again within a second and takes over as the probe
+    waiter.join(timeout=5)
+    assert not waiter.is_alive() and breaker._probe_owner == waiter.ident
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None, payload=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.payload = payload
+        self.text = ""
+
+    def json(self):
+        return self.payload
+
+
+class RecordingLimiter:
+    def __init__(self):
+        self.blocks = []
+
+    def block_for(self, seconds):
+        self.blocks.append(seconds)
+
+
+def client_answering(monkeypatch, responses):
+    limiter = RecordingLimiter()
+    client = RiotAPIClient("stub-key", base_url="http://stub.invalid", limiter=limiter,
+                           retry=RetryPolicy(), breaker=CircuitBreaker())
+    answers = iter(responses)
+    monkeypatch.setattr(client, '_get', lambda method, url, params=None: next(answers))
+    return client, limiter
+
+
+def test_rate_limit_waits_exactly_retry_after(monkeypatch, capsys):
+    def no_jitter(*args):
+        raise AssertionError("a 429 with Retry-After must not be jittered")
+
+    monkeypatch.setattr(retry_policy.random, 'uniform', no_jitter)
+    client, limiter = client_answering(monkeypatch, [
+        FakeResponse(429, {'Retry-After': "7"}),
+        FakeResponse(429, {'Retry-After': "2"}),
+        FakeResponse(200, payload=["NA1_1"]),
+    ])
+    assert client._request_json("match-ids", "http://stub.invalid/ids") == ["NA1_1"]
+    assert limiter.blocks == [7.0, 2.0]
+
+
+def test_rate_limit_without_retry_after_backs_off(monkeypatch, capsys):
+    monkeypatch.setattr(retry_policy.random, 'uniform', lambda low, high: high)
+    client, limiter = client_answering(monkeypatch, [
+        FakeResponse(429),
+        FakeResponse(200, payload=[]),
+    ])
+    assert client._request_json("match-ids", "http://stub.invalid/ids") == []
+    assert limiter.blocks == [RetryPolicy().base_delay]
+
+
+@pytest.mark.parametrize("header, expected", [("3", 3.0), ("0.5", 0.5), ("soon", None), (None, None)])
+def test_retry_after_header(header, expected):
+    headers = {} if header is None else {'Retry-After': header}
+    assert RetryPolicy.retry_after(FakeResponse(429, headers)) == expected
@@ -0,0 +1,98 @@
+"""The fair-share scheduler splits grants by weight and serves live calls first"""
+
+import threading
+import time
+from collections import Counter
+
+from scheduler import LANE_BACKFILL, LANE_LIVE, FairShareScheduler
+
+
+class GatedLimiter:
+    """Limiter stand-in that lets a call through only when the test grants it"""
+
+    def __init__(self):
+        self.entered = []  # method of every call that reached the limiter, in order
+        self._permits = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, method: str) -> float:
+        with self._cond:
+            self.entered.append(method)
+            self._cond.notify_all()
+            while not self._permits:
+                self._cond.wait()
+            self._permits -= 1
+        return 0.0
+
+    def grant(self, count: int = 1):
+        with self._cond:
+            self._permits += count
+            self._cond.notify_all()
+
+
+def settle(scheduler, limiter, entered, waiting, timeout=5.0):
+    """Wait until `entered` calls reached the limiter and `waiting` tickets are queued behind it"""
+    deadline = time.monotonic() + timeout
+    while len(limiter.entered) != entered or len(scheduler._waiting) != waiting:
+        assert time.monotonic() < deadline, (
+            f"{len(limiter.entered)} calls in the limiter, {len(scheduler._waiting)} queued")
+        time.sleep(0.001)
+
+
+def start_calls(scheduler, player_id, calls, weight=1.0, lane=LANE_BACKFILL, threads=2):
+    """Threads making `calls` calls each through the player's budget (the method names the player)"""
+    budget = scheduler.budget(player_id, weight, lane)
+    workers = [threading.Thread(target=lambda: [budget.acquire(player_id) for _ in range(calls)],
+                                daemon=True) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    return workers
+
+
+def finish(limiter, workers):
+    limiter.grant(10000)
+    for worker in workers:
+        worker.join(timeout=5)
+        assert not worker.is_alive()
+
+
+def test_grants_split_by_weight():
+    limiter = GatedLimiter()
+    scheduler = FairShareScheduler(limiter)
+    workers = start_calls(scheduler, "heavy", 40, weight=2.0) + start_calls(scheduler, "light", 40)
+
+    # Grant one call at a time, once every other thread's ticket is queued again
+    for granted in range(60):
+        settle(scheduler, limiter, entered=granted + 1, waiting=3)
+        limiter.grant()
+    finish(limiter, workers)
+
+    # With both players backlogged throughout, heavy gets two calls for each of light's
+    counts = Counter(limiter.entered[:60])
+    assert abs(counts["heavy"] - 40) <= 1
+    assert abs(counts["light"] - 20) <= 1
+    assert scheduler.fairness() > 0.99
+
+
+def test_waiting_live_call_goes_before_backfill():
+    limiter = GatedLimiter()
+    scheduler = FairShareScheduler(limiter)
+    workers = start_calls(scheduler, "backfill", 20)
+    settle(scheduler, limiter, entered=1, waiting=1)
+    for granted in range(1, 5):
+        limiter.grant()
+        settle(scheduler, limiter, entered=granted + 1, waiting=1)
+
+    # A live call arriving behind backfill tickets with far earlier tags is next through
+    workers += start_calls(scheduler, "live", 1, lane=LANE_LIVE, threads=1)
+    settle(scheduler, limiter, entered=5, waiting=2)
+    limiter.grant()
+    settle(scheduler, limiter, entered=6, waiting=2)
+    assert limiter.entered[-1] == "live"
+
+    # Then backfill has the budget again
+    limiter.grant()
+    settle(scheduler, limiter, entered=7, waiting=1)
+    assert limiter.entered[-1] == "backfill"
+    finish(limiter, workers)
+    assert scheduler.shares["live"].lane_calls == {LANE_LIVE: 1, LANE_BACKFILL: 0}
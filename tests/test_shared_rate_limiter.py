@@ -0,0 +1,69 @@
+"""Two processes sharing a key stay inside its limits through the SQLite ledger"""
+
+import multiprocessing
+import time
+
+from extract_2024_2025 import RiotAPIClient
+from rate_limiter import SharedRateLimiter, limiter_scope
+from retry_policy import CircuitBreaker
+from riot_stub_server import RiotStubServer, StubRateLimits
+
+API_KEY = "stub-key"
+LIMIT, WINDOW = 5, 1
+CALLS_PER_PROCESS = 8
+# Slack for the time between the ledger granting a call and the worker noting it
+CLOCK_SLACK = 0.05
+
+
+def list_ids(url, ledger, results):
+    """List CALLS_PER_PROCESS times, reporting when each call was let through"""
+    limiter = SharedRateLimiter(limiter_scope(API_KEY, "americas"), ledger, app_limits=[(LIMIT, WINDOW)])
+    granted = []
+
+    def acquire(method, acquire=limiter.acquire):
+        slept = acquire(method)
+        granted.append(time.time())
+        return slept
+
+    limiter.acquire = acquire
+    client = RiotAPIClient(API_KEY, base_url=url, limiter=limiter, breaker=CircuitBreaker())
+    listed = sum(client.get_match_ids("me", 1704067200000, 1735689599999, 0, 10) is not None
+                 for _ in range(CALLS_PER_PROCESS))
+    results.put((listed, granted))
+
+
+def run_two(url, ledgers):
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=list_ids, args=(url, ledger, results)) for ledger in ledgers]
+    for worker in workers:
+        worker.start()
+    reports = [results.get(timeout=60) for _ in workers]
+    for worker in workers:
+        worker.join(timeout=10)
+    return [listed for listed, _ in reports], sorted(t for _, granted in reports for t in granted)
+
+
+def busiest_window(granted):
+    """Most calls let through within any WINDOW seconds"""
+    return max(sum(1 for t in granted if start <= t < start + WINDOW - CLOCK_SLACK) for start in granted)
+
+
+def test_two_processes_share_one_budget(tmp_path):
+    ledger = tmp_path / "rate_limits.sqlite"
+    with RiotStubServer("me", rate_limits=StubRateLimits([(LIMIT, WINDOW)])) as server:
+        listed, granted = run_two(server.url, [ledger, ledger])
+
+    assert listed == [CALLS_PER_PROCESS, CALLS_PER_PROCESS]
+    assert busiest_window(granted) <= LIMIT
+    # Tokens are held until each response comes back, so the server never sees an overrun either
+    assert server.status_counts[429] == 0
+    assert server.status_counts[200] == 2 * CALLS_PER_PROCESS
+
+
+def test_separate_ledgers_overrun_the_budget(tmp_path):
+    # Control: with a ledger each, the same two processes draw double the budget
+    with RiotStubServer("me", rate_limits=StubRateLimits([(LIMIT, WINDOW)])) as server:
+        _, granted = run_two(server.url, [tmp_path / "first.sqlite", tmp_path / "second.sqlite"])
+
+    assert busiest_window(granted) > LIMIT
+    assert server.status_counts[429] > 0
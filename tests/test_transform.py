@@ -0,0 +1,76 @@
+"""Parallel, sequential and incremental transforms write the same star schema"""
+
+from pathlib import Path
+
+from match_store import MatchStore, PlayerMatchIndex
+from riot_stub_server import synthetic_match
+from surrogate_keys import SurrogateKeyRegistry
+from transform_player_data import transform_player, transform_players_parallel
+
+# One game every nine days from 2024-01-01, so each player's matches span several months
+FIRST_GAME = 1704067200000
+SPACING = 9 * 24 * 60 * 60 * 1000
+PLAYERS = [{'id': "p1", 'puuid': "puuid-1"}, {'id': "p2", 'puuid': "puuid-2"}]
+
+
+def store_matches(root: Path, count: int = 12, first: int = 0):
+    """Store games first..count-1 of every player under root/data and index them"""
+    store = MatchStore(root / "data" / "raw")
+    for number, player in enumerate(PLAYERS):
+        index = PlayerMatchIndex(root / "data" / player['id'])
+        for i in range(first, count):
+            match = synthetic_match(f"NA1_{number}{i:03d}", player['puuid'],
+                                    FIRST_GAME + i * SPACING, [420, 400][i % 2])
+            store.put(match)
+            index.add(match)
+    store.close()
+
+
+def transform_all(root: Path, full: bool = False):
+    keys = SurrogateKeyRegistry(root / "surrogate_keys.sqlite")
+    for player in PLAYERS:
+        transform_player(player['id'], player['puuid'], keys=keys, full=full)
+    keys.close()
+
+
+def player_csvs(root: Path):
+    return {path.relative_to(root): path.read_bytes()
+            for player in PLAYERS for path in sorted((root / "data" / player['id']).glob("*.csv"))}
+
+
+def test_parallel_transform_matches_sequential(tmp_path, monkeypatch):
+    sequential, parallel = tmp_path / "sequential", tmp_path / "parallel"
+    for root in (sequential, parallel):
+        store_matches(root)
+
+    monkeypatch.chdir(sequential)
+    transform_all(sequential)
+
+    monkeypatch.chdir(parallel)
+    keys = SurrogateKeyRegistry(parallel / "surrogate_keys.sqlite")
+    transform_players_parallel(PLAYERS, 2, keys, store_root=parallel / "data" / "raw")
+    keys.close()
+
+    expected = player_csvs(sequential)
+    assert len(expected) == 2 * 9
+    assert player_csvs(parallel) == expected
+
+
+def test_incremental_transform_matches_full_build(tmp_path, monkeypatch, capsys):
+    store_matches(tmp_path, count=11)
+    monkeypatch.chdir(tmp_path)
+    transform_all(tmp_path)
+
+    # A new game for each player, then an incremental run and one with nothing new
+    store_matches(tmp_path, count=12, first=11)
+    capsys.readouterr()
+    transform_all(tmp_path)
+    assert capsys.readouterr().out.count("12 indexed matches, 1 not transformed yet") == 2
+    appended = player_csvs(tmp_path)
+    transform_all(tmp_path)
+    assert capsys.readouterr().out.count("12 indexed matches, 0 not transformed yet") == 2
+    assert player_csvs(tmp_path) == appended
+
+    # The key registry keeps every key, so --full rebuilds the same bytes
+    transform_all(tmp_path, full=True)
+    assert player_csvs(tmp_path) == appended
@@ -0,0 +1,122 @@
+"""Listing windows halve on full pages, stop at the split floor and keep their keys"""
+
+import contextlib
+import io
+
+import pytest
+
+import extract_2024_2025
+from extract_2024_2025 import PlayerExtraction, RiotAPIClient
+from match_store import MatchStore
+from rate_limiter import RateLimiter
+from retry_policy import CircuitBreaker
+from riot_stub_server import RiotStubServer, StubMatchHistory
+from window_planner import (MIN_SPLIT_MS, PAGE_SIZE, can_split, parse_date, split_window, window_key,
+                            year_end)
+
+PUUID = "window-player"
+HOUR_MS = 60 * 60 * 1000
+YEAR_2024 = (parse_date("2024-01-01"), parse_date("2025-01-01") - 1)
+
+
+def extraction(url):
+    client = RiotAPIClient("stub-key", base_url=url, limiter=RateLimiter([(100000, 1)]),
+                           breaker=CircuitBreaker())
+    return PlayerExtraction(client, "p1", PUUID, MatchStore(), queues=[420])
+
+
+def extract(url, start_time, end_time=None):
+    player = extraction(url)
+    with contextlib.redirect_stdout(io.StringIO()):
+        added = player.extract_range(start_time, end_time)
+    return player, added
+
+
+def leaves(checkpoint, start_time, end_time):
+    """The unsplit windows under a listing window, newest first"""
+    progress = checkpoint.get(window_key(start_time, end_time), 420)
+    if not progress.split:
+        return [(start_time, end_time, progress)]
+    return [leaf for child in split_window(start_time, end_time) for leaf in leaves(checkpoint, *child)]
+
+
+@pytest.mark.parametrize("start_time, end_time", [
+    (0, 2 * MIN_SPLIT_MS), (0, 2 * MIN_SPLIT_MS + 1), YEAR_2024,
+])
+def test_split_window_halves_newer_first(start_time, end_time):
+    (newer_start, newer_end), (older_start, older_end) = split_window(start_time, end_time)
+    assert (older_start, newer_end) == (start_time, end_time)
+    assert newer_start == older_end + 1
+    assert abs((newer_end - newer_start) - (older_end - older_start)) <= 1
+
+
+def test_splitting_stops_at_the_floor():
+    assert not can_split(0, MIN_SPLIT_MS)
+    assert can_split(0, MIN_SPLIT_MS + 1)
+
+    windows = [YEAR_2024]
+    while can_split(*windows[-1]):
+        windows.append(split_window(*windows[-1])[1])
+    span = windows[-1][1] - windows[-1][0]
+    assert MIN_SPLIT_MS // 2 <= span <= MIN_SPLIT_MS
+
+
+def test_full_page_halves_the_window(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    history = StubMatchHistory(250, queues=[420], first_game=YEAR_2024[0], spacing=HOUR_MS)
+    with RiotStubServer(PUUID, history) as server:
+        player, added = extract(server.url, *YEAR_2024)
+
+    assert added == 250
+    checkpoint = player.checkpoint
+    assert checkpoint.get(window_key(*YEAR_2024), 420).split
+    windows = leaves(checkpoint, *YEAR_2024)
+    assert len(windows) > 1
+    for start_time, end_time, progress in windows:
+        # Each leaf fit in one page, and only full pages were split
+        assert progress.done and list(progress.pages) == [0] and len(progress.listed) < PAGE_SIZE
+    assert sum(len(progress.listed) for _, _, progress in windows) == 250
+
+
+def test_full_page_below_the_floor_is_paged(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # 150 games ten seconds apart: a full page in every window down to the floor
+    history = StubMatchHistory(150, queues=[420], first_game=YEAR_2024[0], spacing=10 * 1000)
+    with RiotStubServer(PUUID, history) as server:
+        player, added = extract(server.url, *YEAR_2024)
+
+    assert added == 150
+    paged = [(start_time, end_time, progress) for start_time, end_time, progress
+             in leaves(player.checkpoint, *YEAR_2024) if progress.listed]
+    assert len(paged) == 1
+    start_time, end_time, progress = paged[0]
+    assert not can_split(start_time, end_time)
+    assert sorted(progress.pages) == [0, PAGE_SIZE] and len(progress.listed) == 150
+
+
+def test_current_year_keys_stable_across_runs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    year_start = parse_date("2025-01-01")
+    year = (year_start, year_end(year_start))
+    history = StubMatchHistory(300, queues=[420], first_game=year_start, spacing=HOUR_MS)
+
+    with RiotStubServer(PUUID, history) as server:
+        monkeypatch.setattr(extract_2024_2025, "now_ms", lambda: year_start + 150 * HOUR_MS)
+        first, added = extract(server.url, year_start)
+        assert added == 151
+        first_windows = leaves(first.checkpoint, *year)
+        first.checkpoint.rewrite()
+
+        monkeypatch.setattr(extract_2024_2025, "now_ms", lambda: year_start + 300 * HOUR_MS)
+        second, added = extract(server.url, year_start)
+        assert added == 149
+
+    # The year keeps its calendar bounds; halves finished before keep their keys and listings
+    assert second.checkpoint.get(window_key(*year), 420).split
+    second_windows = {(start_time, end_time): progress
+                      for start_time, end_time, progress in leaves(second.checkpoint, *year)}
+    finished = [(start_time, end_time, progress) for start_time, end_time, progress in first_windows
+                if progress.done and end_time < year_start + 150 * HOUR_MS]
+    assert finished
+    for start_time, end_time, progress in finished:
+        assert second_windows[(start_time, end_time)].listed == progress.listed